@@ -7,6 +7,7 @@ Las dependencias están en requirements.txt.
 """
 from __future__ import annotations
 
+import multiprocessing
 import sys
 import subprocess
 from importlib import util as importutil
@@ -50,6 +51,9 @@ def _check_dependencies() -> None:
 
 
 def main() -> None:
+    # el worker de Whisper local usa spawn: en un .exe congelado, el hijo
+    # vuelve a entrar por acá y freeze_support lo desvía a su loop
+    multiprocessing.freeze_support()
     _check_dependencies()
     # importar después de asegurar deps
     from dictapp.app import App
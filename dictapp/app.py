@@ -1,6 +1,7 @@
 """Orquestador: une config + audio + transcribers + UI + tray + hotkeys."""
 from __future__ import annotations
 
+import gc
 import threading
 import time
 import tkinter as tk
@@ -9,18 +10,33 @@ import traceback
 import pyperclip
 
 from . import audio as audio_mod
+from . import benchmark
+from . import pcm as pcm_mod
+from .memory import process_rss_mb
 from . import whats_new
-from .audio_sd import SDRecorder, SD_AVAILABLE
+from .audio_sd import (
+    SDCaptureEngine,
+    SDLiveMeter,
+    SDRecorder,
+    SharedRecorder,
+    SD_AVAILABLE,
+    NO_MATCH,
+    find_sd_input,
+)
 from .audio_ffmpeg import (
     FFmpegRecorder,
     FFMPEG_AVAILABLE,
     find_ffmpeg,
-    list_dshow_input_devices,
 )
 from .config import Config, KEYRING_OK
+from .device_profiles import OpenProfileCache
+from .devices import DeviceRegistry
+from .hedging import Hedger, audio_seconds
 from .hotkeys import HotkeyManager, KEYBOARD_AVAILABLE
 from .log_window import LogWindow
 from .main_window import MainWindow
+from .router import AUTO_SERVICE, GOOGLE_MAX_S, TYPICAL_AUDIO_S, Route, Router
+from .streaming import IncrementalSession
 from .theme import apply_dark_theme
 from .tray import TrayIcon, TRAY_AVAILABLE
 from .transcribers import (
@@ -30,11 +46,23 @@ from .transcribers import (
     GoogleTranscriber,
     GroqWhisperTranscriber,
     LocalWhisperTranscriber,
+    BackendUnavailable,
     Transcriber,
     TranscriptionError,
+    TranscriptionResult,
 )
+from .transcribers.circuit import CLOSED, CircuitBreaker
+from .transcribers.groq_whisper import GROQ_MODELS
+from .transcribers.local_whisper import DEFAULT_PROFILE, lower_thread_priority
+from .transcribers.model_manager import HF_AVAILABLE as MODELS_HF_AVAILABLE
 from .version import VERSION
 
+IDLE_CHECK_MS = 30_000   # cada cuánto se revisa el keep-warm del modelo local
+SENTENCE_END = (".", "?", "!", "…")
+PROGRESSIVE_MAX_WAIT_S = 2.0   # sin fin de frase, pegar igual lo acumulado tras esto
+TWO_PASS_REPLACE_MAX_S = 10.0  # después de esto no se borra lo pegado: solo se actualiza el portapapeles
+SD_RELEASE_TIMEOUT_S = 3.0     # espera al hilo de Tk para cerrar los streams antes de un refresh
+
 
 class App:
     def __init__(self) -> None:
@@ -59,21 +87,69 @@ class App:
             self.ff_recorder = FFmpegRecorder(
                 device_name=self.config.get("ffmpeg_device") or None,
                 log_fn=lambda m: self._log(m),
+                pipe=bool(self.config.get("ffmpeg_pipe", True)),
+            )
+        # stream persistente compartido por VU y grabación (se crea con el meter)
+        self.capture_engine: SDCaptureEngine | None = None
+        self.shared_recorder: SharedRecorder | None = None
+        if SD_AVAILABLE:
+            self.shared_recorder = SharedRecorder(
+                engine_fn=lambda: self.capture_engine,
+                log_fn=lambda m: self._log(m),
             )
+        # snapshot de dispositivos en memoria: se re-enumera solo con hotplug o ↻
+        self.devices = DeviceRegistry(include_dshow=FFMPEG_AVAILABLE, log_fn=lambda m: self._log(m))
+        self.devices.add_listener(lambda _snap: self.root.after(0, self._on_devices_changed))
+        if SD_AVAILABLE:
+            self.devices.release_sd = self._release_sd_streams
+        self._devices_dirty = False
+        # combo de apertura que funcionó por device (salta la cascada de intentos)
+        self.open_profiles = OpenProfileCache()
+        self.recorder.profiles = self.open_profiles
+        if self.sd_recorder is not None:
+            self.sd_recorder.profiles = self.open_profiles
         # qué backend está activo (alterna a sd / ffmpeg si pyaudio falla)
-        self._backend: str = "pyaudio"  # "pyaudio" | "sd" | "ffmpeg"
+        self._backend: str = "pyaudio"  # "shared" | "pyaudio" | "sd" | "ffmpeg"
         self._tray_level_after: str | None = None  # id del callback root.after para detenerlo
+        self._session: IncrementalSession | None = None  # transcripción incremental en curso
+        self._bench_armed = False      # "Medir equipo" espera el próximo dictado como clip
+        self._bench_clip: tuple[bytes, int] | None = None   # solo entre ese dictado y la medición
+        self._benchmarking = False
         self.hotkey = HotkeyManager()
 
         # transcribers
-        self.groq = GroqWhisperTranscriber(api_key=self.config.get_groq_key())
+        self.groq = self._make_groq(self.config.get_groq_key())
+        self._groq_variants: dict[str, GroqWhisperTranscriber] = {}   # otros modelos de Groq (Auto)
         self.google = GoogleTranscriber()
+        self.router = Router(log_fn=lambda m: self._log(m))
+        self.hedger = Hedger(pct=float(self.config.get("hedge_percentile", 95)),
+                             log_fn=lambda m: self._log(m), on_outcome=self._record_outcome)
+        # un circuito por backend de red; la sonda usa el transcriber vigente
+        self.breakers = {
+            t.name: CircuitBreaker(
+                t.name, probe_fn=probe,
+                threshold=int(self.config.get("circuit_threshold", 3)),
+                probe_interval_s=float(self.config.get("circuit_probe_s", 15)),
+                log_fn=lambda m: self._log(m),
+                on_change=lambda _state: self.root.after(0, self._refresh_service_status),
+            )
+            for t, probe in ((self.groq, lambda: self.groq.probe()),
+                             (self.google, lambda: self.google.probe()))
+        }
         self.local = LocalWhisperTranscriber(
             model_size=self.config.get("local_model"),
             device=self.config.get("local_device"),
             compute_type=self.config.get("local_compute_type"),
             log_fn=lambda m: self._log(m),
+            batch_size=int(self.config.get("local_batch_size", 8)),
+            batched_min_s=float(self.config.get("local_batched_min_s", 30.0)),
+            out_of_process=bool(self.config.get("local_out_of_process")),
+            draft_size=self._draft_model(),
+            cpu_threads=int(self.config.get("local_cpu_threads", 0) or 0),
+            beam_size=int(self.config.get("local_beam_size", 5) or 5),
+            profile=str(self.config.get("local_profile", DEFAULT_PROFILE)),
         )
+        self.local.cache.budget_mb = int(self.config.get("local_cache_budget_mb", 4096))
 
         # log window flotante
         self.log_window = LogWindow(self.root)
@@ -85,6 +161,7 @@ class App:
             on_toggle_recording=self.toggle_recording,
             on_change_service=self.change_service,
             on_change_groq_key=self.change_groq_key,
+            on_change_groq_extra_keys=self.change_groq_extra_keys,
             on_change_hotkey=self.change_hotkey,
             on_change_local_model=self.change_local_model,
             on_change_local_device=self.change_local_device,
@@ -93,8 +170,13 @@ class App:
             on_warm_up_local=self.warm_up_local,
             on_toggle_log=self.toggle_log,
             on_change_ffmpeg_device=self.change_ffmpeg_device,
-            list_ffmpeg_devices=list_dshow_input_devices,
+            list_ffmpeg_devices=lambda: list(self.devices.snapshot().dshow),
             on_close=self.on_window_close,
+            meter_factory=self._make_mic_meter,
+            list_microphones=lambda: list(self.devices.snapshot().curated),
+            on_refresh_devices=lambda: self.devices.refresh(reason="↻"),
+            on_benchmark_local=self.benchmark_local,
+            on_download_local=self.download_local_model,
         )
         # inyectar el sumidero de log
         self.window.log = self._log  # type: ignore[method-assign]
@@ -109,6 +191,17 @@ class App:
 
         self._log_initial_status()
         self._register_hotkey()
+        self.devices.start_watch()
+
+        # keep-warm del modelo local: se libera tras N min sin uso y se
+        # recarga en background al volver (hotkey o foco en la ventana)
+        self.root.bind("<FocusIn>", self._on_focus_in, add="+")
+        self.root.after(IDLE_CHECK_MS, self._check_local_idle)
+        if self.config.get("local_prefetch_models") and LOCAL_AVAILABLE:
+            self.root.after(3000, self._prefetch_local_models)
+        if self.config.get("local_warmup_at_start") and LOCAL_AVAILABLE:
+            # después del 1er dibujado: la UI aparece antes de cargar pesos
+            self.root.after(1500, lambda: self.warm_up_local(at_start=True))
 
         # popup what's new si versión cambió
         if whats_new.should_show(self.config.get("last_seen_version", "")):
@@ -161,10 +254,13 @@ class App:
             self.window.log(f"Backend de audio: ffmpeg disponible en {find_ffmpeg()} (último recurso para entornos con AV/EDR).")
         else:
             self.window.log("Backend de audio: ffmpeg NO encontrado (último fallback no disponible).")
-        # diagnóstico de audio
+        # diagnóstico de audio (del snapshot ya enumerado por la ventana)
+        snap = self.devices.snapshot()
+        if snap.error:
+            self.window.log(f"Enumeración de audio con errores: {snap.error}")
         try:
-            self.window.log("Audio: " + audio_mod.host_apis_summary())
-            for d in audio_mod.list_input_devices():
+            self.window.log("Audio: " + snap.host_summary)
+            for d in snap.devices:
                 tag = " [DEFAULT]" if d.is_default else ""
                 self.window.log(
                     f"  mic#{d.index} hostApi={d.host_api_name!r}({d.host_api}) "
@@ -176,7 +272,7 @@ class App:
         # devices DirectShow vistos por ffmpeg
         if FFMPEG_AVAILABLE:
             try:
-                ff_devs = list_dshow_input_devices()
+                ff_devs = list(snap.dshow)
                 self.window.log(f"ffmpeg/dshow ve {len(ff_devs)} devices de audio:")
                 for d in ff_devs:
                     self.window.log(f"  - {d.name!r}")
@@ -208,15 +304,110 @@ class App:
             return self.google
         if svc == "Whisper local":
             return self.local
+        if svc == AUTO_SERVICE:
+            # sin audio todavía: lo que se elegiría para un dictado típico
+            return self._auto_pick(TYPICAL_AUDIO_S, log=False)[1]
         return self.groq
 
+    # ---------------------------------------------------------- Auto
+    def _auto_routes(self) -> list[Route]:
+        """Rutas disponibles ahora: Groq/Google si hay red (circuito cerrado),
+        y los tamaños locales cargados o descargados (nunca una descarga)."""
+        routes: list[Route] = []
+        if self.groq.is_ready()[0] and self.breakers[self.groq.name].allow():
+            routes += [Route("groq", m) for m in GROQ_MODELS]
+        if self.google.is_ready()[0] and self.breakers[self.google.name].allow():
+            routes.append(Route("google"))
+        if LOCAL_AVAILABLE and self.local.is_ready()[0]:
+            warm = set(self.local.warm_sizes())
+            gpu = self.local.device_in_use == "cuda"
+            for size in sorted(warm | {self.local.model_size}):
+                if size in warm or self.local.models.is_downloaded(size):
+                    routes.append(Route("local", size, warm=size in warm, gpu=gpu))
+        return routes
+
+    def _auto_pick(self, audio_s: float, log: bool = True) -> tuple[Route | None, Transcriber]:
+        target = float(self.config.get("latency_target_s", 2.0) or 2.0)
+        route = self.router.choose(self._auto_routes(), audio_s, target, log=log)
+        if route is None:
+            return None, self.local if self.local.is_ready()[0] else self.groq
+        return route, self._transcriber_for(route)
+
+    def _transcriber_for(self, route: Route) -> Transcriber:
+        if route.backend == "google":
+            return self.google
+        if route.backend == "groq":
+            if route.model == self.groq.model:
+                return self.groq
+            variant = self._groq_variants.get(route.model)
+            if variant is None:
+                variant = self._make_groq(self.config.get_groq_key(), model=route.model)
+                self._groq_variants[route.model] = variant
+            return variant
+        if route.model == self.local.model_size:
+            return self.local
+        # otro tamaño ya cargado: comparte cache e índice, así que no recarga nada
+        return LocalWhisperTranscriber(
+            model_size=route.model,
+            device=self.local.device,
+            compute_type=self.local.compute_type,
+            log_fn=lambda m: self._log(m),
+            cache=self.local.cache,
+            batch_size=self.local.batch_size,
+            batched_min_s=self.local.batched_min_s,
+            cpu_threads=self.local.cpu_threads,
+            beam_size=self.local.beam_size,
+            profile=self.local.profile,
+            models=self.local.models,
+        )
+
+    def _routed_transcriber(self) -> Transcriber:
+        """El servicio elegido, o el fallback offline si su circuito está
+        abierto (así el dictado no espera el timeout de la red)."""
+        t = self._current_transcriber()
+        fallback = self._circuit_fallback(t)
+        if fallback is None:
+            return t
+        self.window.log(f"[TX] {t.name} sin conexión (circuito abierto) → {fallback.name}")
+        return fallback
+
+    def _circuit_fallback(self, t: Transcriber) -> Transcriber | None:
+        breaker = self.breakers.get(t.name)
+        if breaker is None or breaker.allow():
+            return None
+        if self.config.get("circuit_fallback", "Whisper local") != "Whisper local":
+            return None
+        return self.local if self.local.is_ready()[0] else None
+
+    def _record_outcome(self, backend: str, error: Exception | None) -> None:
+        breaker = self.breakers.get(backend)
+        if breaker is None:
+            return
+        if isinstance(error, BackendUnavailable):
+            breaker.record_failure(str(error))
+        elif error is None or isinstance(error, TranscriptionError):
+            # cualquier respuesta del servicio (aunque sea "sin texto") prueba que está
+            breaker.record_success()
+
     def _refresh_service_status(self) -> None:
         t = self._current_transcriber()
         ok, msg = t.is_ready()
+        breaker = self.breakers.get(t.name)
+        if ok and breaker is not None and breaker.state != CLOSED:
+            msg = breaker.describe()
+            fallback = self._circuit_fallback(t)
+            if fallback is not None:
+                msg += f" → {fallback.name}"
+            ok = False
         prefix = "✓" if ok else "✗"
         # versión corta para el footer, completa al log si hay error
         short = msg if len(msg) <= 60 else msg[:57] + "…"
-        self.window.set_service_status(f"{prefix} {t.name}: {short}")
+        if t is self.local:
+            rss = process_rss_mb()
+            if rss is not None:
+                short += f" · RAM {rss:.0f} MB"
+        name = f"{AUTO_SERVICE} · {t.name}" if self.config.get("service") == AUTO_SERVICE else t.name
+        self.window.set_service_status(f"{prefix} {name}: {short}")
         if not ok and len(msg) > 60:
             self.window.log(f"[{t.name}] {msg}")
 
@@ -232,13 +423,43 @@ class App:
         except Exception as e:
             self.window.log(f"No se pudo guardar la API key: {e}")
             return
-        self.groq = GroqWhisperTranscriber(api_key=key)
+        self._rebuild_groq()
+        self.breakers[self.groq.name].reset()
         if key:
             self.window.log("API key de Groq guardada (cifrada con DPAPI).")
         else:
             self.window.log("API key de Groq eliminada.")
         self._refresh_service_status()
 
+    def change_groq_extra_keys(self, keys: list[str]) -> None:
+        try:
+            self.config.set_groq_extra_keys(keys)
+        except Exception as e:
+            self.window.log(f"No se pudieron guardar las keys extra: {e}")
+            return
+        self._rebuild_groq()
+        n = len(self.config.get_groq_extra_keys())
+        self.window.log(f"Keys extra de Groq: {n} guardadas." if n else "Keys extra de Groq eliminadas.")
+        self._refresh_service_status()
+
+    def _rebuild_groq(self) -> None:
+        self.groq = self._make_groq(self.config.get_groq_key())
+        self._groq_variants.clear()
+
+    def _make_groq(self, key: Optional[str], model: Optional[str] = None) -> GroqWhisperTranscriber:
+        return GroqWhisperTranscriber(
+            api_key=key,
+            model=model or self.config.get("groq_model", GROQ_MODELS[0]),
+            extra_keys=self.config.get_groq_extra_keys(),
+            rpm=float(self.config.get("groq_rpm", 20) or 20),
+            max_retries=int(self.config.get("groq_max_retries", 4)),
+            upload_format=self.config.get("upload_format", "auto"),
+            opus_kbps=int(self.config.get("opus_bitrate_kbps", 24)),
+            log_fn=lambda msg: self.window.log(msg),
+            chunk_s=float(self.config.get("groq_chunk_s", 30) or 0),
+            max_parallel=int(self.config.get("groq_parallel", 4) or 1),
+        )
+
     def change_hotkey(self, combo: str) -> tuple[bool, str]:
         if not combo:
             return False, "Hotkey vacío."
@@ -249,24 +470,26 @@ class App:
 
     def change_local_model(self, model: str) -> None:
         self.config.set("local_model", model)
-        self.local = LocalWhisperTranscriber(
-            model_size=model,
-            device=self.config.get("local_device"),
-            compute_type=self.config.get("local_compute_type"),
-        )
+        self.local.select(model_size=model, preload=self._local_in_use())
         self.window.log(f"Modelo local seleccionado: {model}")
         self._refresh_service_status()
 
     def change_local_device(self, device: str) -> None:
         self.config.set("local_device", device)
-        self.local = LocalWhisperTranscriber(
-            model_size=self.config.get("local_model"),
-            device=device,
-            compute_type=self.config.get("local_compute_type"),
-        )
+        self.local.select(device=device, preload=self._local_in_use())
         self.window.log(f"Device local: {device}")
         self._refresh_service_status()
 
+    def _draft_model(self) -> str | None:
+        if not self.config.get("local_two_pass"):
+            return None
+        return str(self.config.get("local_draft_model", "tiny"))
+
+    def _local_in_use(self) -> bool:
+        """Precargar solo si el local es el servicio activo o ya había un modelo
+        cargado: elegir en el combo no debería disparar una descarga de 3 GB."""
+        return self.config.get("service") == "Whisper local" or bool(self.local.cache.keys())
+
     def change_ffmpeg_device(self, name: str) -> None:
         if not name or name.startswith("("):
             return
@@ -279,27 +502,225 @@ class App:
         self.config.set("mic_index", index)
         self.recorder.mic_index = index
         if self.sd_recorder is not None:
-            self.sd_recorder.mic_index = index
-        self.window.log(f"Micrófono: index={index}")
+            self.sd_recorder.mic_index = self._sd_index(index)
+        self.window.log(f"Micrófono: index={index} · {self._mic_key(index)!r}")
 
     def change_setting(self, key: str, value: object) -> None:
         self.config.set(key, value)
+        if key == "ffmpeg_pipe" and self.ff_recorder is not None:
+            self.ff_recorder.pipe = bool(value)
+        if key == "shared_capture":
+            if not value and self.capture_engine is not None:
+                self.capture_engine.stop()
+                self.capture_engine = None
+            # reabre el meter con el tipo que corresponda
+            self.window.refresh_microphones()
+        if key == "upload_format":
+            self.groq.upload_format = str(value)
+        if key == "opus_bitrate_kbps":
+            self.groq.opus_kbps = int(value)  # type: ignore[arg-type]
+        if key == "groq_chunk_s":
+            self.groq.chunk_s = float(value or 0)  # type: ignore[arg-type]
+        if key == "groq_parallel":
+            self.groq.max_parallel = max(1, int(value))  # type: ignore[arg-type]
+        if key in ("groq_rpm", "groq_max_retries", "groq_model"):
+            self._rebuild_groq()
+        elif key.startswith("groq_") or key in ("upload_format", "opus_bitrate_kbps"):
+            self._groq_variants.clear()   # se recrean con los valores nuevos
+        if key == "local_batch_size":
+            self.local.batch_size = int(value)  # type: ignore[arg-type]
+        if key == "local_batched_min_s":
+            self.local.batched_min_s = float(value)  # type: ignore[arg-type]
+        if key == "local_cpu_threads":
+            self.local.set_cpu_threads(int(value))  # type: ignore[arg-type]
+        if key == "circuit_threshold":
+            for breaker in self.breakers.values():
+                breaker.threshold = max(1, int(value))  # type: ignore[arg-type]
+        if key == "circuit_probe_s":
+            for breaker in self.breakers.values():
+                breaker.probe_interval_s = float(value)  # type: ignore[arg-type]
+        if key == "hedge_percentile":
+            self.hedger.pct = float(value)  # type: ignore[arg-type]
+        if key == "local_beam_size":
+            self.local.beam_size = int(value)  # type: ignore[arg-type]
+        if key == "local_profile":
+            self.local.profile = str(value)
+        if key in ("local_two_pass", "local_draft_model"):
+            self.local.draft_size = self._draft_model()
+            if self._local_in_use():
+                self.local.preload_draft()
+        if key == "local_out_of_process":
+            # soltar el modelo del lado viejo puede esperar a una transcripción en curso
+            threading.Thread(target=self.local.set_out_of_process, args=(bool(value),),
+                             daemon=True).start()
+        if key == "preroll_ms" and self.capture_engine is not None:
+            self.capture_engine.preroll_ms = int(value)  # type: ignore[arg-type]
         self.window.log(f"{key} = {value}")
 
-    def warm_up_local(self) -> None:
+    def _on_focus_in(self, _event=None) -> None:
+        # señal de uso probable: si el modelo se liberó por inactividad, recargarlo ya
+        if self._current_transcriber() is self.local and self.local.needs_reload:
+            self.window.log("[local-whisper] ventana con foco: recargando modelo en background…")
+            self.local.select()
+
+    def _check_local_idle(self) -> None:
+        try:
+            minutes = float(self.config.get("local_keep_warm_min", 15) or 0)
+            if (minutes > 0 and self.local.loaded and not self._active_recorder().recording
+                    and self.local.idle_seconds() >= minutes * 60):
+                threading.Thread(target=self._unload_local_idle, args=(minutes,), daemon=True).start()
+            elif self._current_transcriber() is self.local:
+                self._refresh_service_status()
+        finally:
+            self.root.after(IDLE_CHECK_MS, self._check_local_idle)
+
+    def _unload_local_idle(self, minutes: float) -> None:
+        before = process_rss_mb()
+        keys = self.local.unload()
+        gc.collect()
+        after = process_rss_mb()
+        freed = f" · RAM {before:.0f} → {after:.0f} MB" if before is not None and after is not None else ""
+        names = ", ".join(k[0] for k in keys) or self.local.model_size
+        self.window.log(f"[local-whisper] {names} liberado tras {minutes:g} min sin uso{freed}")
+        self._refresh_service_status()
+
+    def warm_up_local(self, at_start: bool = False) -> None:
         if not LOCAL_AVAILABLE:
             self.window.log("faster-whisper no instalado.")
             return
-        self.window.log(f"Cargando modelo local '{self.config.get('local_model')}'…")
+        model = self.config.get("local_model")
+        self.window.log(f"Cargando modelo local '{model}'{' (arranque)' if at_start else ''}…")
 
         def worker():
-            try:
-                self.local.warm_up()
-                self.window.log("Modelo local listo.")
-            except Exception as e:
-                self.window.log(f"Error cargando modelo: {e}")
+            if at_start:
+                lower_thread_priority()
+            timings = self.local.warm_up(inference=True, language=self.config.get("language", "es"))
+            if timings is None:
+                ok, msg = self.local.is_ready()
+                self.window.log(f"Error cargando modelo: {msg}")
+            else:
+                load_s, warm_s = timings
+                warm = f"{warm_s:.2f}s" if warm_s is not None else "falló"
+                self.window.log(f"[local-whisper] '{model}' listo · carga {load_s:.2f}s · warm-up {warm}")
             self._refresh_service_status()
-        threading.Thread(target=worker, daemon=True).start()
+        threading.Thread(target=worker, daemon=True, name="dictapp-warmup").start()
+
+    def download_local_model(self, size: str | None = None) -> None:
+        """Baja un modelo local en background con progreso en el estado."""
+        size = size or str(self.config.get("local_model"))
+        models = self.local.models
+        if not MODELS_HF_AVAILABLE:
+            self.window.log("[models] huggingface_hub no instalado (viene con faster-whisper)")
+            return
+        if models.is_downloaded(size):
+            self.window.log(f"[models] {size} ya está descargado")
+            return
+        if models.is_downloading(size):
+            self.window.log(f"[models] {size} ya se está descargando")
+            return
+        last = {"pct": -1}
+
+        def progress(name: str, done: int, total: int) -> None:
+            pct = int(done * 100 / total) if total else 0
+            if pct != last["pct"]:
+                last["pct"] = pct
+                self.window.set_status(
+                    f"Descargando {name}… {pct}% ({done / 1e6:.0f}/{total / 1e6:.0f} MB)", color="warn"
+                )
+
+        def done(name: str, path: str | None, error: Exception | None) -> None:
+            if error is not None:
+                self.window.set_status(f"Descarga de {name} falló", color="err")
+            else:
+                self.window.set_status(f"{name} descargado", color="ok")
+                if name == self.local.model_size and self._local_in_use():
+                    self.local.select()
+            self._refresh_service_status()
+
+        models.download_async(size, on_progress=progress, on_done=done)
+        self._refresh_service_status()
+
+    def _prefetch_local_models(self) -> None:
+        """Baja en serie los tamaños de `local_prefetch_models` que falten."""
+        missing = [s for s in self.config.get("local_prefetch_models") or []
+                   if not self.local.models.is_downloaded(s) and not self.local.models.adopt(s)]
+        if not missing or not MODELS_HF_AVAILABLE:
+            return
+        self.window.log(f"[models] prefetch en background: {', '.join(missing)}")
+
+        def worker():
+            lower_thread_priority()
+            for size in missing:
+                try:
+                    self.local.models.download(size)
+                except Exception as e:
+                    self.window.log(f"[models] prefetch de {size} falló: {type(e).__name__}: {e}")
+            self._refresh_service_status()
+        threading.Thread(target=worker, daemon=True, name="dictapp-model-prefetch").start()
+
+    def benchmark_local(self) -> None:
+        """Mide combinaciones de Whisper local en este equipo y aplica la
+        elegida. El clip es el próximo dictado: el audio no se guarda antes."""
+        if not LOCAL_AVAILABLE:
+            self.window.log("faster-whisper no instalado.")
+            return
+        if self._benchmarking or self._bench_armed:
+            self.window.log("[bench] ya hay una medición en curso")
+            return
+        self._bench_armed = True
+        self.window.log("[bench] dictá algo de unos 10 s: se mide con ese audio y después se descarta")
+        self.window.set_status("Medir equipo: dictá ~10 s", color="warn")
+
+    def _take_bench_clip(self, pcm: "bytes | memoryview", rate: int) -> bool:
+        """Copia el dictado para "Medir equipo", solo si está esperando uno."""
+        if not self._bench_armed:
+            return False
+        self._bench_armed = False
+        self._benchmarking = True
+        self._bench_clip = (bytes(pcm), rate)
+        return True
+
+    def _transcribe_then_bench(self, pcm: memoryview, rate: int,
+                               session: IncrementalSession | None) -> None:
+        # primero el dictado: medir en paralelo le robaría CPU y ensuciaría la medición
+        self._transcribe_worker(pcm, rate, session)
+        self._run_benchmark()
+
+    def _run_benchmark(self) -> None:
+        self.window.set_status("Midiendo equipo…", color="warn")
+        models = list(dict.fromkeys([*benchmark.DEFAULT_MODELS, str(self.config.get("local_model"))]))
+        clip, self._bench_clip = self._bench_clip, None
+        try:
+            audio, label = benchmark.reference_audio(pcm=clip)
+            clip = None
+            best, _met = benchmark.autotune(
+                self.config, audio, label, models=models,
+                target_s=float(self.config.get("local_target_latency_s", benchmark.DEFAULT_TARGET_S)),
+                log_fn=self.window.log, manager=self.local.models,
+            )
+        except Exception as e:
+            self.window.log(f"[bench] falló: {type(e).__name__}: {e}\n{traceback.format_exc()}")
+            self.window.set_status("Error", color="err")
+            return
+        finally:
+            self._benchmarking = False
+        if best is not None:
+            c = best.candidate
+            self.local.beam_size = c.beam_size
+            self.local.set_cpu_threads(c.cpu_threads)
+            self.local.select(model_size=c.model, compute_type=c.compute_type,
+                              preload=self._local_in_use())
+            self.root.after(0, self.window.model_var.set, c.model)
+        self.window.set_status("Listo", color="ok")
+        self._refresh_service_status()
+
+    def _start_transcription(self, pcm: memoryview, rate: int,
+                             session: IncrementalSession | None = None) -> None:
+        if self._take_bench_clip(pcm, rate):
+            target = self._transcribe_then_bench
+        else:
+            target = self._transcribe_worker
+        threading.Thread(target=target, args=(pcm, rate, session), daemon=True).start()
 
     # ---------------------------------------------------------- grabación
     def toggle_recording(self) -> None:
@@ -310,33 +731,160 @@ class App:
             self.start_recording()
 
     def _active_recorder(self):
+        if self._backend == "shared" and self.shared_recorder:
+            return self.shared_recorder
         if self._backend == "ffmpeg" and self.ff_recorder:
             return self.ff_recorder
         if self._backend == "sd" and self.sd_recorder:
             return self.sd_recorder
         return self.recorder
 
-    def _try_start_chain(self) -> tuple[object, str] | None:
-        """Intenta arrancar pyaudio → sd → ffmpeg. Devuelve (recorder, backend) o None."""
-        # 1) pyaudio
-        self.recorder.start()
-        if not self.recorder.error:
-            return (self.recorder, "pyaudio")
-        self.window.log("PyAudio no pudo abrir el mic, intento con sounddevice…")
-
-        # 2) sounddevice
+    def _mic_key(self, index: int) -> str | None:
+        """Clave estable del mic (host API + nombre), del snapshot en memoria."""
+        return self.devices.snapshot().key_for(index)
+
+    def _sd_index(self, index: int) -> int:
+        """Traduce un índice PyAudio al índice equivalente de sounddevice.
+        `NO_MATCH` si sounddevice no tiene ese mic: abrir el default grabaría
+        de otro micrófono sin avisar."""
+        if index is None or index < 0:
+            return -1
+        snap = self.devices.snapshot()
+        sd_idx = find_sd_input(snap.key_for(index), snap.sd_inputs)
+        return sd_idx if sd_idx is not None else NO_MATCH
+
+    def _release_sd_streams(self) -> bool:
+        """Desde el hilo del refresh: cierra en el hilo de Tk el VU y el stream
+        compartido para que el registro pueda reinicializar sounddevice. El
+        refresh los vuelve a abrir (`_on_devices_changed`)."""
+        done = threading.Event()
+        released = [False]
+
+        def release() -> None:
+            try:
+                if any(r.recording for r in self._all_recorders()):
+                    return
+                self.window.stop_mic_meter()
+                if self.capture_engine is not None:
+                    self.capture_engine.stop()
+                    self.capture_engine = None
+                released[0] = True
+            finally:
+                done.set()
+
+        self.root.after(0, release)
+        return done.wait(SD_RELEASE_TIMEOUT_S) and released[0]
+
+    def _on_devices_changed(self) -> None:
+        """Tras un refresh del registro (hotplug o ↻), en el hilo de Tk."""
+        if self._active_recorder().recording:
+            # no reabrir streams a mitad de una grabación; se aplica al detener
+            self._devices_dirty = True
+            return
+        if self._devices_dirty and SD_AVAILABLE and self.devices.sd_stale:
+            # el refresh cayó durante la grabación y sounddevice no se pudo
+            # reinicializar: otro refresh ahora que no hay streams en uso
+            self._devices_dirty = False
+            if self.devices.refresh(reason="tras grabar"):
+                return
+        self._devices_dirty = False
         if self.sd_recorder is not None:
-            self.sd_recorder.mic_index = self.recorder.mic_index
-            self.sd_recorder.start()
-            if not self.sd_recorder.error:
-                return (self.sd_recorder, "sd")
-            self.window.log("sounddevice tampoco abrió el mic, intento con ffmpeg…")
+            self.sd_recorder.mic_index = self._sd_index(self.recorder.mic_index)
+        self.window.refresh_microphones()
+        self.window.refresh_ffmpeg_devices()
+
+    def _make_mic_meter(self, index: int):
+        """Meter para la UI: el stream compartido si está activo, si no un SDLiveMeter."""
+        sd_idx = self._sd_index(index)
+        if not self.config.get("shared_capture") or self.shared_recorder is None:
+            return SDLiveMeter(sd_idx, log_fn=lambda m: self._log(m))
+        eng = self.capture_engine
+        if eng is not None and eng.mic_index == sd_idx:
+            return eng
+        if eng is not None:
+            eng.stop()
+        eng = SDCaptureEngine(
+            sd_idx,
+            log_fn=lambda m: self._log(m),
+            preroll_ms=int(self.config.get("preroll_ms", 300)),
+        )
+        self.capture_engine = eng
+        return eng
+
+    def _all_recorders(self) -> list:
+        return [r for r in (self.recorder, self.sd_recorder, self.ff_recorder, self.shared_recorder)
+                if r is not None]
+
+    def _start_session(self, t: Transcriber) -> None:
+        """Crea la sesión incremental y la engancha a todos los recorders antes
+        de arrancar: el que gane la cadena ya empuja sus primeros bloques."""
+        self._session = None
+        if not self.config.get("incremental_transcription"):
+            return
+        session = IncrementalSession(
+            t,
+            language=self.config.get("language", "es"),
+            log_fn=self.window.log,
+            trim=bool(self.config.get("trim_silence")),
+            resample=bool(self.config.get("resample_16k", True)),
+        )
+        for r in self._all_recorders():
+            r.on_data = lambda data, r=r: session.feed(data, r.sample_rate)
+        self._session = session
+        self.window.log("[INC] transcripción incremental activa (trozos por pausas)")
+
+    def _detach_session(self) -> IncrementalSession | None:
+        for r in self._all_recorders():
+            r.on_data = None
+        session, self._session = self._session, None
+        return session
+
+    def _try_start_shared(self) -> tuple[object, str] | None:
+        """Graba del stream compartido ya abierto: sin abrir PortAudio ni esperar."""
+        rec = self.shared_recorder
+        if not self.config.get("shared_capture") or rec is None or not rec.available():
+            return None
+        rec.start()
+        if rec.error:
+            self.window.log(f"[REC] stream compartido: {rec.error}")
+            return None
+        return (rec, "shared")
+
+    def _try_start_chain(self) -> tuple[object, str] | None:
+        """Intenta arrancar pyaudio → sd → ffmpeg. Devuelve (recorder, backend) o None.
+
+        Si el perfil guardado de este mic dice que la última vez abrió
+        sounddevice, se prueba primero sd y PyAudio queda de respaldo.
+        """
+        key = self._mic_key(self.recorder.mic_index)
+        prof = self.open_profiles.get(key)
+        order = ["pyaudio", "sd"]
+        if prof is not None and prof.backend == "sd" and self.sd_recorder is not None:
+            order = ["sd", "pyaudio"]
+            self.window.log(f"[REC] perfil guardado: sd @{prof.rate}Hz {prof.channels}ch {prof.dtype}")
+        elif prof is not None:
+            self.window.log(f"[REC] perfil guardado: pyaudio @{prof.rate}Hz {prof.channels}ch")
+
+        for backend in order:
+            if backend == "pyaudio":
+                self.recorder.start()
+                if not self.recorder.error:
+                    return (self.recorder, "pyaudio")
+                self.window.log("PyAudio no pudo abrir el mic.")
+            elif self.sd_recorder is not None:
+                self.sd_recorder.mic_index = self._sd_index(self.recorder.mic_index)
+                self.sd_recorder.device_key = key
+                self.sd_recorder.start()
+                if not self.sd_recorder.error:
+                    return (self.sd_recorder, "sd")
+                self.window.log("sounddevice no pudo abrir el mic.")
 
         # 3) ffmpeg
         if self.ff_recorder is not None:
+            self.window.log("Intento con ffmpeg…")
             # si no hay device configurado, intentar autodetectar el más probable
             if not self.ff_recorder.device_name:
-                devs = list_dshow_input_devices()
+                devs = self.devices.snapshot().dshow
                 if devs:
                     chosen = devs[0]
                     self.ff_recorder.device_name = chosen.name
@@ -349,7 +897,7 @@ class App:
         return None
 
     def start_recording(self) -> None:
-        t = self._current_transcriber()
+        t = self._routed_transcriber()
         self.window.log(f"[REC] toggle ON · servicio={t.name} · mic_index={self.config.get('mic_index')} · hotkey={self.config.get('hotkey')}")
         ok, msg = t.is_ready()
         self.window.log(f"[REC] is_ready -> {ok} · {msg}")
@@ -357,12 +905,20 @@ class App:
             self.window.log(f"No se puede grabar: {msg}")
             self.window.set_status(f"Error: {msg}", color="err")
             return
-        self.window.stop_mic_meter()
-        self.window.log("[REC] VU meter detenido, esperando 250ms para liberar PortAudio…")
-        time.sleep(0.25)
-
-        result = self._try_start_chain()
+        if t is self.local:
+            # si se liberó por inactividad, carga mientras el usuario habla
+            self.local.select()
+        self._start_session(t)
+        result = self._try_start_shared()
         if result is None:
+            self.window.stop_mic_meter()
+            self.window.log("[REC] VU meter detenido, esperando 250ms para liberar PortAudio…")
+            time.sleep(0.25)
+            result = self._try_start_chain()
+        if result is None:
+            session = self._detach_session()
+            if session is not None:
+                session.cancel()
             errs = []
             if self.recorder.error:
                 errs.append(f"pyaudio: {self.recorder.error}")
@@ -377,6 +933,9 @@ class App:
 
         rec, backend = result
         self._backend = backend
+        if self._session is not None and not getattr(rec, "streams_live", True):
+            self.window.log(f"[INC] el backend {backend} no entrega audio en vivo; se transcribe al detener")
+            self._detach_session().cancel()
         self.window.set_recording_button(True)
         self.window.set_status("Grabando…", color="err")
         self.tray.set_state("recording")
@@ -418,16 +977,23 @@ class App:
         rec = self._active_recorder()
         self.window.log(f"[REC] toggle OFF · backend activo={self._backend}")
         pcm = rec.stop()
+        session = self._detach_session()
         self.window.log(f"[REC] stop() devolvió {len(pcm)} bytes de PCM crudo")
         self.window.set_recording_button(False)
         # quitar override de nivel + ticker del tray
         self.window.set_level_override(None)
         self._stop_tray_level_ticker()
         # restaurar VU meters tras dar tiempo a PortAudio a liberar
-        self.root.after(600, self.window.refresh_microphones)
+        # (con el stream compartido el meter nunca se cerró)
+        if self._devices_dirty:
+            self.root.after(600, self._on_devices_changed)
+        elif self._backend != "shared":
+            self.root.after(600, self.window.refresh_microphones)
         if rec.error:
             self.window.log(f"[REC] error en recorder: {rec.error}")
         if not pcm:
+            if session is not None:
+                session.cancel()
             self.window.log("[REC] PCM vacío — no hay nada que transcribir")
             self.window.set_status("Sin audio", color="warn")
             self.tray.set_state("idle")
@@ -436,25 +1002,59 @@ class App:
         seconds = audio_mod.duration_seconds(pcm, sample_rate=rate)
         self.window.log(f"[REC] grabación: {seconds:.2f}s @ {rate} Hz · {len(pcm)} bytes")
 
+        if session is not None:
+            # los trozos ya se recortan y transcriben en la sesión; solo falta el último
+            self.window.log(f"[INC] {session.chunks_sent} trozos enviados durante la grabación")
+            self.window.set_status("Transcribiendo…", color="warn")
+            self.tray.set_state("transcribing")
+            self._start_transcription(pcm, rate, session)
+            return
+
         if self.config.get("trim_silence"):
             before = len(pcm)
-            pcm = audio_mod.trim_silence(pcm, sample_rate=rate)
+            buf = getattr(rec, "buffer", None)
+            if buf is not None and buf.sample_rate == rate:
+                # tabla de RMS armada durante la captura: solo lookup + slice
+                pcm = buf.trim_silence(pcm)
+            else:
+                pcm = audio_mod.trim_silence(pcm, sample_rate=rate)
             self.window.log(f"[REC] trim_silence: {before} -> {len(pcm)} bytes ({audio_mod.duration_seconds(pcm, sample_rate=rate):.2f}s)")
 
         self.window.set_status("Transcribiendo…", color="warn")
         self.tray.set_state("transcribing")
-        threading.Thread(target=self._transcribe_worker, args=(pcm, rate), daemon=True).start()
+        self._start_transcription(pcm, rate)
 
-    def _transcribe_worker(self, pcm: bytes, sample_rate: int) -> None:
-        t = self._current_transcriber()
+    def _transcribe_worker(self, pcm: memoryview, sample_rate: int,
+                           session: IncrementalSession | None = None) -> None:
+        t = self._routed_transcriber()
         lang = self.config.get("language", "es")
         self.window.log(f"[TX] backend='{t.name}' lang='{lang}' · iniciando…")
+        delivery = "whole"   # "whole" | "progressive" | "two_pass"
+        route: Route | None = None
+        missing = 0          # trozos incrementales que no se pudieron transcribir
         try:
-            with audio_mod.pcm_to_wav_temp(pcm, sample_rate=sample_rate) as wav_path:
-                self.window.log(f"[TX] WAV temporal: {wav_path}")
+            if session is not None:
                 t0 = time.perf_counter()
-                result = t.transcribe(wav_path, language=lang)
-                self.window.log(f"[TX] transcribe() OK en {time.perf_counter()-t0:.2f}s")
+                result = session.finish()
+                missing = session.failed_chunks
+                self.window.log(f"[TX] incremental: último trozo + unión en {time.perf_counter()-t0:.2f}s")
+            else:
+                if self.config.get("resample_16k", True):
+                    pcm, sample_rate = self._resample(pcm, sample_rate)
+                audio_s = len(pcm) / (sample_rate * pcm_mod.SAMPLE_WIDTH)
+                if self.config.get("service") == AUTO_SERVICE:
+                    route, t = self._auto_pick(audio_s)
+                t_route = time.perf_counter()
+                if isinstance(t, LocalWhisperTranscriber) and t.two_pass:
+                    result = self._transcribe_two_pass(t, pcm, sample_rate, lang)
+                    delivery = "two_pass"
+                elif self.config.get("progressive_delivery") and isinstance(t, LocalWhisperTranscriber):
+                    result = self._transcribe_progressive(t, pcm, sample_rate, lang)
+                    delivery = "progressive"
+                else:
+                    result = self._transcribe_whole(t, pcm, sample_rate, lang)
+                if route is not None:
+                    self.router.observe(route, audio_s, time.perf_counter() - t_route)
         except TranscriptionError as e:
             tb = traceback.format_exc()
             self.window.log(f"[TX] TranscriptionError: {e}\n{tb}")
@@ -468,13 +1068,174 @@ class App:
             self.tray.set_state("error")
             return
 
-        text = self._format(result.text)
+        # lo ya pegado por frases no se puede reformatear
+        text = self._format(result.text) if delivery == "whole" else result.text.strip()
         self.window.log(f"[TX] resultado ({result.backend} · {result.seconds:.2f}s · {len(text)} chars): {text!r}")
         self.root.after(0, self.log_window.log_transcript, text, result.backend, result.seconds)
-        self._deliver(text)
+        if delivery == "progressive":
+            self._copy_final(text)
+        elif delivery == "whole":
+            self._deliver(text)
+        if missing:
+            self.window.set_status(f"Incompleto: faltan {missing} trozos", color="warn")
+            self.tray.set_state("error")
+            return
         self.window.set_status(f"Listo ({result.seconds:.1f}s)", color="ok")
         self.tray.set_state("ok")
 
+    def _transcribe_progressive(self, t: LocalWhisperTranscriber, pcm: memoryview,
+                                sample_rate: int, lang: str) -> TranscriptionResult:
+        """Entrega el texto por frases mientras el modelo local decodifica."""
+        t0 = time.perf_counter()
+        pieces: list[str] = []
+        pending = ""
+        last_flush = t0
+        first_at: float | None = None
+        for seg in t.stream_pcm(pcm, sample_rate, language=lang):
+            pending += seg.text
+            if seg.duration > 0:
+                pct = min(100.0, seg.end / seg.duration * 100.0)
+                self.window.set_status(f"Transcribiendo… {pct:.0f}%", color="warn")
+            now = time.perf_counter()
+            if pending.rstrip().endswith(SENTENCE_END) or now - last_flush >= PROGRESSIVE_MAX_WAIT_S:
+                if self._deliver_piece(pending.strip(), first=not pieces):
+                    pieces.append(pending.strip())
+                    first_at = first_at or now
+                pending = ""
+                last_flush = now
+        if self._deliver_piece(pending.strip(), first=not pieces):
+            pieces.append(pending.strip())
+            first_at = first_at or time.perf_counter()
+        text = " ".join(pieces)
+        if not text:
+            raise TranscriptionError("Whisper local: sin texto reconocido")
+        elapsed = time.perf_counter() - t0
+        self.window.log(
+            f"[TX] progresivo: {len(pieces)} frases · primera a los {(first_at or t0) - t0:.2f}s "
+            f"· total {elapsed:.2f}s"
+        )
+        return TranscriptionResult(text=text, backend=t.name, seconds=elapsed)
+
+    def _transcribe_two_pass(self, t: LocalWhisperTranscriber, pcm: memoryview,
+                             sample_rate: int, lang: str) -> TranscriptionResult:
+        """Entrega un borrador del modelo chico y después la versión del modelo
+        principal. Se encarga de las dos entregas."""
+        t0 = time.perf_counter()
+        try:
+            draft = t.transcribe_draft(pcm, sample_rate, language=lang)
+        except TranscriptionError as e:
+            self.window.log(f"[TX] borrador no disponible ({e}); una sola pasada")
+            result = self._transcribe_whole(t, pcm, sample_rate, lang)
+            text = self._format(result.text)
+            self._deliver(text)
+            return TranscriptionResult(text=text, backend=result.backend, seconds=result.seconds)
+        draft_text = self._format(draft.text)
+        draft_at = time.perf_counter() - t0
+        self.window.log(f"[TX] borrador ({draft.backend}) a los {draft_at:.2f}s: {draft_text!r}")
+        pasted = self._deliver(draft_text)
+        # si el usuario escribe mientras refinamos, borrar lo pegado rompería su texto
+        watch = self.hotkey.watch_typing() if pasted else None
+        self.window.set_status("Refinando…", color="warn")
+        try:
+            final = t.transcribe_pcm(pcm, sample_rate, language=lang)
+        except TranscriptionError as e:
+            if watch is not None:
+                watch.stop()
+            self.window.log(f"[TX] pasada final falló ({e}); queda el borrador")
+            return TranscriptionResult(text=draft_text, backend=draft.backend, seconds=draft_at)
+        final_at = time.perf_counter() - t0
+        typed = watch.stop() if watch is not None else False
+        # un click o Alt+Tab mueve el foco: los backspaces borrarían otra cosa
+        moved = watch.focus_moved() if watch is not None else False
+        final_text = self._format(final.text)
+        gap = final_at - draft_at
+        if final_text == draft_text:
+            outcome = "igual al borrador"
+        elif pasted and not typed and not moved and gap <= TWO_PASS_REPLACE_MAX_S:
+            self.hotkey.send_backspaces(len(draft_text))
+            self._deliver(final_text)
+            outcome = "borrador reemplazado"
+        else:
+            self._copy_final(final_text)
+            if typed:
+                reason = "hubo teclas"
+            elif moved:
+                reason = "cambió el foco"
+            else:
+                reason = "demasiado tarde" if pasted else "sin auto-paste"
+            outcome = f"solo portapapeles ({reason})"
+        self.window.log(
+            f"[TX] dos pasadas: borrador {draft_at:.2f}s · final {final_at:.2f}s "
+            f"· brecha {gap:.2f}s · {outcome}"
+        )
+        if final_text != draft_text:
+            self.window.log(f"[TX] borrador → final: {draft_text!r} → {final_text!r}")
+        return TranscriptionResult(text=final_text, backend=final.backend, seconds=final_at)
+
+    def _deliver_piece(self, piece: str, first: bool) -> bool:
+        """Pega una frase apenas está lista. Sin auto-paste no hace nada: al
+        final se copia el texto completo."""
+        if not piece:
+            return False
+        if self.config.get("auto_paste"):
+            self._deliver(piece if first else " " + piece)
+        return True
+
+    def _copy_final(self, text: str) -> None:
+        try:
+            pyperclip.copy(text)
+            self.window.log(f"[DELIVER] portapapeles ← texto completo ({len(text)} chars)")
+        except Exception as e:
+            self.window.log(f"[DELIVER] no se pudo copiar: {e}")
+
+    def _resample(self, pcm: "bytes | memoryview", sample_rate: int):
+        if sample_rate == pcm_mod.TARGET_RATE:
+            return pcm, sample_rate
+        before = len(pcm)
+        t0 = time.perf_counter()
+        out, rate = pcm_mod.resample_int16(pcm, sample_rate)
+        if rate == sample_rate:
+            self.window.log(f"[REC] sin numpy ni audioop: se envía a {sample_rate} Hz")
+        else:
+            self.window.log(
+                f"[REC] resample {sample_rate}->{rate} Hz: {before} -> {len(out)} bytes "
+                f"en {(time.perf_counter()-t0)*1000:.0f} ms"
+            )
+        return out, rate
+
+    def _hedge_secondary(self, primary: Transcriber, audio_s: float) -> Transcriber | None:
+        """Backend para duplicar el request si el principal se demora. El
+        local solo sirve si ya está cargado; con el local como principal no se
+        duplica (el audio no sale de la máquina). Mandar el audio a otro
+        proveedor solo si el usuario eligió "Google"."""
+        mode = self.config.get("hedge_backend", "Whisper local")
+        if mode == "off" or isinstance(primary, LocalWhisperTranscriber):
+            return None
+        # "auto" de versiones anteriores: sin Google, que nadie lo eligió
+        options = [{"Whisper local": self.local, "Google": self.google}.get(
+            "Whisper local" if mode == "auto" else mode)]
+        for t in options:
+            if t is None or t is primary:
+                continue
+            if t is self.local and not self.local.loaded:
+                continue
+            if t is self.google and audio_s > GOOGLE_MAX_S:
+                continue   # Google corta el audio: un resultado truncado "ganaría" la carrera
+            breaker = self.breakers.get(t.name)
+            if breaker is not None and not breaker.allow():
+                continue
+            if t.is_ready()[0]:
+                return t
+        return None
+
+    def _transcribe_whole(self, t: Transcriber, pcm: memoryview, sample_rate: int, lang: str):
+        # directo desde memoria: cada backend decide si necesita un WAV
+        t0 = time.perf_counter()
+        secondary = self._hedge_secondary(t, audio_seconds(pcm, sample_rate))
+        result = self.hedger.run(t, secondary, pcm, sample_rate, lang)
+        self.window.log(f"[TX] transcribe_pcm() OK en {time.perf_counter()-t0:.2f}s")
+        return result
+
     @staticmethod
     def _format(text: str) -> str:
         text = (text or "").strip()
@@ -483,26 +1244,29 @@ class App:
             text = text[:-1]
         return text
 
-    def _deliver(self, text: str) -> None:
+    def _deliver(self, text: str) -> bool:
+        """Copia y, con auto-paste, pega. Devuelve True si se mandó el Ctrl+V."""
         if not text:
             self.window.log("[DELIVER] texto vacío, nada que entregar")
-            return
+            return False
         try:
             pyperclip.copy(text)
             self.window.log(f"[DELIVER] portapapeles ← {len(text)} chars")
         except Exception as e:
             tb = traceback.format_exc()
             self.window.log(f"[DELIVER] no se pudo copiar: {e}\n{tb}")
-            return
+            return False
         if self.config.get("auto_paste"):
             try:
                 self.hotkey.send_paste()
                 self.window.log("[DELIVER] auto-paste enviado (Ctrl+V)")
+                return True
             except Exception as e:
                 tb = traceback.format_exc()
                 self.window.log(f"[DELIVER] no se pudo auto-pegar: {e}\n{tb}")
         else:
             self.window.log("[DELIVER] auto-paste desactivado, solo copiado al portapapeles")
+        return False
 
     # ---------------------------------------------------------- ciclo de vida
     def on_window_close(self) -> None:
@@ -517,6 +1281,11 @@ class App:
             self.window.stop_mic_meter()
         except Exception:
             pass
+        self.devices.stop_watch()
+        try:
+            self.local.shutdown()
+        except Exception:
+            pass
         try:
             self.hotkey.unregister()
         except Exception:
@@ -4,21 +4,26 @@ from __future__ import annotations
 import threading
 import wave
 from contextlib import contextmanager
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 from tempfile import NamedTemporaryFile
 from typing import Callable
 
 import pyaudio
 
+from .device_profiles import OpenProfile, OpenProfileCache, device_key
+from . import pcm as pcm_mod
+from .pcm import PCMBuffer
+
 SAMPLE_RATE = 16000
 CHANNELS = 1
 SAMPLE_WIDTH = 2  # 16-bit
 CHUNK = 1024
 FORMAT = pyaudio.paInt16
+OPEN_TIMEOUT = 5.0  # máximo que start() espera a que la cascada abra (o falle)
 
 
-@dataclass
+@dataclass(frozen=True)
 class MicDevice:
     index: int
     name: str
@@ -28,24 +33,45 @@ class MicDevice:
     max_input_channels: int = 1
     default_sample_rate: int = 0
 
+    @property
+    def key(self) -> str | None:
+        """Clave estable (host API + nombre), independiente del índice."""
+        return device_key(self.name, self.host_api_name)
 
-def list_input_devices() -> list[MicDevice]:
-    p = pyaudio.PyAudio()
-    devices: list[MicDevice] = []
+
+@contextmanager
+def _pyaudio(p: "pyaudio.PyAudio | None" = None):
+    """Usa la instancia recibida o crea (y termina) una propia.
+
+    Inicializar PortAudio cuesta 100–400 ms en Windows: quien enumera varias
+    cosas seguidas (ver `devices.DeviceRegistry`) pasa una sola instancia.
+    """
+    if p is not None:
+        yield p
+        return
+    own = pyaudio.PyAudio()
     try:
+        yield own
+    finally:
+        own.terminate()
+
+
+def list_input_devices(p: "pyaudio.PyAudio | None" = None) -> list[MicDevice]:
+    devices: list[MicDevice] = []
+    with _pyaudio(p) as pa:
         try:
-            default_index = p.get_default_input_device_info().get("index", -1)
+            default_index = pa.get_default_input_device_info().get("index", -1)
         except Exception:
             default_index = -1
         host_api_names: dict[int, str] = {}
-        for h in range(p.get_host_api_count()):
+        for h in range(pa.get_host_api_count()):
             try:
-                hinfo = p.get_host_api_info_by_index(h)
+                hinfo = pa.get_host_api_info_by_index(h)
                 host_api_names[int(hinfo.get("index", h))] = str(hinfo.get("name", f"HostApi{h}"))
             except Exception:
                 pass
-        for i in range(p.get_device_count()):
-            info = p.get_device_info_by_index(i)
+        for i in range(pa.get_device_count()):
+            info = pa.get_device_info_by_index(i)
             if int(info.get("maxInputChannels", 0)) > 0:
                 host_api = int(info.get("hostApi", 0))
                 devices.append(
@@ -59,46 +85,58 @@ def list_input_devices() -> list[MicDevice]:
                         default_sample_rate=int(info.get("defaultSampleRate", 0)),
                     )
                 )
-    finally:
-        p.terminate()
     return devices
 
 
-def host_apis_summary() -> str:
+def host_apis_summary(p: "pyaudio.PyAudio | None" = None) -> str:
     """Devuelve un string con info de host APIs y default device, para diagnóstico."""
-    p = pyaudio.PyAudio()
     out: list[str] = []
-    try:
+    with _pyaudio(p) as pa:
         try:
-            d = p.get_default_input_device_info()
+            d = pa.get_default_input_device_info()
             out.append(
                 f"default input: idx={d.get('index')} name={d.get('name')!r} "
                 f"hostApi={d.get('hostApi')} rate={d.get('defaultSampleRate')}"
             )
         except Exception as e:
             out.append(f"default input: ERROR {e}")
-        for h in range(p.get_host_api_count()):
+        for h in range(pa.get_host_api_count()):
             try:
-                hinfo = p.get_host_api_info_by_index(h)
+                hinfo = pa.get_host_api_info_by_index(h)
                 out.append(
                     f"hostApi[{h}]={hinfo.get('name')!r} default_input_idx={hinfo.get('defaultInputDevice')}"
                 )
             except Exception:
                 pass
-    finally:
-        p.terminate()
     return " · ".join(out)
 
 
-def get_default_mic_name() -> str:
-    p = pyaudio.PyAudio()
+def _device_key_from_info(p: pyaudio.PyAudio, info: dict) -> str | None:
+    if not info:
+        return None
     try:
-        info = p.get_default_input_device_info()
-        return str(info.get("name", "Desconocido"))
+        api_name = p.get_host_api_info_by_index(int(info.get("hostApi", 0))).get("name")
     except Exception:
-        return "Desconocido"
-    finally:
-        p.terminate()
+        api_name = None
+    return device_key(info.get("name"), api_name)
+
+
+def default_device_key(p: "pyaudio.PyAudio | None" = None) -> str | None:
+    """Clave estable del mic default del sistema."""
+    with _pyaudio(p) as pa:
+        try:
+            return _device_key_from_info(pa, dict(pa.get_default_input_device_info()))
+        except Exception:
+            return None
+
+
+def get_default_mic_name(p: "pyaudio.PyAudio | None" = None) -> str:
+    with _pyaudio(p) as pa:
+        try:
+            info = pa.get_default_input_device_info()
+            return str(info.get("name", "Desconocido"))
+        except Exception:
+            return "Desconocido"
 
 
 # Prioridad de host API en Windows: WASAPI es lo que usan las apps modernas en
@@ -110,14 +148,14 @@ _HOST_API_PRIORITY = {
 }
 
 
-def list_curated_input_devices() -> list[MicDevice]:
+def curate_input_devices(raw: "list[MicDevice] | tuple[MicDevice, ...]",
+                         default_name: str) -> list[MicDevice]:
     """Devuelve un mic por dispositivo físico, sin duplicados de host API.
 
     Estrategia: preferir WASAPI; si no hay, caer a MME. Dedup por nombre.
     El que queda marcado como default es el que Windows reporta como default
     del sistema (lo mismo que toma cualquier app por defecto).
     """
-    raw = list_input_devices()
     if not raw:
         return []
     for preferred in ("Windows WASAPI", "MME"):
@@ -129,12 +167,9 @@ def list_curated_input_devices() -> list[MicDevice]:
                 if d.name in seen:
                     continue
                 seen.add(d.name)
-                uniq.append(d)
-            default_name = get_default_mic_name()
-            for d in uniq:
-                d.is_default = (d.name == default_name)
+                uniq.append(replace(d, is_default=(d.name == default_name)))
             if not any(d.is_default for d in uniq):
-                uniq[0].is_default = True
+                uniq[0] = replace(uniq[0], is_default=True)
             uniq.sort(key=lambda x: (not x.is_default, x.name.lower()))
             return uniq
     # último recurso: lo que haya, dedup por nombre
@@ -148,18 +183,28 @@ def list_curated_input_devices() -> list[MicDevice]:
     return out
 
 
+def list_curated_input_devices(p: "pyaudio.PyAudio | None" = None) -> list[MicDevice]:
+    with _pyaudio(p) as pa:
+        return curate_input_devices(list_input_devices(pa), get_default_mic_name(pa))
+
+
 class AudioRecorder:
-    """Grabador push-to-toggle. Acumula PCM en memoria hasta stop()."""
+    """Grabador push-to-toggle. Acumula PCM en un `PCMBuffer` hasta stop()."""
 
     def __init__(self, mic_index: int = -1, log_fn: "Callable[[str], None] | None" = None) -> None:
         self.mic_index = mic_index
         self.log_fn = log_fn or (lambda _msg: None)
-        self._frames: list[bytes] = []
+        self._buffer = PCMBuffer()
         self._recording = False
         self._thread: threading.Thread | None = None
         self._error: str | None = None
         self._sample_rate_used: int = SAMPLE_RATE
         self._level: float = 0.0
+        self._opened = threading.Event()
+        # sumidero opcional de cada bloque capturado (transcripción incremental)
+        self.on_data: Callable[[bytes], None] | None = None
+        # cache persistente del combo que abrió la última vez (lo inyecta el App)
+        self.profiles: OpenProfileCache | None = None
 
     @property
     def recording(self) -> bool:
@@ -177,22 +222,31 @@ class AudioRecorder:
     def level(self) -> float:
         return self._level
 
+    @property
+    def buffer(self) -> PCMBuffer:
+        """Buffer de la grabación actual (o la última), con su tabla de RMS."""
+        return self._buffer
+
     def start(self) -> None:
         if self._recording:
             return
-        self._frames = []
+        # buffer nuevo: la vista devuelta por el stop() anterior sigue intacta
+        self._buffer = PCMBuffer()
         self._error = None
         self._recording = True
+        self._opened.clear()
         self._thread = threading.Thread(target=self._loop, daemon=True)
         self._thread.start()
+        # esperar a que la cascada abra o falle: así `error` es confiable al volver
+        self._opened.wait(timeout=OPEN_TIMEOUT)
 
-    def stop(self) -> bytes:
+    def stop(self) -> memoryview:
         if not self._recording:
-            return b"".join(self._frames)
+            return self._buffer.view()
         self._recording = False
         if self._thread is not None:
             self._thread.join(timeout=2.0)
-        return b"".join(self._frames)
+        return self._buffer.view()
 
     def _device_info(self, p: pyaudio.PyAudio, idx: int) -> dict:
         try:
@@ -235,8 +289,23 @@ class AudioRecorder:
             info = self._device_info(p, self.mic_index) if self.mic_index is not None and self.mic_index >= 0 else {}
             native_rate = int(info.get("defaultSampleRate", 0)) or 44100
             native_ch = int(info.get("maxInputChannels", 1)) or 1
+            has_idx = self.mic_index is not None and self.mic_index >= 0
+            if not info:
+                try:
+                    info = dict(p.get_default_input_device_info())
+                except Exception:
+                    info = {}
+            key = _device_key_from_info(p, info)
 
             attempts: list[tuple[str, int | None, int, int]] = []
+            # 0) perfil que funcionó la última vez con este device
+            prof = self.profiles.get(key) if self.profiles is not None else None
+            if prof is not None and prof.backend == "pyaudio":
+                attempts.append((f"PERFIL @{prof.rate}Hz {prof.channels}ch",
+                                 None if (prof.use_default or not has_idx) else self.mic_index,
+                                 prof.rate, prof.channels))
+            else:
+                prof = None
             # 1) Modo nativo del device (lo que WASAPI/MME esperan en shared mode)
             if self.mic_index is not None and self.mic_index >= 0:
                 attempts.append((f"device idx={self.mic_index} NATIVO @{native_rate}Hz {native_ch}ch",
@@ -261,9 +330,11 @@ class AudioRecorder:
             # 5) último recurso
             attempts.append(("DEFAULT @44100Hz 1ch", None, 44100, 1))
             attempts.append(("DEFAULT @16kHz 1ch", None, SAMPLE_RATE, 1))
+            seen: set = set()
+            attempts = [a for a in attempts if not (a[1:] in seen or seen.add(a[1:]))]
 
             last_err = None
-            for label, idx, rate, channels in attempts:
+            for n, (label, idx, rate, channels) in enumerate(attempts):
                 ainfo = self._device_info(p, idx) if idx is not None else {}
                 self.log_fn(
                     f"Abriendo mic [{label}] hostApi={ainfo.get('hostApi')} "
@@ -272,13 +343,22 @@ class AudioRecorder:
                 try:
                     stream = self._try_open(p, idx, rate, channels)
                     self._sample_rate_used = rate
+                    self._buffer.set_sample_rate(rate)
                     captured_channels = channels
                     self.log_fn(f"Mic abierto OK con [{label}].")
+                    if self.profiles is not None:
+                        self.profiles.remember(key, OpenProfile(
+                            backend="pyaudio", rate=rate, channels=channels,
+                            use_default=(idx is None and has_idx),
+                        ))
                     break
                 except Exception as e:
                     last_err = e
                     self.log_fn(f"Falló [{label}]: {self._describe_error(e)}")
                     stream = None
+                    if n == 0 and prof is not None and self.profiles is not None:
+                        self.log_fn("Perfil guardado ya no sirve; se descarta y sigue la cascada completa.")
+                        self.profiles.forget(key)
 
             if stream is None:
                 hint = ""
@@ -292,26 +372,27 @@ class AudioRecorder:
                     f"No se pudo abrir ningún micrófono. Último error: "
                     f"{self._describe_error(last_err) if last_err else 'desconocido'}.{hint}"
                 )
+                self._recording = False
                 return
+            self._opened.set()
 
-            import audioop
             while self._recording:
                 try:
                     data = stream.read(CHUNK, exception_on_overflow=False)
                     if captured_channels > 1:
                         try:
-                            data = audioop.tomono(data, SAMPLE_WIDTH, 0.5, 0.5)
+                            data = pcm_mod.to_mono_int16(data, captured_channels)
+                        except Exception:
+                            pass
+                    self._buffer.append(data)
+                    sink = self.on_data
+                    if sink is not None:
+                        try:
+                            sink(data)
                         except Exception:
                             pass
-                    self._frames.append(data)
                     try:
-                        rms = audioop.rms(data, SAMPLE_WIDTH)
-                        new_lvl = min(1.0, rms / 4000.0)
-                        # subir rápido, bajar suave
-                        if new_lvl > self._level:
-                            self._level = new_lvl
-                        else:
-                            self._level = self._level * 0.78 + new_lvl * 0.22
+                        self._level = pcm_mod.level_from_rms(self._level, pcm_mod.rms_int16(data))
                     except Exception:
                         pass
                 except Exception as e:
@@ -321,6 +402,7 @@ class AudioRecorder:
         except Exception as e:
             self._error = f"No se pudo abrir el micrófono: {self._describe_error(e)}"
         finally:
+            self._opened.set()
             if stream is not None:
                 try:
                     stream.stop_stream()
@@ -330,60 +412,30 @@ class AudioRecorder:
             p.terminate()
 
 
-def trim_silence(pcm: bytes, threshold: int | None = None,
+def trim_silence(pcm: "bytes | memoryview", threshold: int | None = None,
                  sample_width: int = SAMPLE_WIDTH,
-                 sample_rate: int = SAMPLE_RATE) -> bytes:
+                 sample_rate: int = SAMPLE_RATE) -> "bytes | memoryview":
     """Recorta silencios al inicio y al final basándose en amplitud relativa.
 
+    Con un memoryview trabaja sobre vistas: el resultado es un slice sin copia.
+
     Si `threshold` es None, calcula uno adaptativo según el pico de la grabación
     (15% del RMS máximo, con piso 120). Esto evita comerse audio en mics
     silenciosos donde un threshold fijo es demasiado alto.
+
+    Recorre el audio una vez para armar la tabla de RMS. Los recorders ya la
+    llevan al día en su `PCMBuffer`: al detener conviene `buffer.trim_silence()`.
     """
     if not pcm or sample_width != 2:
         return pcm
-    import audioop
     try:
-        # ventana 50 ms al sample rate REAL
-        win = int(sample_rate * 0.05) * sample_width
-        if win <= 0 or win > len(pcm):
-            return pcm
-        # threshold adaptativo: 15% del pico, mínimo 120
-        if threshold is None:
-            peak = 0
-            scan_pos = 0
-            while scan_pos + win <= len(pcm):
-                rms_v = audioop.rms(pcm[scan_pos:scan_pos + win], sample_width)
-                if rms_v > peak:
-                    peak = rms_v
-                scan_pos += win
-            threshold = max(120, int(peak * 0.15))
-            # si el pico es realmente bajo, no recortes nada (mic silencioso)
-            if peak < 200:
-                return pcm
-        start = 0
-        end = len(pcm)
-        while start + win <= end:
-            if audioop.rms(pcm[start:start + win], sample_width) > threshold:
-                break
-            start += win
-        while end - win > start:
-            if audioop.rms(pcm[end - win:end], sample_width) > threshold:
-                break
-            end -= win
-        # padding 200 ms a cada lado para no cortar consonantes
-        pad = int(sample_rate * 0.2) * sample_width
-        start = max(0, start - pad)
-        end = min(len(pcm), end + pad)
-        # safety: si quedaría < 25% del original, mejor devolver el original
-        if (end - start) < len(pcm) * 0.25:
-            return pcm
-        return pcm[start:end] if end > start else pcm
+        return pcm_mod.trim_silence(pcm, threshold=threshold, sample_rate=sample_rate)
     except Exception:
         return pcm
 
 
 @contextmanager
-def pcm_to_wav_temp(pcm: bytes, sample_rate: int = SAMPLE_RATE):
+def pcm_to_wav_temp(pcm: "bytes | memoryview", sample_rate: int = SAMPLE_RATE):
     """Escribe PCM crudo a un WAV temporal y lo elimina al salir."""
     tmp = NamedTemporaryFile(delete=False, suffix=".wav")
     tmp.close()
@@ -402,7 +454,7 @@ def pcm_to_wav_temp(pcm: bytes, sample_rate: int = SAMPLE_RATE):
             pass
 
 
-def duration_seconds(pcm: bytes, sample_rate: int = SAMPLE_RATE) -> float:
+def duration_seconds(pcm: "bytes | memoryview", sample_rate: int = SAMPLE_RATE) -> float:
     if not pcm:
         return 0.0
     return len(pcm) / (sample_rate * SAMPLE_WIDTH * CHANNELS)
@@ -19,6 +19,12 @@ from pathlib import Path
 from tempfile import NamedTemporaryFile
 from typing import Callable
 
+from .pcm import PCMBuffer, level_from_rms, rms_int16
+
+PIPE_RATE = 16000
+PIPE_BLOCK = 1600 * 2  # 100 ms de s16le mono @16 kHz por lectura
+PIPE_DRAIN_S = 0.4     # al detener, cuánto esperar la cola que ffmpeg todavía tiene en buffer
+
 
 def find_ffmpeg() -> str | None:
     """Busca ffmpeg en PATH o en el cwd."""
@@ -87,27 +93,57 @@ def list_dshow_input_devices() -> list[FFDevice]:
 
 
 class FFmpegRecorder:
-    """Graba con ffmpeg → WAV temporal en disco. PCM s16le mono 16 kHz."""
+    """Graba con ffmpeg. PCM s16le mono 16 kHz.
+
+    Dos modos:
+    - pipe (default): ffmpeg escribe s16le crudo a stdout; un hilo lector lo
+      vuelca al `PCMBuffer` y calcula el nivel en vivo. stop() espera como
+      mucho `PIPE_DRAIN_S` a que llegue la cola del audio, sin WAV en disco
+      (ni escaneo del AV sobre el temporal). Cada grabación tiene su buffer
+      y su lector: uno viejo que sigue drenando no escribe en la siguiente.
+    - WAV: ffmpeg escribe un WAV temporal que se relee al detener (legacy).
+    """
 
     def __init__(self, device_name: str | None = None,
-                 log_fn: Callable[[str], None] | None = None) -> None:
+                 log_fn: Callable[[str], None] | None = None,
+                 pipe: bool = True) -> None:
         self.device_name = device_name
         self.log_fn = log_fn or (lambda _msg: None)
+        self.pipe = pipe
         self._proc: subprocess.Popen | None = None
         self._wav_path: Path | None = None
-        self._frames_buf: bytes = b""
+        self._buffer = PCMBuffer()
+        self._reader: threading.Thread | None = None
+        self._closed = threading.Event()   # de la sesión de pipe en curso
         self._error: str | None = None
         self._sample_rate_used: int = 16000
         self._recording = False
+        self._level: float = 0.0
+        # sumidero opcional de cada bloque capturado (solo en modo pipe)
+        self.on_data: Callable[[bytes], None] | None = None
 
     @property
     def recording(self) -> bool:
         return self._recording
 
+    @property
+    def level(self) -> float:
+        return self._level
+
+    @property
+    def streams_live(self) -> bool:
+        """True si entrega audio mientras graba (modo pipe)."""
+        return self.pipe
+
     @property
     def error(self) -> str | None:
         return self._error
 
+    @property
+    def buffer(self) -> PCMBuffer | None:
+        """Buffer del modo pipe con su tabla de RMS (None en modo WAV)."""
+        return self._buffer if self.pipe else None
+
     @property
     def sample_rate(self) -> int:
         return self._sample_rate_used
@@ -136,30 +172,45 @@ class FFmpegRecorder:
             self._error = "No hay device DirectShow seleccionado para ffmpeg."
             return
 
-        # WAV temporal de salida
-        tmp = NamedTemporaryFile(delete=False, suffix=".wav")
-        tmp.close()
-        self._wav_path = Path(tmp.name)
         self._error = None
-
         device_arg = f'audio={self.device_name}'
-        cmd = [
-            exe, "-hide_banner", "-loglevel", "warning",
-            "-y",
-            "-f", "dshow",
-            "-i", device_arg,
-            "-ac", "1",
-            "-ar", "16000",
-            "-acodec", "pcm_s16le",
-            str(self._wav_path),
-        ]
-        self.log_fn(f"[ffmpeg] iniciando: {' '.join(cmd[:7])} … {self._wav_path.name}")
+        if self.pipe:
+            self._buffer = PCMBuffer(sample_rate=PIPE_RATE)
+            cmd = [
+                exe, "-hide_banner", "-loglevel", "warning",
+                # buffer de dshow chico: los bloques llegan cada ~50 ms, no cada 500
+                "-f", "dshow", "-audio_buffer_size", "50",
+                "-i", device_arg,
+                "-ac", "1",
+                "-ar", str(PIPE_RATE),
+                "-f", "s16le",
+                "-acodec", "pcm_s16le",
+                "pipe:1",
+            ]
+            target = "pipe:1"
+        else:
+            # WAV temporal de salida
+            tmp = NamedTemporaryFile(delete=False, suffix=".wav")
+            tmp.close()
+            self._wav_path = Path(tmp.name)
+            cmd = [
+                exe, "-hide_banner", "-loglevel", "warning",
+                "-y",
+                "-f", "dshow",
+                "-i", device_arg,
+                "-ac", "1",
+                "-ar", "16000",
+                "-acodec", "pcm_s16le",
+                str(self._wav_path),
+            ]
+            target = self._wav_path.name
+        self.log_fn(f"[ffmpeg] iniciando: {' '.join(cmd[:7])} … {target}")
 
         try:
             self._proc = subprocess.Popen(
                 cmd,
                 stdin=subprocess.PIPE,
-                stdout=subprocess.DEVNULL,
+                stdout=subprocess.PIPE if self.pipe else subprocess.DEVNULL,
                 stderr=subprocess.PIPE,
                 creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
             )
@@ -171,6 +222,42 @@ class FFmpegRecorder:
         threading.Thread(target=self._drain_stderr, daemon=True).start()
         self._recording = True
         self._sample_rate_used = 16000
+        if self.pipe:
+            self._closed = threading.Event()
+            self._reader = threading.Thread(
+                target=self._read_stdout, args=(self._proc, self._buffer, self._closed), daemon=True
+            )
+            self._reader.start()
+
+    def _read_stdout(self, proc: subprocess.Popen, buf: PCMBuffer, closed: threading.Event) -> None:
+        """Hilo lector del modo pipe: stdout → PCMBuffer + nivel + sumidero.
+        `buf` y `closed` son de esta grabación, no del recorder."""
+        out = proc.stdout
+        if out is None:
+            return
+        while True:
+            try:
+                data = out.read(PIPE_BLOCK)
+            except Exception:
+                break
+            if not data:
+                break
+            if closed.is_set():
+                # seguir drenando hasta EOF para que ffmpeg no se trabe escribiendo
+                continue
+            buf.append(data)
+            sink = self.on_data
+            if sink is not None:
+                try:
+                    sink(data)
+                except Exception:
+                    pass
+            try:
+                self._level = level_from_rms(self._level, rms_int16(data))
+            except Exception:
+                pass
+        if not closed.is_set():
+            self._level = 0.0
 
     def _drain_stderr(self) -> None:
         if self._proc is None or self._proc.stderr is None:
@@ -183,7 +270,9 @@ class FFmpegRecorder:
             if txt:
                 self.log_fn(f"[ffmpeg] {txt}")
 
-    def stop(self) -> bytes:
+    def stop(self) -> memoryview:
+        if self.pipe:
+            return self._stop_pipe()
         if not self._recording or self._proc is None:
             return self._read_wav_pcm()
         self._recording = False
@@ -204,16 +293,57 @@ class FFmpegRecorder:
                 pass
         return self._read_wav_pcm()
 
-    def _read_wav_pcm(self) -> bytes:
+    def _stop_pipe(self) -> memoryview:
+        """Corta la captura y devuelve lo leído. Con `q` ffmpeg vuelca lo que
+        tiene en buffer y cierra stdout: se espera al lector hasta EOF o
+        `PIPE_DRAIN_S`, lo que pase primero. La salida del proceso no se espera."""
+        proc = self._proc
+        if not self._recording or proc is None:
+            return self._buffer.view()
+        self._recording = False
+        self._proc = None
+        self._send_quit(proc)
+        if self._reader is not None:
+            self._reader.join(timeout=PIPE_DRAIN_S)
+            self._reader = None
+        self._closed.set()
+        self._level = 0.0
+        pcm = self._buffer.view()
+        threading.Thread(target=self._reap, args=(proc,), daemon=True).start()
+        return pcm
+
+    @staticmethod
+    def _send_quit(proc: subprocess.Popen) -> None:
+        try:
+            if proc.stdin is not None:
+                proc.stdin.write(b"q")
+                proc.stdin.flush()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _reap(proc: subprocess.Popen) -> None:
+        """Espera en background a que ffmpeg salga (terminate si no responde)."""
+        try:
+            proc.wait(timeout=3.0)
+        except subprocess.TimeoutExpired:
+            try:
+                proc.terminate()
+                proc.wait(timeout=2.0)
+            except Exception:
+                pass
+
+    def _read_wav_pcm(self) -> memoryview:
         if self._wav_path is None or not self._wav_path.exists():
-            return b""
+            return memoryview(b"")
         try:
             with wave.open(str(self._wav_path), "rb") as wf:
                 self._sample_rate_used = wf.getframerate()
-                pcm = wf.readframes(wf.getnframes())
+                # una sola lectura; el resto del pipeline trabaja sobre vistas
+                pcm = memoryview(wf.readframes(wf.getnframes()))
         except Exception as e:
             self._error = f"No se pudo leer WAV: {e}"
-            pcm = b""
+            pcm = memoryview(b"")
         finally:
             try:
                 if self._wav_path is not None:
@@ -7,8 +7,12 @@ from __future__ import annotations
 
 import threading
 import time
+from collections import deque
 from typing import Callable
 
+from .device_profiles import OpenProfile, OpenProfileCache
+from .pcm import PCMBuffer
+
 try:
     import numpy as np
     import sounddevice as sd
@@ -18,6 +22,49 @@ except Exception:
     np = None  # type: ignore
     SD_AVAILABLE = False
 
+# índice para un mic elegido que sounddevice no tiene: start() falla en vez de
+# abrir el default del sistema (la cadena de recorders pasa al siguiente)
+NO_MATCH = -2
+NO_MATCH_ERROR = "sounddevice no encuentra el mic elegido"
+
+
+def find_sd_input(key: str | None, inputs=None) -> int | None:
+    """Índice de sounddevice para la clave estable "hostApi|nombre".
+
+    Los índices de PyAudio y sounddevice no coinciden (cada uno enumera su
+    propio PortAudio), así que se traduce por nombre + host API. MME recorta
+    los nombres a 31 caracteres: si no hay match exacto se acepta un prefijo.
+    `inputs` (lista de `devices.SDInput`) evita volver a consultar PortAudio.
+    """
+    if not SD_AVAILABLE or not key:
+        return None
+    api_name, _, name = key.partition("|")
+    if inputs is None:
+        try:
+            apis = sd.query_hostapis()
+            inputs = []
+            for i, d in enumerate(sd.query_devices()):
+                if int(d.get("max_input_channels", 0)) <= 0:
+                    continue
+                try:
+                    d_api = str(apis[int(d.get("hostapi", 0))]["name"])
+                except Exception:
+                    d_api = ""
+                inputs.append((i, str(d.get("name", "")), d_api))
+        except Exception:
+            return None
+    else:
+        inputs = [(d.index, d.name, d.host_api_name) for d in inputs]
+    fallback: int | None = None
+    for i, d_name, d_api in inputs:
+        if d_api != api_name:
+            continue
+        if d_name == name:
+            return i
+        if fallback is None and (d_name.startswith(name) or name.startswith(d_name)):
+            fallback = i
+    return fallback
+
 
 class SDRecorder:
     """Recorder con sounddevice. PCM int16 mono."""
@@ -25,13 +72,17 @@ class SDRecorder:
     def __init__(self, mic_index: int = -1, log_fn: Callable[[str], None] | None = None) -> None:
         self.mic_index = mic_index
         self.log_fn = log_fn or (lambda _msg: None)
-        self._frames: list[bytes] = []
+        self._buffer = PCMBuffer()
         self._recording = False
         self._stream = None
         self._error: str | None = None
         self._sample_rate_used: int = 16000
-        self._lock = threading.Lock()
         self._level: float = 0.0
+        # sumidero opcional de cada bloque capturado (transcripción incremental)
+        self.on_data: Callable[[bytes], None] | None = None
+        # cache persistente del combo que abrió la última vez (lo inyecta el App)
+        self.profiles: OpenProfileCache | None = None
+        self.device_key: str | None = None
 
     @property
     def level(self) -> float:
@@ -49,6 +100,11 @@ class SDRecorder:
     def sample_rate(self) -> int:
         return self._sample_rate_used
 
+    @property
+    def buffer(self) -> PCMBuffer:
+        """Buffer de la grabación actual (o la última), con su tabla de RMS."""
+        return self._buffer
+
     def _device_info(self, idx: int) -> dict:
         try:
             return dict(sd.query_devices(idx))
@@ -61,8 +117,12 @@ class SDRecorder:
             return
         if self._recording:
             return
-        self._frames = []
+        # buffer nuevo: la vista devuelta por el stop() anterior sigue intacta
+        self._buffer = PCMBuffer()
         self._error = None
+        if self.mic_index == NO_MATCH:
+            self._error = NO_MATCH_ERROR
+            return
 
         idx = self.mic_index if (self.mic_index is not None and self.mic_index >= 0) else None
         info = self._device_info(idx) if idx is not None else {}
@@ -82,6 +142,15 @@ class SDRecorder:
         rate_ch = [x for x in rate_ch if not (x in seen or seen.add(x))]
 
         attempts: list[tuple[str, int | None, int, int, str]] = []
+        # perfil que funcionó la última vez con este device
+        prof = self.profiles.get(self.device_key) if self.profiles is not None else None
+        if prof is not None and prof.backend == "sd":
+            dev = None if (prof.use_default or idx is None) else idx
+            attempts.append((f"PERFIL idx={dev if dev is not None else 'DEFAULT'} "
+                             f"@{prof.rate}Hz {prof.channels}ch {prof.dtype}",
+                             dev, prof.rate, prof.channels, prof.dtype))
+        else:
+            prof = None
         for rate, ch in rate_ch:
             for dtype in ("float32", "int16"):
                 lab = f"idx={idx if idx is not None else 'DEFAULT'} @{rate}Hz {ch}ch {dtype}"
@@ -92,10 +161,14 @@ class SDRecorder:
                 for dtype in ("float32", "int16"):
                     lab = f"idx=DEFAULT @{rate}Hz {ch}ch {dtype}"
                     attempts.append((lab, None, rate, ch, dtype))
+        seen_a: set = set()
+        attempts = [a for a in attempts if not (a[1:] in seen_a or seen_a.add(a[1:]))]
 
         last_err: Exception | None = None
-        for label, dev, rate, ch, dtype in attempts:
+        for n, (label, dev, rate, ch, dtype) in enumerate(attempts):
             self.log_fn(f"[sd] Abriendo {label}")
+            # antes de abrir: el primer callback ya alimenta la tabla de RMS
+            self._buffer.set_sample_rate(rate)
             try:
                 stream = sd.InputStream(
                     samplerate=rate,
@@ -110,11 +183,19 @@ class SDRecorder:
                 self._sample_rate_used = rate
                 self._recording = True
                 self.log_fn(f"[sd] Mic abierto OK con {label}.")
+                if self.profiles is not None:
+                    self.profiles.remember(self.device_key, OpenProfile(
+                        backend="sd", rate=rate, channels=ch, dtype=dtype,
+                        use_default=(dev is None and idx is not None),
+                    ))
                 return
             except Exception as e:
                 last_err = e
                 self.log_fn(f"[sd] Falló {label}: {e}")
                 self._stream = None
+                if n == 0 and prof is not None and self.profiles is not None:
+                    self.log_fn("[sd] Perfil guardado ya no sirve; se descarta y sigue la cascada completa.")
+                    self.profiles.forget(self.device_key)
 
         self._error = f"sounddevice no pudo abrir el mic. Último error: {last_err}"
 
@@ -136,8 +217,10 @@ class SDRecorder:
                         arr_i16 = arr.mean(axis=1).astype("int16")
                     else:
                         arr_i16 = arr.reshape(-1).astype("int16")
-                with self._lock:
-                    self._frames.append(arr_i16.tobytes())
+                self._buffer.append(arr_i16)
+                sink = self.on_data
+                if sink is not None:
+                    sink(memoryview(arr_i16).cast("B"))
                 # nivel
                 try:
                     if arr_i16.size:
@@ -153,7 +236,7 @@ class SDRecorder:
                 self.log_fn(f"[sd] error en callback: {e}")
         return cb
 
-    def stop(self) -> bytes:
+    def stop(self) -> memoryview:
         self._recording = False
         self._level = 0.0
         if self._stream is not None:
@@ -163,8 +246,7 @@ class SDRecorder:
             except Exception:
                 pass
             self._stream = None
-        with self._lock:
-            return b"".join(self._frames)
+        return self._buffer.view()
 
 
 class SDLiveMeter:
@@ -200,6 +282,9 @@ class SDLiveMeter:
                 self._error = "sounddevice no disponible"
             return
         self._error = None
+        if self.mic_index == NO_MATCH:
+            self._error = NO_MATCH_ERROR
+            return
         idx = self.mic_index if (self.mic_index is not None and self.mic_index >= 0) else None
         try:
             info = sd.query_devices(idx) if idx is not None else sd.query_devices(kind="input")
@@ -272,3 +357,248 @@ class SDLiveMeter:
             self._stream = None
 
 
+
+
+class SDCaptureEngine:
+    """Stream de captura persistente de un mic, compartido por VU y recorder.
+
+    Expone la misma API que `SDLiveMeter` (start/stop/running/level/error) para
+    que la ventana principal lo use como meter. Mientras corre guarda los
+    últimos `preroll_ms` en un ring de bloques; al grabar, `begin()` arranca un
+    `PCMBuffer` nuevo con ese pre-roll y el callback empieza a copiar ahí. Así
+    grabar no abre ni cierra PortAudio y la primera sílaba no se pierde.
+    """
+
+    def __init__(self, mic_index: int | None, log_fn: Callable[[str], None] | None = None,
+                 preroll_ms: int = 300):
+        self.mic_index = mic_index
+        self.log_fn = log_fn or (lambda _msg: None)
+        self.preroll_ms = preroll_ms
+        self._stream = None
+        self._level = 0.0
+        self._error: str | None = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._sample_rate_used: int = 16000
+        self._ring: deque = deque()
+        self._ring_bytes = 0
+        self._target: PCMBuffer | None = None
+        self._sink: Callable[[memoryview], None] | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    @property
+    def level(self) -> float:
+        return self._level
+
+    @property
+    def error(self) -> str | None:
+        return self._error
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate_used
+
+    @property
+    def capturing(self) -> bool:
+        return self._target is not None
+
+    def start(self) -> None:
+        if self._running or not SD_AVAILABLE:
+            if not SD_AVAILABLE:
+                self._error = "sounddevice no disponible"
+            return
+        self._error = None
+        if self.mic_index == NO_MATCH:
+            self._error = NO_MATCH_ERROR
+            return
+        idx = self.mic_index if (self.mic_index is not None and self.mic_index >= 0) else None
+        try:
+            info = sd.query_devices(idx) if idx is not None else sd.query_devices(kind="input")
+        except Exception as e:
+            self._error = f"query_devices falló: {e}"
+            return
+        native_rate = int(info.get("default_samplerate", 0) or 16000)
+        native_ch = int(info.get("max_input_channels", 1) or 1)
+
+        attempts: list[tuple[int, int, str]] = []
+        for rate, ch in [(native_rate, native_ch), (native_rate, 1), (48000, 1), (16000, 1)]:
+            for dtype in ("float32", "int16"):
+                attempts.append((rate, ch, dtype))
+        seen: set = set()
+        attempts = [a for a in attempts if not (a in seen or seen.add(a))]
+
+        last_err: Exception | None = None
+        for rate, ch, dtype in attempts:
+            try:
+                stream = sd.InputStream(
+                    samplerate=rate,
+                    channels=ch,
+                    dtype=dtype,
+                    device=idx,
+                    blocksize=512,
+                    callback=self._make_callback(ch, dtype),
+                )
+                stream.start()
+                self._stream = stream
+                self._sample_rate_used = rate
+                self._running = True
+                self.log_fn(f"[capture] stream compartido abierto idx={idx if idx is not None else 'DEFAULT'} "
+                            f"@{rate}Hz {ch}ch {dtype}")
+                return
+            except Exception as e:
+                last_err = e
+                continue
+        self._error = f"no se pudo abrir el stream compartido: {last_err}"
+
+    def _make_callback(self, channels: int, dtype: str):
+        def cb(indata, _frames, _time, status):
+            if status:
+                self.log_fn(f"[capture] status: {status}")
+            try:
+                arr = indata
+                if dtype == "float32":
+                    arr = arr.mean(axis=1) if channels > 1 else arr.reshape(-1)
+                    arr_i16 = (np.clip(arr, -1.0, 1.0) * 32767.0).astype("int16")
+                else:
+                    arr = arr.mean(axis=1) if channels > 1 else arr.reshape(-1)
+                    arr_i16 = arr.astype("int16")
+                block = memoryview(arr_i16).cast("B")
+                rms = float(np.sqrt(np.mean(arr_i16.astype("int32") ** 2))) if arr_i16.size else 0.0
+                level = min(1.0, rms / 4000.0)
+                with self._lock:
+                    if level > self._level:
+                        self._level = level
+                    else:
+                        self._level = self._level * 0.82 + level * 0.18
+                    target = self._target
+                    if target is None:
+                        self._push_preroll(block)
+                    else:
+                        target.append(block)
+                    sink = self._sink
+                if target is not None and sink is not None:
+                    sink(block)
+            except Exception as e:
+                self.log_fn(f"[capture] callback err: {e}")
+        return cb
+
+    def _push_preroll(self, block: memoryview) -> None:
+        limit = int(self._sample_rate_used * 2 * self.preroll_ms / 1000)
+        if limit <= 0:
+            return
+        self._ring.append(block)
+        self._ring_bytes += block.nbytes
+        while self._ring and self._ring_bytes - self._ring[0].nbytes >= limit:
+            self._ring_bytes -= self._ring.popleft().nbytes
+
+    def begin(self, sink: Callable[[memoryview], None] | None = None) -> PCMBuffer:
+        """Empieza a copiar frames a un buffer nuevo, arrancando con el pre-roll."""
+        buf = PCMBuffer(sample_rate=self._sample_rate_used)
+        with self._lock:
+            limit = int(self._sample_rate_used * 2 * self.preroll_ms / 1000)
+            blocks = list(self._ring)
+            skip = max(0, self._ring_bytes - limit)
+            for block in blocks:
+                if skip >= block.nbytes:
+                    skip -= block.nbytes
+                    continue
+                buf.append(block[skip - skip % 2:])
+                skip = 0
+            self._ring.clear()
+            self._ring_bytes = 0
+            self._target = buf
+            self._sink = sink
+        if sink is not None and len(buf):
+            sink(buf.view())
+        return buf
+
+    def end(self) -> memoryview:
+        """Deja de copiar y devuelve lo grabado (pre-roll incluido)."""
+        with self._lock:
+            buf, self._target, self._sink = self._target, None, None
+        return buf.view() if buf is not None else memoryview(b"")
+
+    def stop(self) -> None:
+        self._running = False
+        self._level = 0.0
+        with self._lock:
+            self._target = None
+            self._sink = None
+            self._ring.clear()
+            self._ring_bytes = 0
+        if self._stream is not None:
+            try:
+                self._stream.stop()
+                self._stream.close()
+            except Exception:
+                pass
+            self._stream = None
+
+
+class SharedRecorder:
+    """Recorder sobre el `SDCaptureEngine` ya abierto (misma API que SDRecorder).
+
+    start() no abre ningún stream: solo le pide al engine que empiece a copiar.
+    """
+
+    def __init__(self, engine_fn: Callable[[], "SDCaptureEngine | None"],
+                 log_fn: Callable[[str], None] | None = None) -> None:
+        self._engine_fn = engine_fn
+        self.log_fn = log_fn or (lambda _msg: None)
+        self._engine: SDCaptureEngine | None = None
+        self._buffer = PCMBuffer()
+        self._recording = False
+        self._error: str | None = None
+        self._sample_rate_used: int = 16000
+        self.mic_index: int = -1
+        # sumidero opcional de cada bloque capturado (transcripción incremental)
+        self.on_data: Callable[[bytes], None] | None = None
+
+    @property
+    def recording(self) -> bool:
+        return self._recording
+
+    @property
+    def error(self) -> str | None:
+        return self._error
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate_used
+
+    @property
+    def level(self) -> float:
+        return self._engine.level if self._engine is not None else 0.0
+
+    @property
+    def buffer(self) -> PCMBuffer:
+        """Buffer de la grabación actual (o la última), con su tabla de RMS."""
+        return self._buffer
+
+    def available(self) -> bool:
+        eng = self._engine_fn()
+        return eng is not None and eng.running
+
+    def start(self) -> None:
+        if self._recording:
+            return
+        self._error = None
+        eng = self._engine_fn()
+        if eng is None or not eng.running:
+            self._error = "stream compartido no está abierto"
+            return
+        self._engine = eng
+        self._sample_rate_used = eng.sample_rate
+        sink = self.on_data
+        self._buffer = eng.begin(sink)
+        self._recording = True
+        self.log_fn(f"[capture] grabando del stream compartido (pre-roll {eng.preroll_ms} ms)")
+
+    def stop(self) -> memoryview:
+        if not self._recording or self._engine is None:
+            return self._buffer.view()
+        self._recording = False
+        return self._engine.end()
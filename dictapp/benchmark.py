@@ -0,0 +1,502 @@
+"""Autotuner de Whisper local: mide este equipo y guarda la mejor configuración.
+
+`_resolve_device` / `_resolve_compute_type` solo eligen cuda/cpu y
+float16/int8; hilos, beam size y tamaño de modelo quedaban en los defaults
+sea cual sea la máquina. Un ultrabook de 4 núcleos y un desktop de 16 no
+quieren lo mismo, así que acá se corre un clip de referencia por las
+combinaciones candidatas de (modelo, compute_type, cpu_threads, beam_size)
+y se mide, para cada una:
+
+- RTF (segundos de cómputo por segundo de audio) y la latencia estimada de
+  un dictado típico de `REFERENCE_DICTATION_S` segundos.
+- Pico de memoria residente del proceso mientras decodifica.
+
+Se elige el modelo más grande que cumple la latencia objetivo y, dentro de
+él, la combinación más rápida; eso se guarda en settings.json.
+
+El clip de referencia es una grabación real si la hay (`--clip`, o en la app
+el dictado que sigue a "Medir equipo"). Sin eso se usa una señal sintética con forma de voz: mide
+bien el encoder pero el decoder produce poco texto, así que tiende a
+subestimar la latencia. Por eso una medición sintética se muestra pero no
+se guarda.
+
+Los modelos se cargan desde la carpeta que registra `ModelManager`, igual
+que en el dictado: nada se baja durante la medición. Un tamaño que no está
+descargado se omite (se baja desde la app o con Pre-cargar).
+
+`--profiles` compara los perfiles de decodificación (default/fast/balanced/accurate)
+con el modelo configurado: RTF y, si cada WAV tiene al lado un .txt con la
+transcripción correcta, WER (tasa de error por palabra).
+
+Uso:
+    python -m dictapp.benchmark
+    python -m dictapp.benchmark --clip dictado.wav --models base,small,medium --target 2
+    python -m dictapp.benchmark --quick --dry-run
+    python -m dictapp.benchmark --profiles --clip a.wav --clip b.wav
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import re
+import threading
+import time
+import wave
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from . import pcm as pcm_mod
+from .memory import process_rss_mb
+from .transcribers.local_whisper import (
+    DECODE_PROFILES,
+    DEFAULT_PROFILE,
+    LOCAL_AVAILABLE,
+    WhisperModel,
+    _resolve_compute_type,
+    _resolve_device,
+    decode_options,
+)
+from .transcribers.model_manager import ModelManager
+
+REFERENCE_DICTATION_S = 10.0   # la latencia objetivo se mide sobre un dictado de este largo
+DEFAULT_TARGET_S = 2.0
+DEFAULT_MODELS = ("base", "small")
+SYNTHETIC_SECONDS = 12.0
+SYNTHETIC_LABEL = "señal sintética"
+RSS_SAMPLE_S = 0.05
+
+# orden de calidad: a igual latencia gana el más grande
+MODEL_RANK = {
+    "tiny": 0,
+    "base": 1,
+    "small": 2,
+    "distil-large-v3": 3,
+    "medium": 3,
+    "large-v1": 4,
+    "large-v2": 4,
+    "large-v3": 4,
+}
+
+
+@dataclass(frozen=True)
+class Candidate:
+    model: str
+    compute_type: str
+    cpu_threads: int   # 0 = default de CTranslate2 (en GPU no aplica)
+    beam_size: int
+
+    def label(self) -> str:
+        threads = f"t={self.cpu_threads}" if self.cpu_threads else "t=auto"
+        return f"{self.model}/{self.compute_type}/{threads}/beam={self.beam_size}"
+
+
+@dataclass
+class BenchResult:
+    candidate: Candidate
+    load_s: float = 0.0
+    elapsed_s: float = 0.0
+    audio_s: float = 0.0
+    peak_rss_mb: float | None = None
+    text: str = ""
+    error: str | None = None
+
+    @property
+    def rtf(self) -> float:
+        return self.elapsed_s / self.audio_s if self.audio_s else float("inf")
+
+    @property
+    def latency_s(self) -> float:
+        """Latencia estimada para un dictado de REFERENCE_DICTATION_S segundos."""
+        return self.rtf * REFERENCE_DICTATION_S
+
+    def describe(self) -> str:
+        if self.error:
+            return f"{self.candidate.label():<32} ERROR {self.error}"
+        rss = f"{self.peak_rss_mb:.0f} MB" if self.peak_rss_mb is not None else "?"
+        return (
+            f"{self.candidate.label():<32} rtf={self.rtf:.3f} "
+            f"lat{REFERENCE_DICTATION_S:.0f}s={self.latency_s:.2f}s "
+            f"carga={self.load_s:.1f}s rss_pico={rss}"
+        )
+
+
+class _PeakRSS:
+    """Muestrea el RSS en un hilo mientras dura el bloque `with`."""
+
+    def __init__(self) -> None:
+        self.peak: float | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="dictapp-bench-rss")
+
+    def _run(self) -> None:
+        while True:
+            rss = process_rss_mb()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            if self._stop.wait(RSS_SAMPLE_S):
+                return
+
+    def __enter__(self) -> "_PeakRSS":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+# ------------------------------------------------------------------ audio
+def _synthetic_speech(seconds: float = SYNTHETIC_SECONDS):
+    """Señal con forma de voz: armónicos de una f0 que se mueve, modulados a
+    ritmo de sílabas, con pausas. Determinística (misma medición en cada corrida)."""
+    import numpy as np
+    rate = pcm_mod.TARGET_RATE
+    t = np.arange(int(rate * seconds)) / rate
+    f0 = 140 + 40 * np.sin(2 * np.pi * 0.3 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / rate
+    voice = sum((1.0 / k) * np.sin(k * phase) for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4.0 * t), 0, None) ** 2
+    phrases = (np.sin(2 * np.pi * 0.25 * t) > -0.6).astype(np.float32)
+    noise = np.random.default_rng(0).standard_normal(t.size) * 0.01
+    signal = voice * syllables * phrases + noise
+    return (0.3 * signal / np.max(np.abs(signal))).astype(np.float32)
+
+
+def samples_from_pcm(pcm: "bytes | memoryview", sample_rate: int):
+    """PCM int16 mono → float32 a 16 kHz, como lo recibe faster-whisper."""
+    import numpy as np
+    out, rate = pcm_mod.resample_int16(pcm, sample_rate, pcm_mod.TARGET_RATE)
+    if rate != pcm_mod.TARGET_RATE:
+        raise RuntimeError(f"no se pudo llevar {sample_rate} Hz a 16 kHz")
+    return np.frombuffer(memoryview(out).cast("B"), dtype="<i2").astype(np.float32) / 32768.0
+
+
+def load_clip(path: Path):
+    with wave.open(str(path), "rb") as wf:
+        if wf.getsampwidth() != pcm_mod.SAMPLE_WIDTH:
+            raise RuntimeError(f"{path.name}: se espera WAV PCM 16-bit")
+        data = wf.readframes(wf.getnframes())
+        channels, rate = wf.getnchannels(), wf.getframerate()
+    if channels > 1:
+        data = pcm_mod.to_mono_int16(data, channels)
+    return samples_from_pcm(data, rate)
+
+
+def reference_audio(clips: "list[Path] | None" = None, pcm: tuple[bytes, int] | None = None):
+    """(muestras float32 16 kHz, descripción) del audio a medir. Varios clips
+    se concatenan."""
+    if clips:
+        import numpy as np
+        audio = np.concatenate([load_clip(p) for p in clips])
+        return audio, f"clip {', '.join(p.name for p in clips)}"
+    if pcm is not None:
+        return samples_from_pcm(*pcm), "dictado de referencia"
+    return _synthetic_speech(), SYNTHETIC_LABEL
+
+
+# ------------------------------------------------------------ candidatos
+def thread_candidates(cpus: int | None = None) -> list[int]:
+    n = cpus or os.cpu_count() or 4
+    return sorted({max(1, n // 4), max(1, n // 2), n})
+
+
+def candidates(device: str, models: "tuple[str, ...] | list[str]" = DEFAULT_MODELS,
+               quick: bool = False) -> list[Candidate]:
+    if device == "cuda":
+        computes = ["float16"] if quick else ["float16", "int8_float16"]
+        threads = [0]
+    else:
+        computes = ["int8"] if quick else ["int8", "float32"]
+        threads = thread_candidates()
+        if quick:
+            threads = threads[-2:]
+    return [
+        Candidate(model, compute, th, beam)
+        for model in models
+        for compute in computes
+        for th in threads
+        for beam in (1, 5)
+    ]
+
+
+# ------------------------------------------------------------- medición
+def model_path(manager: ModelManager, size: str) -> str | None:
+    """Carpeta local de `size` (o uno ya bajado en el cache de HF). None si
+    no está descargado: la medición no debe bajar nada."""
+    return manager.local_path(size) or manager.adopt(size)
+
+
+def run_benchmark(
+    audio,
+    cands: list[Candidate],
+    device: str,
+    language: str = "es",
+    profile: str = DEFAULT_PROFILE,
+    log_fn: Callable[[str], None] | None = None,
+    manager: ModelManager | None = None,
+) -> list[BenchResult]:
+    """Corre `audio` por cada candidato. El modelo se carga una vez por
+    (modelo, compute, hilos) y se prueba con cada beam size."""
+    if not LOCAL_AVAILABLE:
+        raise RuntimeError("faster-whisper no instalado")
+    log = log_fn or (lambda _msg: None)
+    manager = manager or ModelManager(log_fn=log)
+    audio_s = len(audio) / pcm_mod.TARGET_RATE
+    groups: dict[tuple[str, str, int], list[Candidate]] = {}
+    for c in cands:
+        groups.setdefault((c.model, c.compute_type, c.cpu_threads), []).append(c)
+
+    results: list[BenchResult] = []
+    paths: dict[str, str | None] = {}
+    for (model_size, compute, threads), group in groups.items():
+        if model_size not in paths:
+            paths[model_size] = model_path(manager, model_size)
+            if paths[model_size] is None:
+                log(f"[bench] {model_size} no está descargado; se omite")
+        if paths[model_size] is None:
+            continue
+        t0 = time.perf_counter()
+        try:
+            opts = {"cpu_threads": threads} if threads else {}
+            model = WhisperModel(paths[model_size], device=device, compute_type=compute, **opts)  # type: ignore[misc]
+            # primera inferencia corta: CTranslate2 reserva buffers, no entra en la medición
+            warm, _ = model.transcribe(audio[: pcm_mod.TARGET_RATE], language=language, beam_size=1)
+            for _ in warm:
+                pass
+        except Exception as e:
+            for c in group:
+                results.append(BenchResult(c, error=f"{type(e).__name__}: {e}"))
+                log(f"[bench] {results[-1].describe()}")
+            continue
+        load_s = time.perf_counter() - t0
+        for c in group:
+            result = BenchResult(c, load_s=load_s, audio_s=audio_s)
+            try:
+                with _PeakRSS() as rss:
+                    t1 = time.perf_counter()
+                    opts = decode_options(profile, c.beam_size)
+                    opts["beam_size"] = c.beam_size
+                    segments, _info = model.transcribe(audio, language=language, **opts)
+                    result.text = "".join(s.text for s in segments).strip()
+                    result.elapsed_s = time.perf_counter() - t1
+                result.peak_rss_mb = rss.peak
+            except Exception as e:
+                result.error = f"{type(e).__name__}: {e}"
+            results.append(result)
+            log(f"[bench] {result.describe()}")
+        model = None
+        gc.collect()
+    return results
+
+
+def pick_best(results: list[BenchResult], target_s: float = DEFAULT_TARGET_S) -> tuple[BenchResult | None, bool]:
+    """(ganador, cumple_objetivo).
+
+    Entre los que cumplen: el modelo más grande y, a igual modelo, beam más
+    ancho; de esos, el más rápido. Si ninguno cumple, el más rápido de todos.
+    """
+    ok = [r for r in results if r.error is None and r.audio_s > 0]
+    if not ok:
+        return None, False
+    meeting = [r for r in ok if r.latency_s <= target_s]
+    if not meeting:
+        return min(ok, key=lambda r: r.rtf), False
+    best_tier = max((MODEL_RANK.get(r.candidate.model, 0), r.candidate.beam_size) for r in meeting)
+    tier = [r for r in meeting
+            if (MODEL_RANK.get(r.candidate.model, 0), r.candidate.beam_size) == best_tier]
+    return min(tier, key=lambda r: r.rtf), True
+
+
+def apply_to_config(config, result: BenchResult, target_s: float) -> None:
+    c = result.candidate
+    config.set("local_model", c.model)
+    config.set("local_compute_type", c.compute_type)
+    config.set("local_cpu_threads", c.cpu_threads)
+    config.set("local_beam_size", c.beam_size)
+    config.set("local_autotune", {
+        "when": time.strftime("%Y-%m-%d %H:%M"),
+        "config": c.label(),
+        "rtf": round(result.rtf, 4),
+        "latency_s": round(result.latency_s, 2),
+        "target_s": target_s,
+        "peak_rss_mb": round(result.peak_rss_mb) if result.peak_rss_mb is not None else None,
+        "cpus": os.cpu_count(),
+    })
+
+
+def autotune(
+    config,
+    audio,
+    clip_label: str,
+    models: "tuple[str, ...] | list[str]" = DEFAULT_MODELS,
+    target_s: float = DEFAULT_TARGET_S,
+    quick: bool = False,
+    save: bool = True,
+    log_fn: Callable[[str], None] | None = None,
+    manager: ModelManager | None = None,
+) -> tuple[BenchResult | None, bool]:
+    """Mide, elige y (con `save`) guarda en `config`. Lo usan la CLI y la app.
+    Con la señal sintética nunca guarda: subestima la latencia."""
+    log = log_fn or (lambda _msg: None)
+    device = _resolve_device(str(config.get("local_device", "auto")))
+    cands = candidates(device, models, quick=quick)
+    log(
+        f"[bench] {len(cands)} combinaciones · device={device} · cpus={os.cpu_count()} "
+        f"· {clip_label} ({len(audio) / pcm_mod.TARGET_RATE:.1f}s) · objetivo "
+        f"{target_s:.1f}s por dictado de {REFERENCE_DICTATION_S:.0f}s"
+    )
+    results = run_benchmark(audio, cands, device, str(config.get("language", "es")),
+                            profile=str(config.get("local_profile", DEFAULT_PROFILE)), log_fn=log,
+                            manager=manager)
+    best, met = pick_best(results, target_s)
+    if best is None:
+        log("[bench] ninguna combinación funcionó; no se cambia nada")
+        return None, False
+    verdict = "cumple el objetivo" if met else "ninguna cumple el objetivo: la más rápida"
+    log(f"[bench] elegida ({verdict}): {best.describe()}")
+    if save and clip_label == SYNTHETIC_LABEL:
+        log("[bench] medida con la señal sintética: no se guarda. Repetila con --clip y un dictado real")
+    elif save:
+        apply_to_config(config, best, target_s)
+        log("[bench] guardada en settings.json")
+    return best, met
+
+
+# --------------------------------------------------------------- perfiles
+@dataclass
+class RefClip:
+    name: str
+    samples: object        # ndarray float32 16 kHz
+    text: str | None       # transcripción correcta (el .txt junto al WAV), si hay
+
+
+@dataclass
+class ProfileResult:
+    profile: str
+    elapsed_s: float = 0.0
+    audio_s: float = 0.0
+    errors: int = 0        # sustituciones + inserciones + borrados
+    ref_words: int = 0
+    texts: list[str] = field(default_factory=list)
+
+    @property
+    def rtf(self) -> float:
+        return self.elapsed_s / self.audio_s if self.audio_s else float("inf")
+
+    @property
+    def wer(self) -> float | None:
+        return self.errors / self.ref_words if self.ref_words else None
+
+    def describe(self) -> str:
+        wer = f"wer={self.wer * 100:.1f}%" if self.wer is not None else "wer=? (sin .txt)"
+        return f"{self.profile:<9} rtf={self.rtf:.3f} lat{REFERENCE_DICTATION_S:.0f}s={self.rtf * REFERENCE_DICTATION_S:.2f}s {wer}"
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple[int, int]:
+    """(errores, palabras de referencia): distancia de edición por palabras."""
+    ref, hyp = _words(reference), _words(hypothesis)
+    prev = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        cur = [i] + [0] * len(hyp)
+        for j, h in enumerate(hyp, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (r != h))
+        prev = cur
+    return prev[-1], len(ref)
+
+
+def load_reference_set(paths: list[Path]) -> list[RefClip]:
+    clips = []
+    for p in paths:
+        txt = p.with_suffix(".txt")
+        text = txt.read_text(encoding="utf-8").strip() if txt.exists() else None
+        clips.append(RefClip(p.name, load_clip(p), text))
+    return clips
+
+
+def profile_report(config, clips: list[RefClip],
+                   log_fn: Callable[[str], None] | None = None,
+                   manager: ModelManager | None = None) -> list[ProfileResult]:
+    """Corre cada clip con cada perfil sobre el modelo configurado."""
+    if not LOCAL_AVAILABLE:
+        raise RuntimeError("faster-whisper no instalado")
+    log = log_fn or (lambda _msg: None)
+    manager = manager or ModelManager(log_fn=log)
+    device = _resolve_device(str(config.get("local_device", "auto")))
+    compute = _resolve_compute_type(str(config.get("local_compute_type", "auto")), device)
+    size = str(config.get("local_model", "base"))
+    threads = int(config.get("local_cpu_threads", 0) or 0)
+    beam = int(config.get("local_beam_size", 5) or 5)
+    language = str(config.get("language", "es"))
+    path = model_path(manager, size)
+    if path is None:
+        raise RuntimeError(f"el modelo {size} no está descargado")
+    log(f"[bench] perfiles con {size} ({device}/{compute}) · {len(clips)} clips")
+    model = WhisperModel(path, device=device, compute_type=compute,  # type: ignore[misc]
+                         **({"cpu_threads": threads} if threads else {}))
+    warm, _ = model.transcribe(clips[0].samples[: pcm_mod.TARGET_RATE], language=language, beam_size=1)
+    for _ in warm:
+        pass
+    results = []
+    for profile in DECODE_PROFILES:
+        res = ProfileResult(profile)
+        for clip in clips:
+            t0 = time.perf_counter()
+            segments, _info = model.transcribe(clip.samples, language=language,
+                                               **decode_options(profile, beam))
+            text = "".join(s.text for s in segments).strip()
+            res.elapsed_s += time.perf_counter() - t0
+            res.audio_s += len(clip.samples) / pcm_mod.TARGET_RATE
+            res.texts.append(text)
+            if clip.text is not None:
+                errors, words = word_errors(clip.text, text)
+                res.errors += errors
+                res.ref_words += words
+        results.append(res)
+        log(f"[bench] {res.describe()}")
+    return results
+
+
+def main(argv: list[str] | None = None) -> int:
+    from .config import Config
+
+    parser = argparse.ArgumentParser(
+        prog="python -m dictapp.benchmark",
+        description="Mide Whisper local en este equipo y guarda la configuración más adecuada.",
+    )
+    parser.add_argument("--clip", type=Path, action="append",
+                        help="WAV 16-bit con un dictado real (recomendado; se puede repetir)")
+    parser.add_argument("--models", default=",".join(DEFAULT_MODELS),
+                        help="modelos a probar, separados por coma (default: %(default)s)")
+    parser.add_argument("--target", type=float, default=DEFAULT_TARGET_S,
+                        help=f"latencia máxima en s para un dictado de {REFERENCE_DICTATION_S:.0f}s "
+                             "(default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help="menos combinaciones")
+    parser.add_argument("--dry-run", action="store_true", help="medir sin guardar")
+    parser.add_argument("--profiles", action="store_true",
+                        help="comparar perfiles de decodificación (RTF y WER) en vez de autotunear")
+    args = parser.parse_args(argv)
+
+    if not LOCAL_AVAILABLE:
+        print("faster-whisper no instalado.")
+        return 1
+    config = Config()
+    if args.profiles:
+        if not args.clip:
+            parser.error("--profiles necesita al menos un --clip (con su .txt para medir WER)")
+        profile_report(config, load_reference_set(args.clip), log_fn=print)
+        return 0
+    audio, label = reference_audio(clips=args.clip)
+    models = [m.strip() for m in args.models.split(",") if m.strip()]
+    best, _met = autotune(config, audio, label, models=models, target_s=args.target,
+                          quick=args.quick, save=not args.dry_run, log_fn=print)
+    return 0 if best is not None else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -26,19 +26,53 @@ from .version import APP_NAME
 
 KEYRING_SERVICE = "DictarApp"
 KEYRING_GROQ_USER = "groq_api_key"
+KEYRING_GROQ_EXTRA_USER = "groq_api_keys_extra"   # keys adicionales, una por línea
 
 DEFAULT_SETTINGS: dict[str, Any] = {
-    "service": "Whisper (Groq)",                 # "Whisper (Groq)" | "Google" | "Whisper local"
+    "service": "Whisper (Groq)",                 # "Whisper (Groq)" | "Google" | "Whisper local" | "Auto"
+    "latency_target_s": 2.0,                      # Auto: mejor calidad que entre en este p90 de latencia
     "hotkey": "ctrl+alt+n",
     "always_on_top": False,
     "compact_mode": False,
     "auto_paste": True,
     "trim_silence": True,
+    "resample_16k": True,                         # normalizar a 16 kHz mono antes de transcribir
+    "shared_capture": True,                       # un stream persistente alimenta VU + grabación
+    "preroll_ms": 300,                            # audio previo al hotkey que se incluye al grabar
+    "incremental_transcription": False,          # transcribir por trozos (pausas) mientras se graba
     "mic_index": -1,                              # -1 = default
     "ffmpeg_device": "",                          # nombre DirectShow (audio=...) para backend ffmpeg
+    "ffmpeg_pipe": True,                          # ffmpeg → stdout (sin WAV temporal) con nivel en vivo
+    "upload_format": "auto",                      # auto|flac|opus|wav (subida a Groq)
+    "opus_bitrate_kbps": 24,                      # bitrate de Opus cuando se usa
+    "groq_model": "whisper-large-v3",             # whisper-large-v3 | whisper-large-v3-turbo
+    "groq_chunk_s": 30,                           # dictados largos se parten en trozos de N s (0 = nunca)
+    "groq_parallel": 4,                           # trozos subidos en paralelo
+    "groq_rpm": 20,                               # requests por minuto permitidos por cada key
+    "groq_max_retries": 4,                        # reintentos ante 429 / 5xx / red
+    "hedge_backend": "Whisper local",             # si Groq/Google se demora: Whisper local|Google|off
+    "hedge_percentile": 95,                       # plazo = este percentil de las latencias recientes
+    "circuit_threshold": 3,                       # fallas de red seguidas que abren el circuito de Groq/Google
+    "circuit_probe_s": 15,                        # cada cuánto se prueba si el servicio volvió
+    "circuit_fallback": "Whisper local",          # a dónde van los dictados con el circuito abierto (o "off")
     "local_model": "base",                        # tiny|base|small|medium|large-v3
     "local_device": "auto",                       # auto|cpu|cuda
     "local_compute_type": "auto",                 # auto|int8|int8_float16|float16|float32
+    "local_batch_size": 8,                        # lotes del pipeline batched (0/1 = desactivado)
+    "local_batched_min_s": 30.0,                  # audio desde esta duración va por lotes
+    "local_cache_budget_mb": 4096,                # modelos locales que quedan cargados (LRU)
+    "local_cpu_threads": 0,                       # hilos de CTranslate2 en CPU (0 = default); lo ajusta el benchmark
+    "local_beam_size": 5,                         # beam search (1 = greedy, más rápido)
+    "local_profile": "default",                   # default|fast|balanced|accurate (decodificación)
+    "local_prefetch_models": [],                  # tamaños a descargar en background al abrir la app
+    "local_target_latency_s": 2.0,                # "Medir equipo": latencia máxima para un dictado de 10 s
+    "local_autotune": {},                         # resultado del último "Medir equipo"
+    "progressive_delivery": False,                # local: pegar frase por frase mientras decodifica
+    "local_warmup_at_start": False,               # cargar + inferencia de prueba al abrir la app
+    "local_keep_warm_min": 15,                    # liberar el modelo local tras N min sin uso (0 = nunca)
+    "local_out_of_process": False,                # inferencia local en un proceso worker aparte
+    "local_two_pass": False,                      # borrador rápido + versión final del modelo elegido
+    "local_draft_model": "tiny",                  # modelo residente para el borrador (tiny|base)
     "language": "es",
     "last_seen_version": "",                      # para popup What's New
 }
@@ -55,6 +89,11 @@ def settings_path() -> Path:
     return _appdata_dir() / "settings.json"
 
 
+def data_path(filename: str) -> Path:
+    """Ruta de un archivo auxiliar junto a settings.json."""
+    return _appdata_dir() / filename
+
+
 class Config:
     def __init__(self) -> None:
         self.path = settings_path()
@@ -116,6 +155,27 @@ class Config:
             except Exception:
                 pass
 
+    def get_groq_extra_keys(self) -> list[str]:
+        if not KEYRING_OK:
+            return []
+        try:
+            value = keyring.get_password(KEYRING_SERVICE, KEYRING_GROQ_EXTRA_USER)
+        except Exception:
+            return []
+        return [k.strip() for k in (value or "").splitlines() if k.strip()]
+
+    def set_groq_extra_keys(self, keys: list[str]) -> None:
+        if not KEYRING_OK:
+            raise RuntimeError("keyring no disponible. Instala 'keyring'.")
+        keys = [k.strip() for k in keys if k.strip()]
+        if keys:
+            keyring.set_password(KEYRING_SERVICE, KEYRING_GROQ_EXTRA_USER, "\n".join(keys))
+        else:
+            try:
+                keyring.delete_password(KEYRING_SERVICE, KEYRING_GROQ_EXTRA_USER)
+            except Exception:
+                pass
+
     @staticmethod
     def _read_legacy_registry_key() -> str | None:
         if winreg is None:
@@ -0,0 +1,87 @@
+"""Perfil de apertura que funcionó por micrófono, persistido entre sesiones.
+
+La cascada de intentos (PyAudio ~7, sounddevice ~20) cuesta más de 1 s en las
+máquinas con el -9999. Acá se guarda, por dispositivo estable (nombre + host
+API, no el índice, que cambia entre arranques), el backend/rate/canales/dtype
+que abrió la última vez, para probarlo primero.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from .config import data_path
+
+PROFILES_FILE = "device_profiles.json"
+
+
+@dataclass
+class OpenProfile:
+    backend: str              # "pyaudio" | "sd"
+    rate: int
+    channels: int
+    dtype: str = "int16"
+    use_default: bool = False  # abrió el default del sistema en vez del device elegido
+
+
+def device_key(name: str | None, host_api_name: str | None) -> str | None:
+    if not name:
+        return None
+    return f"{host_api_name or '?'}|{name}"
+
+
+class OpenProfileCache:
+    def __init__(self, path: Path | None = None) -> None:
+        self.path = path or data_path(PROFILES_FILE)
+        self._data: dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                saved = json.load(f)
+            if isinstance(saved, dict):
+                self._data = {k: v for k, v in saved.items() if isinstance(v, dict)}
+        except (OSError, json.JSONDecodeError):
+            pass
+
+    def save(self) -> None:
+        try:
+            with self.path.open("w", encoding="utf-8") as f:
+                json.dump(self._data, f, indent=2, ensure_ascii=False)
+        except OSError:
+            pass
+
+    def get(self, key: str | None) -> OpenProfile | None:
+        if not key:
+            return None
+        with self._lock:
+            raw = self._data.get(key)
+        if raw is None:
+            return None
+        try:
+            return OpenProfile(**raw)
+        except TypeError:
+            return None
+
+    def remember(self, key: str | None, profile: OpenProfile) -> None:
+        if not key:
+            return
+        raw = asdict(profile)
+        with self._lock:
+            if self._data.get(key) == raw:
+                return
+            self._data[key] = raw
+            self.save()
+
+    def forget(self, key: str | None) -> None:
+        if not key:
+            return
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.save()
@@ -0,0 +1,254 @@
+"""Registro de dispositivos de audio con snapshot inmutable en memoria.
+
+Antes cada listado creaba y terminaba su propio `pyaudio.PyAudio()` (100–400
+ms de init de PortAudio en Windows), varias veces seguidas y en el hilo de
+Tk después de cada dictado. Acá se enumera todo una sola vez (PyAudio,
+sounddevice y opcionalmente dshow) a un `DeviceSnapshot` que se sirve desde
+memoria. Se vuelve a enumerar en background solo cuando cambia el hardware
+(hotplug) o cuando el usuario aprieta ↻.
+
+PyAudio arma su lista con cada `PyAudio()` nuevo, pero sounddevice inicializa
+PortAudio una sola vez al importarse y `query_devices()` sigue devolviendo esa
+lista. Para ver un mic enchufado después hay que reinicializarlo, y eso solo
+se puede sin streams de sounddevice abiertos: antes de cada refresh se llama
+a `release_sd()` (lo provee la app: cierra el VU y el stream compartido). Si
+no se puede (hay una grabación en curso), la lista de sounddevice queda vieja
+y `sd_stale` lo avisa para refrescar de nuevo al terminar.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import pyaudio
+
+from . import audio as audio_mod
+from .audio_ffmpeg import FFDevice, list_dshow_input_devices
+
+try:
+    import winreg
+except ImportError:
+    winreg = None
+
+# endpoints de captura de Windows: una subclave por device con su DeviceState
+_MMDEVICES_CAPTURE = r"SOFTWARE\Microsoft\Windows\CurrentVersion\MMDevices\Audio\Capture"
+HOTPLUG_POLL_S = 3.0
+
+
+@dataclass(frozen=True)
+class SDInput:
+    index: int
+    name: str
+    host_api_name: str
+
+
+@dataclass(frozen=True)
+class DeviceSnapshot:
+    devices: tuple[audio_mod.MicDevice, ...] = ()       # todos los inputs de PyAudio
+    curated: tuple[audio_mod.MicDevice, ...] = ()       # uno por mic físico (UI)
+    host_summary: str = ""
+    default_key: str | None = None
+    sd_inputs: tuple[SDInput, ...] = ()
+    dshow: tuple[FFDevice, ...] = ()
+    taken_at: float = field(default_factory=time.time)
+    error: str | None = None
+
+    def key_for(self, index: int) -> str | None:
+        """Clave estable del índice PyAudio (-1 = default del sistema)."""
+        if index is None or index < 0:
+            return self.default_key
+        for d in self.devices:
+            if d.index == index:
+                return d.key
+        return None
+
+
+def _hotplug_fingerprint() -> tuple | None:
+    """Estado barato de los endpoints de captura (sin tocar PortAudio).
+
+    En Windows lee el registro de MMDevices; en otros sistemas devuelve None
+    y solo se refresca a mano.
+    """
+    if winreg is None:
+        return None
+    out = []
+    try:
+        root = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, _MMDEVICES_CAPTURE, 0, winreg.KEY_READ)
+    except OSError:
+        return None
+    try:
+        i = 0
+        while True:
+            try:
+                guid = winreg.EnumKey(root, i)
+            except OSError:
+                break
+            i += 1
+            try:
+                k = winreg.OpenKey(root, guid, 0, winreg.KEY_READ)
+                state, _ = winreg.QueryValueEx(k, "DeviceState")
+                winreg.CloseKey(k)
+            except OSError:
+                state = None
+            out.append((guid, state))
+    finally:
+        winreg.CloseKey(root)
+    return tuple(sorted(out))
+
+
+def _enumerate(include_dshow: bool, previous: DeviceSnapshot | None,
+               reinit_sd: bool = False) -> DeviceSnapshot:
+    errors: list[str] = []
+    devices: list[audio_mod.MicDevice] = []
+    summary = ""
+    default_key = None
+    default_name = ""
+    try:
+        p = pyaudio.PyAudio()
+        try:
+            devices = audio_mod.list_input_devices(p)
+            summary = audio_mod.host_apis_summary(p)
+            default_key = audio_mod.default_device_key(p)
+            default_name = audio_mod.get_default_mic_name(p)
+        finally:
+            p.terminate()
+    except Exception as e:
+        errors.append(f"pyaudio: {e}")
+
+    sd_inputs: list[SDInput] = []
+    try:
+        import sounddevice as sd
+        if reinit_sd:
+            # PortAudio de sounddevice se inicializó al importar: sin esto no ve el hotplug
+            sd._terminate()
+            sd._initialize()
+        apis = sd.query_hostapis()
+        for i, d in enumerate(sd.query_devices()):
+            if int(d.get("max_input_channels", 0)) <= 0:
+                continue
+            try:
+                api_name = str(apis[int(d.get("hostapi", 0))]["name"])
+            except Exception:
+                api_name = ""
+            sd_inputs.append(SDInput(index=i, name=str(d.get("name", "")), host_api_name=api_name))
+    except Exception:
+        pass
+
+    if include_dshow:
+        try:
+            dshow = tuple(list_dshow_input_devices())
+        except Exception as e:
+            errors.append(f"dshow: {e}")
+            dshow = previous.dshow if previous is not None else ()
+    else:
+        dshow = previous.dshow if previous is not None else ()
+
+    return DeviceSnapshot(
+        devices=tuple(devices),
+        curated=tuple(audio_mod.curate_input_devices(devices, default_name)),
+        host_summary=summary,
+        default_key=default_key,
+        sd_inputs=tuple(sd_inputs),
+        dshow=dshow,
+        error="; ".join(errors) or None,
+    )
+
+
+class DeviceRegistry:
+    """Dueño del snapshot de dispositivos. Thread-safe."""
+
+    def __init__(self, include_dshow: bool = False,
+                 log_fn: Callable[[str], None] | None = None,
+                 poll_s: float = HOTPLUG_POLL_S) -> None:
+        self.include_dshow = include_dshow
+        self.log_fn = log_fn or (lambda _msg: None)
+        self.poll_s = poll_s
+        self._snapshot: DeviceSnapshot | None = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._listeners: list[Callable[[DeviceSnapshot], None]] = []
+        self._watching = False
+        # cierra los streams de sounddevice; False si ahora no se puede
+        self.release_sd: Callable[[], bool] | None = None
+        self.sd_stale = False   # la lista de sounddevice no refleja el último refresh
+
+    def snapshot(self) -> DeviceSnapshot:
+        """El snapshot vigente. Solo la primera llamada enumera (bloqueando)."""
+        snap = self._snapshot
+        if snap is not None:
+            return snap
+        with self._lock:
+            if self._snapshot is None:
+                t0 = time.perf_counter()
+                self._snapshot = _enumerate(self.include_dshow, None)
+                self.log_fn(f"[devices] enumeración inicial en {time.perf_counter()-t0:.2f}s")
+            return self._snapshot
+
+    def add_listener(self, fn: Callable[[DeviceSnapshot], None]) -> None:
+        """`fn(snapshot)` se llama desde un hilo de background tras cada refresh."""
+        self._listeners.append(fn)
+
+    def refresh(self, reason: str = "manual") -> bool:
+        """Re-enumera en background y notifica a los listeners al terminar.
+
+        Devuelve False si ya había un refresh en curso (no se encola otro).
+        """
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self._refresh_worker, args=(reason,), daemon=True).start()
+        return True
+
+    def _refresh_worker(self, reason: str) -> None:
+        try:
+            t0 = time.perf_counter()
+            reinit = self._release_sd()
+            snap = _enumerate(self.include_dshow, self._snapshot, reinit_sd=reinit)
+            self.sd_stale = not reinit
+            self._snapshot = snap
+            self.log_fn(
+                f"[devices] snapshot actualizado ({reason}) en {time.perf_counter()-t0:.2f}s · "
+                f"{len(snap.curated)} mics"
+            )
+        except Exception as e:
+            self.log_fn(f"[devices] no se pudo actualizar ({reason}): {e}")
+            return
+        finally:
+            with self._lock:
+                self._refreshing = False
+        for fn in list(self._listeners):
+            try:
+                fn(snap)
+            except Exception as e:
+                self.log_fn(f"[devices] listener falló: {e}")
+
+    def _release_sd(self) -> bool:
+        if self.release_sd is None:
+            return False
+        try:
+            return bool(self.release_sd())
+        except Exception as e:
+            self.log_fn(f"[devices] no se pudieron cerrar los streams de sounddevice: {e}")
+            return False
+
+    def start_watch(self) -> None:
+        """Vigila cambios de hardware y refresca el snapshot solo cuando hay uno."""
+        if self._watching or _hotplug_fingerprint() is None:
+            return
+        self._watching = True
+        threading.Thread(target=self._watch_loop, daemon=True).start()
+
+    def stop_watch(self) -> None:
+        self._watching = False
+
+    def _watch_loop(self) -> None:
+        last = _hotplug_fingerprint()
+        while self._watching:
+            time.sleep(self.poll_s)
+            current = _hotplug_fingerprint()
+            # si había un refresh en curso se reintenta en la próxima vuelta
+            if current is not None and current != last and self.refresh(reason="hotplug"):
+                last = current
@@ -0,0 +1,155 @@
+"""Codificación en memoria del audio antes de subirlo a un backend en la nube.
+
+Un WAV PCM de 16 kHz mono pesa 32 KB/s. En Wi-Fi de hotel o tethering la
+subida es casi todo el tiempo de la transcripción, así que antes de mandar el
+audio a Groq se comprime sin tocar disco:
+
+- FLAC (sin pérdida, ~2×) para dictados cortos, donde la subida ya es chica
+  y no vale la pena arriesgar precisión.
+- Opus en OGG (con pérdida, bitrate configurable, ~10–20×) para dictados
+  largos. A 24 kbps la voz no pierde nada que Whisper use.
+
+Encoders: `soundfile` (libsndfile) y `ffmpeg` por pipes (stdin → stdout, sin
+temporales). Para Opus va primero ffmpeg porque respeta el bitrate pedido.
+Si ninguno está, se sube WAV en memoria.
+"""
+from __future__ import annotations
+
+import io
+import subprocess
+import time
+import wave
+from dataclasses import dataclass
+from typing import Callable
+
+from .audio_ffmpeg import find_ffmpeg
+from .pcm import SAMPLE_WIDTH
+
+try:
+    import soundfile as sf
+    SF_AVAILABLE = True
+except Exception:
+    sf = None  # type: ignore
+    SF_AVAILABLE = False
+
+FORMATS = ("auto", "flac", "opus", "wav")
+AUTO_OPUS_MIN_S = 20.0      # desde acá el modo auto pasa de FLAC a Opus
+DEFAULT_OPUS_KBPS = 24
+ENCODE_TIMEOUT = 30.0
+
+
+@dataclass
+class EncodedAudio:
+    data: bytes
+    fmt: str            # "flac" | "opus" | "wav"
+    filename: str       # la extensión le dice a la API qué formato es
+    raw_bytes: int      # tamaño del PCM de entrada
+    encoder: str = ""
+    seconds: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / len(self.data) if self.data else 0.0
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.raw_bytes - len(self.data)
+
+    def describe(self) -> str:
+        return (
+            f"{self.fmt} ({self.encoder}): {self.raw_bytes} -> {len(self.data)} bytes "
+            f"· {self.ratio:.1f}x · ahorro {self.saved_bytes / 1024:.0f} KB "
+            f"· {self.seconds * 1000:.0f} ms"
+        )
+
+
+def pick_format(fmt: str, seconds: float) -> str:
+    """Resuelve "auto" según la duración: corto → FLAC, largo → Opus."""
+    if fmt in ("flac", "opus", "wav"):
+        return fmt
+    return "opus" if seconds >= AUTO_OPUS_MIN_S else "flac"
+
+
+def wav_bytes(pcm: "bytes | memoryview", sample_rate: int) -> bytes:
+    """WAV PCM 16-bit mono armado en memoria."""
+    bio = io.BytesIO()
+    with wave.open(bio, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return bio.getvalue()
+
+
+def _encode_soundfile(pcm, sample_rate: int, fmt: str) -> bytes:
+    bio = io.BytesIO()
+    fmt_sf, subtype = ("FLAC", "PCM_16") if fmt == "flac" else ("OGG", "OPUS")
+    with sf.SoundFile(bio, mode="w", samplerate=sample_rate, channels=1,
+                      format=fmt_sf, subtype=subtype) as f:
+        f.buffer_write(bytes(pcm), dtype="int16")
+    return bio.getvalue()
+
+
+def _encode_ffmpeg(pcm, sample_rate: int, fmt: str, opus_kbps: int) -> bytes:
+    exe = find_ffmpeg()
+    if exe is None:
+        raise RuntimeError("ffmpeg no encontrado")
+    if fmt == "flac":
+        codec = ["-c:a", "flac", "-f", "flac"]
+    else:
+        codec = ["-c:a", "libopus", "-b:a", f"{opus_kbps}k", "-application", "voip", "-f", "ogg"]
+    cmd = [
+        exe, "-hide_banner", "-loglevel", "error",
+        "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+        *codec, "pipe:1",
+    ]
+    proc = subprocess.run(
+        cmd, input=bytes(pcm), capture_output=True, timeout=ENCODE_TIMEOUT,
+        creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+    )
+    if proc.returncode != 0 or not proc.stdout:
+        err = (proc.stderr or b"").decode("utf-8", errors="replace").strip()
+        raise RuntimeError(err or f"ffmpeg salió con código {proc.returncode}")
+    return proc.stdout
+
+
+def encode_pcm(
+    pcm: "bytes | memoryview",
+    sample_rate: int,
+    fmt: str = "auto",
+    opus_kbps: int = DEFAULT_OPUS_KBPS,
+    log_fn: Callable[[str], None] | None = None,
+) -> EncodedAudio:
+    """Codifica PCM int16 mono al formato pedido, con fallback hasta WAV.
+
+    Nunca falla por falta de encoder: en el peor caso devuelve un WAV.
+    """
+    log = log_fn or (lambda _msg: None)
+    raw = len(pcm)
+    seconds = raw / float(sample_rate * SAMPLE_WIDTH) if sample_rate else 0.0
+    target = pick_format(fmt, seconds)
+    # Opus sin encoder disponible → FLAC (sigue siendo sin pérdida y más chico que WAV)
+    chain = {"opus": ["opus", "flac"], "flac": ["flac"], "wav": []}[target]
+    for f in chain:
+        encoders: list[tuple[str, Callable[[], bytes]]] = []
+        if SF_AVAILABLE:
+            encoders.append(("soundfile", lambda f=f: _encode_soundfile(pcm, sample_rate, f)))
+        if find_ffmpeg() is not None:
+            ff = ("ffmpeg", lambda f=f: _encode_ffmpeg(pcm, sample_rate, f, opus_kbps))
+            encoders.insert(0 if f == "opus" else len(encoders), ff)
+        for name, run in encoders:
+            t0 = time.perf_counter()
+            try:
+                data = run()
+            except Exception as e:
+                log(f"[encode] {f} con {name} falló: {e}")
+                continue
+            return EncodedAudio(
+                data=data, fmt=f, filename=f"audio.{'ogg' if f == 'opus' else f}",
+                raw_bytes=raw, encoder=name, seconds=time.perf_counter() - t0,
+            )
+    t0 = time.perf_counter()
+    return EncodedAudio(
+        data=wav_bytes(pcm, sample_rate), fmt="wav", filename="audio.wav",
+        raw_bytes=raw, encoder="wave", seconds=time.perf_counter() - t0,
+    )
@@ -0,0 +1,177 @@
+"""Requests "hedged": si el backend principal tarda más de lo normal, se
+manda el mismo audio a un segundo backend y gana el primero que responde.
+
+Lo que molesta es la cola de la distribución (Groq a veces tarda 6 s en vez
+de 0.6 s), no la mediana. El plazo sale de un percentil (p95 por defecto) de
+las últimas latencias del principal: así solo ~1 de cada 20 dictados paga un
+segundo request.
+
+Las latencias se anotan por segundo de audio y el plazo se escala con el
+largo del dictado: si no, un dictado de 2 minutos (que tarda lo suyo) se
+duplicaría siempre. Debajo de `MIN_AUDIO_S` manda el overhead fijo del
+request, así que los dictados cortos cuentan como de `MIN_AUDIO_S`.
+
+- Hasta juntar `MIN_SAMPLES` latencias se usa `DEFAULT_S_PER_AUDIO_S`.
+- Las latencias del principal se anotan aunque pierda (al terminar tarde):
+  si no, el percentil quedaría sesgado hacia abajo.
+- Si el principal falla antes del plazo, el secundario arranca enseguida:
+  el error solo llega al usuario si fallan los dos.
+- El perdedor se cancela cuando se puede: el Whisper local corta la
+  decodificación entre segmentos. Un request HTTP ya enviado no se puede
+  cortar; su resultado se descarta.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from .transcribers.base import Transcriber, TranscriptionError, TranscriptionResult
+
+DEFAULT_PERCENTILE = 95
+MIN_SAMPLES = 8             # latencias necesarias antes de confiar en el percentil
+WINDOW = 50                 # latencias recientes que se miran por backend
+MIN_AUDIO_S = 10.0          # los dictados más cortos se cuentan como de este largo
+DEFAULT_S_PER_AUDIO_S = 0.25   # plazo mientras no hay historia (2.5 s para 10 s de audio)
+MAX_S_PER_AUDIO_S = 0.8     # (8 s para 10 s de audio)
+MIN_DEADLINE_S = 0.8        # nunca se duplica antes de esto
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Percentil con interpolación lineal (como numpy.percentile)."""
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("sin valores")
+    pos = (len(ordered) - 1) * pct / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def audio_seconds(audio, sample_rate: int) -> float:
+    """Duración de lo que recibe `transcribe_pcm` (PCM int16 o ndarray)."""
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        nbytes = audio.nbytes if isinstance(audio, memoryview) else len(audio)
+        return nbytes / (2 * sample_rate)
+    return len(audio) / sample_rate
+
+
+def run_cancellable(t: Transcriber, audio, sample_rate: int, language: str,
+                    cancelled: threading.Event) -> TranscriptionResult:
+    """`transcribe_pcm`, pero cortando si `cancelled` se activa. Solo los
+    backends que decodifican por segmentos (`stream_pcm`) pueden cortar."""
+    stream = getattr(t, "stream_pcm", None)
+    if stream is None:
+        return t.transcribe_pcm(audio, sample_rate, language=language)
+    t0 = time.perf_counter()
+    parts: list[str] = []
+    for seg in stream(audio, sample_rate, language=language):
+        if cancelled.is_set():
+            raise TranscriptionError(f"{t.name}: cancelado")
+        parts.append(seg.text)
+    text = "".join(parts).strip()
+    if not text:
+        raise TranscriptionError(f"{t.name}: sin texto reconocido")
+    return TranscriptionResult(text=text, backend=t.name, seconds=time.perf_counter() - t0)
+
+
+class Hedger:
+    """Latencias recientes por backend + la carrera principal/secundario."""
+
+    def __init__(self, pct: float = DEFAULT_PERCENTILE,
+                 log_fn: Callable[[str], None] | None = None,
+                 on_outcome: Callable[[str, "Exception | None"], None] | None = None) -> None:
+        self.pct = pct
+        self.log_fn = log_fn or (lambda _msg: None)
+        # (backend, error o None) de cada request, también del perdedor que termina tarde
+        self.on_outcome = on_outcome or (lambda _name, _error: None)
+        self._lock = threading.Lock()
+        self._latency: dict[str, deque[float]] = {}
+        self.wins: dict[str, int] = {}
+
+    def record(self, backend: str, seconds: float, audio_s: float) -> None:
+        with self._lock:
+            self._latency.setdefault(backend, deque(maxlen=WINDOW)).append(
+                seconds / max(audio_s, MIN_AUDIO_S)
+            )
+
+    def deadline(self, backend: str, audio_s: float) -> float:
+        """Plazo para `audio_s` segundos de audio."""
+        with self._lock:
+            samples = list(self._latency.get(backend, ()))
+        per_s = DEFAULT_S_PER_AUDIO_S
+        if len(samples) >= MIN_SAMPLES:
+            per_s = min(MAX_S_PER_AUDIO_S, percentile(samples, self.pct))
+        return max(MIN_DEADLINE_S, per_s * max(audio_s, MIN_AUDIO_S))
+
+    def run(self, primary: Transcriber, secondary: Transcriber | None,
+            audio, sample_rate: int, language: str) -> TranscriptionResult:
+        """Transcribe con `primary`; si no contesta a tiempo, corre también
+        `secondary` y devuelve el primer resultado válido."""
+        audio_s = audio_seconds(audio, sample_rate)
+        if secondary is None:
+            t0 = time.perf_counter()
+            try:
+                result = primary.transcribe_pcm(audio, sample_rate, language=language)
+            except Exception as e:
+                self.on_outcome(primary.name, e)
+                raise
+            self.record(primary.name, time.perf_counter() - t0, audio_s)
+            self.on_outcome(primary.name, None)
+            return result
+
+        done: queue.Queue = queue.Queue()
+        cancel = {primary.name: threading.Event(), secondary.name: threading.Event()}
+
+        def race(t: Transcriber) -> None:
+            t0 = time.perf_counter()
+            try:
+                result = run_cancellable(t, audio, sample_rate, language, cancel[t.name])
+            except Exception as e:
+                if not cancel[t.name].is_set():
+                    self.on_outcome(t.name, e)
+                done.put((t, None, e))
+                return
+            if t is primary:
+                self.record(t.name, time.perf_counter() - t0, audio_s)
+            self.on_outcome(t.name, None)
+            done.put((t, result, None))
+
+        t0 = time.perf_counter()
+        deadline = self.deadline(primary.name, audio_s)
+        threading.Thread(target=race, args=(primary,), daemon=True, name="dictapp-hedge-primary").start()
+        errors: dict[str, Exception] = {}
+        try:
+            t, result, error = done.get(timeout=deadline)
+        except queue.Empty:
+            self.log_fn(
+                f"[TX] hedge: {primary.name} sin respuesta a los {deadline:.2f}s "
+                f"(p{self.pct:.0f} · {audio_s:.1f}s de audio) → también {secondary.name}"
+            )
+        else:
+            if error is None:
+                return result
+            errors[primary.name] = error
+            self.log_fn(
+                f"[TX] hedge: {primary.name} falló a los {time.perf_counter() - t0:.2f}s "
+                f"({error}) → {secondary.name}"
+            )
+        threading.Thread(target=race, args=(secondary,), daemon=True, name="dictapp-hedge-secondary").start()
+        while len(errors) < 2:
+            t, result, error = done.get()
+            if error is not None:
+                self.log_fn(f"[TX] hedge: {t.name} falló ({error})")
+                errors[t.name] = error
+                continue
+            loser = secondary if t is primary else primary
+            cancel[loser.name].set()
+            self.wins[t.name] = self.wins.get(t.name, 0) + 1
+            fate = "ya había fallado" if loser.name in errors else "se descarta"
+            self.log_fn(
+                f"[TX] hedge: ganó {t.name} a los {time.perf_counter() - t0:.2f}s "
+                f"({loser.name} {fate}) · ganadas {self.wins}"
+            )
+            return result
+        raise errors[primary.name]
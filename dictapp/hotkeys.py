@@ -1,6 +1,9 @@
 """Wrapper de keyboard.add_hotkey con re-registro seguro."""
 from __future__ import annotations
 
+import sys
+import threading
+import time
 from typing import Callable
 
 try:
@@ -10,6 +13,121 @@ except Exception:
     keyboard = None  # type: ignore
     KEYBOARD_AVAILABLE = False
 
+try:
+    import mouse
+    MOUSE_AVAILABLE = True
+except Exception:
+    mouse = None  # type: ignore
+    MOUSE_AVAILABLE = False
+
+
+def focus_target() -> tuple | None:
+    """(ventana activa, control con foco, rect del caret) del primer plano.
+
+    Solo Windows (GetGUIThreadInfo); None si no se puede saber. El caret
+    delata un click dentro del mismo campo aunque no cambie el foco.
+    """
+    if sys.platform != "win32":
+        return None
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class GUITHREADINFO(ctypes.Structure):
+            _fields_ = [
+                ("cbSize", wintypes.DWORD),
+                ("flags", wintypes.DWORD),
+                ("hwndActive", wintypes.HWND),
+                ("hwndFocus", wintypes.HWND),
+                ("hwndCapture", wintypes.HWND),
+                ("hwndMenuOwner", wintypes.HWND),
+                ("hwndMoveSize", wintypes.HWND),
+                ("hwndCaret", wintypes.HWND),
+                ("rcCaret", wintypes.RECT),
+            ]
+
+        info = GUITHREADINFO()
+        info.cbSize = ctypes.sizeof(info)
+        if not ctypes.windll.user32.GetGUIThreadInfo(0, ctypes.byref(info)):
+            return None
+        rc = info.rcCaret
+        return (info.hwndActive, info.hwndFocus, info.hwndCaret, (rc.left, rc.top, rc.right, rc.bottom))
+    except Exception:
+        return None
+
+
+class TypingWatch:
+    """Detecta si el usuario tocó algo desde que se crea hasta `stop()`:
+    teclas, clicks (con el paquete `mouse`) o un cambio de ventana, control
+    con foco o posición del caret.
+
+    Ignora los primeros `grace_s` segundos: el Ctrl+V que acabamos de mandar
+    puede llegar al hook un poco tarde, y recién después el caret queda al
+    final de lo pegado. Ahí se toma la foto del foco contra la que se compara.
+    """
+
+    def __init__(self, grace_s: float = 0.15) -> None:
+        self.typed = False
+        self.clicked = False
+        self._since = time.monotonic() + grace_s
+        self._hook = None
+        self._mouse_hook = None
+        self._target: tuple | None = None
+        if KEYBOARD_AVAILABLE:
+            try:
+                self._hook = keyboard.hook(self._on_event)
+            except Exception:
+                self._hook = None
+        if MOUSE_AVAILABLE:
+            try:
+                self._mouse_hook = mouse.hook(self._on_mouse)
+            except Exception:
+                self._mouse_hook = None
+        self._timer = threading.Timer(grace_s, self._snapshot)
+        self._timer.daemon = True
+        self._timer.start()
+
+    @property
+    def active(self) -> bool:
+        return self._hook is not None
+
+    def _snapshot(self) -> None:
+        self._target = focus_target()
+
+    def _on_event(self, event) -> None:
+        if event.event_type == "down" and time.monotonic() >= self._since:
+            self.typed = True
+
+    def _on_mouse(self, event) -> None:
+        if getattr(event, "event_type", None) in ("down", "double") and time.monotonic() >= self._since:
+            self.clicked = True
+
+    def focus_moved(self) -> bool:
+        """True si hubo clicks o el foco/caret ya no es el de después de
+        pegar. Si no hay forma de comprobarlo también: borrar a ciegas puede
+        comerse texto ajeno."""
+        if self.clicked:
+            return True
+        now = focus_target()
+        return self._target is None or now is None or now != self._target
+
+    def stop(self) -> bool:
+        """Quita los hooks y devuelve si hubo teclas."""
+        self._timer.cancel()
+        if self._hook is not None:
+            try:
+                keyboard.unhook(self._hook)
+            except Exception:
+                pass
+            self._hook = None
+        if self._mouse_hook is not None:
+            try:
+                mouse.unhook(self._mouse_hook)
+            except Exception:
+                pass
+            self._mouse_hook = None
+        return self.typed
+
 
 class HotkeyManager:
     def __init__(self) -> None:
@@ -47,3 +165,13 @@ class HotkeyManager:
     def send_paste() -> None:
         if KEYBOARD_AVAILABLE:
             keyboard.send("ctrl+v")
+
+    @staticmethod
+    def send_backspaces(count: int) -> None:
+        if KEYBOARD_AVAILABLE:
+            for _ in range(count):
+                keyboard.send("backspace")
+
+    @staticmethod
+    def watch_typing() -> TypingWatch:
+        return TypingWatch()
@@ -11,6 +11,8 @@ from .theme import PALETTE
 from .version import APP_NAME, VERSION
 
 VOICE_THRESHOLD = 0.06  # nivel a partir del cual el dot se enciende como "voz detectada"
+# perfiles de decodificación de Whisper local (clave en settings.json → texto en la UI)
+PROFILE_LABELS = {"default": "Estándar", "fast": "Rápido", "balanced": "Equilibrado", "accurate": "Preciso"}
 
 
 class MainWindow:
@@ -31,10 +33,18 @@ class MainWindow:
         on_change_ffmpeg_device: Callable[[str], None] | None = None,
         list_ffmpeg_devices: Callable[[], list] | None = None,
         on_close: Callable[[], None] | None = None,
+        meter_factory: Callable[[int], object] | None = None,
+        list_microphones: Callable[[], list] | None = None,
+        on_refresh_devices: Callable[[], None] | None = None,
+        on_benchmark_local: Callable[[], None] | None = None,
+        on_download_local: Callable[[], None] | None = None,
+        on_change_groq_extra_keys: Callable[[list[str]], None] | None = None,
     ) -> None:
         self.root = root
         self.config = config
-        self._mic_meter: SDLiveMeter | None = None
+        # el meter puede ser un SDLiveMeter o el stream compartido del App
+        self._meter_factory = meter_factory or (lambda index: SDLiveMeter(index, log_fn=lambda m: self.log(m)))
+        self._mic_meter = None
         self._curated_mics: list[audio.MicDevice] = []
         self._active_mic_index: int = -1
         self._level_override = None  # callable que devuelve un nivel 0..1 (durante grabación)
@@ -47,10 +57,16 @@ class MainWindow:
         self._on_change_mic = on_change_mic
         self._on_change_setting = on_change_setting
         self._on_warm_up_local = on_warm_up_local
+        self._on_benchmark_local = on_benchmark_local
+        self._on_download_local = on_download_local
+        self._on_change_groq_extra_keys = on_change_groq_extra_keys or (lambda _keys: None)
         self._on_toggle_log = on_toggle_log
         self._on_change_ffmpeg_device = on_change_ffmpeg_device or (lambda _name: None)
         self._list_ffmpeg_devices = list_ffmpeg_devices or (lambda: [])
         self._on_close = on_close or (lambda: None)
+        # listado de mics (snapshot en memoria del App) y ↻ que fuerza re-enumerar
+        self._list_microphones = list_microphones or audio.list_curated_input_devices
+        self._on_refresh_devices = on_refresh_devices or self._refresh_all_devices
 
         self._build()
 
@@ -149,10 +165,19 @@ class MainWindow:
         ttk.Label(tab, text="Servicio de transcripción",
                   style="Subtitle.TLabel").pack(anchor="w", padx=10, pady=(12, 4))
         self.service_var = tk.StringVar(value=self.config.get("service"))
-        for opt in ("Whisper (Groq)", "Google", "Whisper local"):
+        for opt in ("Whisper (Groq)", "Google", "Whisper local", "Auto"):
             ttk.Radiobutton(tab, text=opt, value=opt, variable=self.service_var,
                             command=lambda: self._on_change_service(self.service_var.get())
                             ).pack(anchor="w", padx=14, pady=2)
+        target_row = ttk.Frame(tab, style="TFrame")
+        target_row.pack(fill=tk.X, padx=14, pady=(2, 0))
+        ttk.Label(target_row, text="Auto: latencia objetivo (s):").pack(side=tk.LEFT)
+        self.target_var = tk.StringVar(value=f"{float(self.config.get('latency_target_s', 2.0)):g}")
+        target_cb = ttk.Combobox(target_row, textvariable=self.target_var, state="readonly",
+                                 values=["1", "1.5", "2", "3", "5", "10"], width=5)
+        target_cb.pack(side=tk.LEFT, padx=(6, 0))
+        target_cb.bind("<<ComboboxSelected>>",
+                       lambda *_: self._on_change_setting("latency_target_s", float(self.target_var.get())))
 
         ttk.Separator(tab).pack(fill=tk.X, padx=10, pady=10)
 
@@ -160,7 +185,7 @@ class MainWindow:
         mic_header.pack(fill=tk.X, padx=10, pady=(0, 0))
         ttk.Label(mic_header, text="Micrófono",
                   style="Subtitle.TLabel").pack(side=tk.LEFT)
-        ttk.Button(mic_header, text="↻", width=3, command=self.refresh_microphones
+        ttk.Button(mic_header, text="↻", width=3, command=lambda: self._on_refresh_devices()
                    ).pack(side=tk.RIGHT)
 
         # fila del mic activo: dot de voz + nombre + barra de nivel
@@ -212,7 +237,25 @@ class MainWindow:
 
         ttk.Button(local_row, text="Pre-cargar", command=self._on_warm_up_local
                    ).pack(side=tk.LEFT)
-        ttk.Label(tab, text="La 1ra vez descarga el modelo (~50 MB tiny, ~3 GB large-v3).",
+        if self._on_download_local is not None:
+            ttk.Button(local_row, text="Descargar", command=self._on_download_local
+                       ).pack(side=tk.LEFT, padx=(6, 0))
+        if self._on_benchmark_local is not None:
+            ttk.Button(local_row, text="Medir equipo", command=self._on_benchmark_local
+                       ).pack(side=tk.LEFT, padx=(6, 0))
+
+        profile_row = ttk.Frame(tab, style="TFrame")
+        profile_row.pack(fill=tk.X, padx=10, pady=(0, 8))
+        ttk.Label(profile_row, text="Perfil:").pack(side=tk.LEFT)
+        current = PROFILE_LABELS.get(str(self.config.get("local_profile", "default")), "Estándar")
+        self.profile_var = tk.StringVar(value=current)
+        profile_cb = ttk.Combobox(profile_row, textvariable=self.profile_var, state="readonly",
+                                  values=list(PROFILE_LABELS.values()), width=12)
+        profile_cb.pack(side=tk.LEFT, padx=(6, 12))
+        profile_cb.bind("<<ComboboxSelected>>", lambda *_: self._on_profile_selected())
+        ttk.Label(profile_row, text="Rápido = menos latencia · Preciso = mejor texto",
+                  style="Subtitle.TLabel").pack(side=tk.LEFT)
+        ttk.Label(tab, text="Descargar baja el modelo una vez (~50 MB tiny, ~3 GB large-v3); después carga sin red.",
                   style="Subtitle.TLabel").pack(anchor="w", padx=10)
 
     def _build_tab_settings(self) -> None:
@@ -234,6 +277,54 @@ class MainWindow:
                    ).pack(side=tk.LEFT, padx=(6, 0))
         ttk.Label(tab, text="Se guarda con keyring (DPAPI). Nunca en texto plano.",
                   style="Subtitle.TLabel").pack(anchor="w", padx=10, pady=(2, 8))
+        extra_row = ttk.Frame(tab, style="TFrame")
+        extra_row.pack(fill=tk.X, padx=10)
+        ttk.Label(extra_row, text="Keys extra:").pack(side=tk.LEFT)
+        self.extra_keys_var = tk.StringVar()
+        ttk.Entry(extra_row, textvariable=self.extra_keys_var, show="•").pack(
+            side=tk.LEFT, fill=tk.X, expand=True, padx=(6, 0))
+        ttk.Button(extra_row, text="Guardar",
+                   command=lambda: self._on_change_groq_extra_keys(
+                       [k for k in self.extra_keys_var.get().replace(",", " ").split() if k])
+                   ).pack(side=tk.LEFT, padx=(6, 0))
+        ttk.Button(extra_row, text="Borrar",
+                   command=lambda: (self.extra_keys_var.set(""),
+                                    self._on_change_groq_extra_keys([]))
+                   ).pack(side=tk.LEFT, padx=(6, 0))
+        ttk.Label(tab, text="Separadas por coma. Los requests rotan entre todas las keys.",
+                  style="Subtitle.TLabel").pack(anchor="w", padx=10, pady=(2, 8))
+        groq_model_row = ttk.Frame(tab, style="TFrame")
+        groq_model_row.pack(fill=tk.X, padx=10, pady=(0, 4))
+        ttk.Label(groq_model_row, text="Modelo de Groq:").pack(side=tk.LEFT)
+        self.groq_model_var = tk.StringVar(value=self.config.get("groq_model", "whisper-large-v3"))
+        groq_model_cb = ttk.Combobox(groq_model_row, textvariable=self.groq_model_var, state="readonly",
+                                     values=["whisper-large-v3", "whisper-large-v3-turbo"], width=24)
+        groq_model_cb.pack(side=tk.LEFT, padx=(6, 0))
+        groq_model_cb.bind("<<ComboboxSelected>>",
+                           lambda *_: self._on_change_setting("groq_model", self.groq_model_var.get()))
+        up_row = ttk.Frame(tab, style="TFrame")
+        up_row.pack(fill=tk.X, padx=10, pady=(0, 4))
+        ttk.Label(up_row, text="Formato de subida:").pack(side=tk.LEFT)
+        self.upload_var = tk.StringVar(value=self.config.get("upload_format", "auto"))
+        upload_cb = ttk.Combobox(up_row, textvariable=self.upload_var, state="readonly",
+                                 values=["auto", "flac", "opus", "wav"], width=8)
+        upload_cb.pack(side=tk.LEFT, padx=(6, 0))
+        upload_cb.bind("<<ComboboxSelected>>",
+                       lambda *_: self._on_change_setting("upload_format", self.upload_var.get()))
+        ttk.Label(tab, text="auto: FLAC en dictados cortos, Opus en los largos.",
+                  style="Subtitle.TLabel").pack(anchor="w", padx=10, pady=(0, 8))
+        hedge_row = ttk.Frame(tab, style="TFrame")
+        hedge_row.pack(fill=tk.X, padx=10, pady=(0, 4))
+        ttk.Label(hedge_row, text="Si la nube tarda, probar también:").pack(side=tk.LEFT)
+        hedge = self.config.get("hedge_backend", "Whisper local")
+        self.hedge_var = tk.StringVar(value="Whisper local" if hedge == "auto" else hedge)
+        hedge_cb = ttk.Combobox(hedge_row, textvariable=self.hedge_var, state="readonly",
+                                values=["Whisper local", "Google", "off"], width=14)
+        hedge_cb.pack(side=tk.LEFT, padx=(6, 0))
+        hedge_cb.bind("<<ComboboxSelected>>",
+                      lambda *_: self._on_change_setting("hedge_backend", self.hedge_var.get()))
+        ttk.Label(tab, text="Whisper local solo si ya está cargado. Google recibe una copia del audio.",
+                  style="Subtitle.TLabel").pack(anchor="w", padx=10, pady=(0, 8))
 
         ttk.Separator(tab).pack(fill=tk.X, padx=10, pady=10)
 
@@ -259,9 +350,14 @@ class MainWindow:
         self.ff_device_combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
         self.ff_device_combo.bind("<<ComboboxSelected>>",
                                   lambda *_: self._on_change_ffmpeg_device(self.ff_device_var.get()))
-        ttk.Button(ff_row, text="↻", width=3, command=self.refresh_ffmpeg_devices
+        ttk.Button(ff_row, text="↻", width=3, command=lambda: self._on_refresh_devices()
                    ).pack(side=tk.LEFT, padx=(6, 0))
         self.refresh_ffmpeg_devices()
+        self.var_ff_pipe = tk.BooleanVar(value=bool(self.config.get("ffmpeg_pipe", True)))
+        ttk.Checkbutton(tab, text="Leer audio por pipe (sin WAV temporal, con nivel en vivo)",
+                        variable=self.var_ff_pipe,
+                        command=lambda: self._toggle_setting("ffmpeg_pipe", self.var_ff_pipe)
+                        ).pack(anchor="w", padx=14, pady=2)
 
         ttk.Separator(tab).pack(fill=tk.X, padx=10, pady=10)
 
@@ -269,10 +365,24 @@ class MainWindow:
         self.var_top = tk.BooleanVar(value=bool(self.config.get("always_on_top")))
         self.var_paste = tk.BooleanVar(value=bool(self.config.get("auto_paste")))
         self.var_trim = tk.BooleanVar(value=bool(self.config.get("trim_silence")))
+        self.var_resample = tk.BooleanVar(value=bool(self.config.get("resample_16k", True)))
+        self.var_incremental = tk.BooleanVar(value=bool(self.config.get("incremental_transcription")))
+        self.var_shared = tk.BooleanVar(value=bool(self.config.get("shared_capture")))
+        self.var_warmup = tk.BooleanVar(value=bool(self.config.get("local_warmup_at_start")))
+        self.var_progressive = tk.BooleanVar(value=bool(self.config.get("progressive_delivery")))
+        self.var_oop = tk.BooleanVar(value=bool(self.config.get("local_out_of_process")))
+        self.var_two_pass = tk.BooleanVar(value=bool(self.config.get("local_two_pass")))
         for label, var, key in (
             ("Siempre encima",            self.var_top,     "always_on_top"),
             ("Auto-pegar al terminar",    self.var_paste,   "auto_paste"),
             ("Recortar silencios",        self.var_trim,    "trim_silence"),
+            ("Enviar audio a 16 kHz (menos bytes, igual precisión)", self.var_resample, "resample_16k"),
+            ("Transcribir mientras grabo (por pausas)", self.var_incremental, "incremental_transcription"),
+            ("Mic siempre abierto (arranque instantáneo + pre-roll)", self.var_shared, "shared_capture"),
+            ("Pre-cargar Whisper local al abrir", self.var_warmup, "local_warmup_at_start"),
+            ("Whisper local: pegar frase por frase", self.var_progressive, "progressive_delivery"),
+            ("Whisper local en proceso aparte (UI y audio sin trabas)", self.var_oop, "local_out_of_process"),
+            ("Whisper local: borrador rápido + versión final", self.var_two_pass, "local_two_pass"),
         ):
             ttk.Checkbutton(tab, text=label, variable=var,
                             command=lambda k=key, v=var: self._toggle_setting(k, v)
@@ -287,6 +397,11 @@ class MainWindow:
         self.status_dot.delete("all")
         self.status_dot.create_oval(2, 2, 12, 12, fill=color, outline="")
 
+    def _on_profile_selected(self) -> None:
+        label = self.profile_var.get()
+        key = next((k for k, v in PROFILE_LABELS.items() if v == label), "default")
+        self._on_change_setting("local_profile", key)
+
     def _toggle_setting(self, key: str, var: tk.BooleanVar) -> None:
         value = bool(var.get())
         self._on_change_setting(key, value)
@@ -373,7 +488,7 @@ class MainWindow:
     def refresh_microphones(self) -> None:
         self._stop_mic_meter()
         try:
-            devs = audio.list_curated_input_devices()
+            devs = list(self._list_microphones())
         except Exception as e:
             self.log(f"No se pudo listar micrófonos: {e}")
             return
@@ -402,11 +517,15 @@ class MainWindow:
 
         self._start_mic_meter(active.index)
 
+    def _refresh_all_devices(self) -> None:
+        self.refresh_microphones()
+        self.refresh_ffmpeg_devices()
+
     def _start_mic_meter(self, index: int) -> None:
         if not SD_AVAILABLE:
             self.log("VU desactivado: sounddevice no disponible.")
             return
-        self._mic_meter = SDLiveMeter(index, log_fn=lambda m: self.log(m))
+        self._mic_meter = self._meter_factory(index)
         try:
             self._mic_meter.start()
         except Exception as e:
@@ -0,0 +1,378 @@
+"""Utilidades de PCM int16 mono compartidas por los tres recorders.
+
+Este módulo no depende de ningún backend de audio (PyAudio, sounddevice,
+ffmpeg) para poder usarse desde cualquiera de ellos.
+"""
+from __future__ import annotations
+
+import math
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+try:
+    import numpy as np
+except Exception:
+    np = None  # type: ignore
+
+# audioop desaparece en Python 3.13: se usa solo si está y no hay numpy
+try:
+    import warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        import audioop
+except Exception:
+    audioop = None  # type: ignore
+
+SAMPLE_WIDTH = 2  # 16-bit
+
+# ~30 s a 48 kHz mono: alcanza para la mayoría de dictados sin crecer nunca
+DEFAULT_CAPACITY = 48000 * SAMPLE_WIDTH * 30
+
+# parámetros de trim_silence (ventana, umbral adaptativo, padding, safety)
+RMS_WINDOW_S = 0.05
+TRIM_PEAK_RATIO = 0.15
+TRIM_MIN_THRESHOLD = 120
+TRIM_QUIET_PEAK = 200
+TRIM_PAD_S = 0.2
+TRIM_MIN_KEEP = 0.25
+
+# Whisper trabaja a 16 kHz mono: subir más es ancho de banda y CPU desperdiciados
+TARGET_RATE = 16000
+RESAMPLE_ZEROS = 16        # cruces por cero del sinc a cada lado (calidad del filtro)
+RESAMPLE_BETA = 8.6        # ventana Kaiser: ~-80 dB en la banda de rechazo
+RESAMPLE_BLOCK = 32768     # muestras de salida por bloque (acota la memoria temporal)
+
+
+def _samples(data) -> "array":
+    a = array("h")
+    a.frombytes(memoryview(data).cast("B"))
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a
+
+
+def rms_int16(data) -> int:
+    """RMS de un bloque s16le: numpy, audioop o Python puro, en ese orden."""
+    mv = memoryview(data).cast("B")
+    n = mv.nbytes // SAMPLE_WIDTH
+    if n == 0:
+        return 0
+    mv = mv[:n * SAMPLE_WIDTH]
+    if np is not None:
+        arr = np.frombuffer(mv, dtype="<i2").astype(np.float64)
+        return int(math.sqrt(float(np.dot(arr, arr)) / n))
+    if audioop is not None and sys.byteorder == "little":
+        return audioop.rms(mv, SAMPLE_WIDTH)
+    return int(math.sqrt(sum(x * x for x in _samples(mv)) / n))
+
+
+def to_mono_int16(data, channels: int) -> bytes:
+    """Promedia canales intercalados s16le a mono."""
+    if channels <= 1:
+        return bytes(data)
+    if np is not None:
+        arr = np.frombuffer(memoryview(data).cast("B"), dtype="<i2")
+        arr = arr[: len(arr) - len(arr) % channels].reshape(-1, channels)
+        return arr.mean(axis=1).astype("<i2").tobytes()
+    if channels == 2 and audioop is not None and sys.byteorder == "little":
+        return audioop.tomono(data, SAMPLE_WIDTH, 0.5, 0.5)
+    a = _samples(data)
+    out = array("h", (int(sum(a[i:i + channels]) / channels)
+                      for i in range(0, len(a) - len(a) % channels, channels)))
+    if sys.byteorder != "little":
+        out.byteswap()
+    return out.tobytes()
+
+
+def level_from_rms(previous: float, rms: float) -> float:
+    """Nivel 0..1 para VU/tray: sube rápido, baja suave."""
+    new_lvl = min(1.0, rms / 4000.0)
+    if new_lvl > previous:
+        return new_lvl
+    return previous * 0.78 + new_lvl * 0.22
+
+
+def rms_window_bytes(sample_rate: int) -> int:
+    return int(sample_rate * RMS_WINDOW_S) * SAMPLE_WIDTH
+
+
+def trim_bounds(rms: "list[int]", prefix_max: "list[int]", win: int, total: int,
+                sample_rate: int, threshold: int | None = None,
+                count: int | None = None) -> tuple[int, int] | None:
+    """Límites [start, end) en bytes tras recortar silencios, o None si no se recorta.
+
+    Trabaja sobre la tabla de RMS por ventana de 50 ms (`rms`) y su máximo
+    acumulado (`prefix_max`, monótono): el pico es el último elemento, el
+    primer tramo con voz sale por búsqueda binaria y el último se busca desde
+    el final (el silencio de cola es corto). Semántica de trim_silence:
+    umbral 15% del pico (piso 120), sin recorte si el pico < 200, 200 ms de
+    padding y, si quedaría < 25% del original, no se recorta. `count` limita
+    la tabla a sus primeras ventanas (vista más corta que el buffer).
+    """
+    n = len(rms) if count is None else min(count, len(rms))
+    if n == 0 or win <= 0:
+        return None
+    if threshold is None:
+        peak = prefix_max[n - 1]
+        if peak < TRIM_QUIET_PEAK:
+            return None
+        threshold = max(TRIM_MIN_THRESHOLD, int(peak * TRIM_PEAK_RATIO))
+    first = bisect_right(prefix_max, threshold, 0, n)
+    if first >= n:
+        return None
+    last = n - 1
+    while last > first and rms[last] <= threshold:
+        last -= 1
+    pad = int(sample_rate * TRIM_PAD_S) * SAMPLE_WIDTH
+    start = max(0, first * win - pad)
+    end = min(total, (last + 1) * win + pad)
+    if (end - start) < total * TRIM_MIN_KEEP or end <= start:
+        return None
+    return start, end
+
+
+def rms_table(pcm, win: int) -> tuple[list[int], list[int]]:
+    """Tabla (rms, máximo acumulado) por ventanas completas de `win` bytes."""
+    mv = memoryview(pcm).cast("B")
+    rms: list[int] = []
+    prefix: list[int] = []
+    peak = 0
+    for pos in range(0, mv.nbytes - win + 1, win):
+        v = rms_int16(mv[pos:pos + win])
+        peak = max(peak, v)
+        rms.append(v)
+        prefix.append(peak)
+    return rms, prefix
+
+
+def chunk_bounds(pcm, sample_rate: int, chunk_s: float, overlap_s: float = 1.0,
+                 search_s: float = 3.0) -> list[tuple[int, int]]:
+    """Parte un PCM largo en trozos [start, end) en bytes de ~`chunk_s` segundos.
+
+    Cada corte cae en la ventana de 50 ms más silenciosa a ±`search_s` del
+    corte ideal (a igual RMS, la más cercana), y cada trozo salvo el primero
+    arranca `overlap_s` antes del corte: una palabra partida queda entera en
+    alguno de los dos. Un PCM de menos de 1.5 × `chunk_s` sale entero.
+    """
+    total = len(pcm)
+    bps = sample_rate * SAMPLE_WIDTH
+    win = rms_window_bytes(sample_rate)
+    chunk = int(chunk_s * bps)
+    if chunk <= 0 or win <= 0 or total < chunk * 1.5:
+        return [(0, total)]
+    rms, _prefix = rms_table(pcm, win)
+    search = int(search_s * bps)
+    cuts: list[int] = []
+    pos = 0
+    while total - pos >= chunk * 1.5:
+        ideal = pos + chunk
+        lo = max(pos + win, ideal - search) // win
+        hi = min(len(rms), (ideal + search) // win + 1)
+        best = min(range(lo, hi), key=lambda i: (rms[i], abs(i * win - ideal)))
+        cut = best * win + win // 2
+        cut -= cut % SAMPLE_WIDTH
+        cuts.append(cut)
+        pos = cut
+    overlap = int(overlap_s * sample_rate) * SAMPLE_WIDTH
+    starts = [0] + [max(0, c - overlap) for c in cuts]
+    ends = cuts + [total]
+    return list(zip(starts, ends))
+
+
+def trim_silence(pcm, threshold: int | None = None, sample_rate: int = 16000):
+    """Recorta silencios al inicio y al final de un PCM ya terminado.
+
+    Con un memoryview devuelve un slice sin copia. Si el PCM viene de un
+    `PCMBuffer` con tabla de RMS conviene `PCMBuffer.trim_silence()`, que no
+    vuelve a recorrer el audio.
+    """
+    if not pcm:
+        return pcm
+    win = rms_window_bytes(sample_rate)
+    if win <= 0 or win > len(pcm):
+        return pcm
+    rms, prefix = rms_table(pcm, win)
+    bounds = trim_bounds(rms, prefix, win, len(pcm), sample_rate, threshold)
+    if bounds is None:
+        return pcm
+    return pcm[bounds[0]:bounds[1]]
+
+
+@lru_cache(maxsize=8)
+def _polyphase_table(up: int, down: int):
+    """Filtro pasabajos (sinc con ventana Kaiser) partido en `up` fases.
+
+    Fila p = pesos para una salida cuya posición en la entrada cae p/up
+    muestras después de la base. El corte va al Nyquist de la tasa menor, así
+    al bajar de 48 kHz no entra aliasing de lo que hay sobre 8 kHz.
+    """
+    ratio = max(1.0, down / up)
+    half = int(math.ceil(RESAMPLE_ZEROS * ratio))
+    taps = np.arange(-half + 1, half + 1, dtype=np.float64)     # (K,)
+    frac = np.arange(up, dtype=np.float64)[:, None] / up        # (up, 1)
+    x = taps[None, :] - frac                                    # distancia en muestras de entrada
+    h = np.sinc(x / ratio) / ratio
+    # Kaiser evaluada en la posición fraccionaria exacta de cada tap
+    r = np.clip(x / half, -1.0, 1.0)
+    h *= np.i0(RESAMPLE_BETA * np.sqrt(1.0 - r * r)) / np.i0(RESAMPLE_BETA)
+    h /= h.sum(axis=1, keepdims=True)                           # ganancia DC exacta por fase
+    return h.astype(np.float32), half
+
+
+def resample_int16(pcm, src_rate: int, dst_rate: int = TARGET_RATE):
+    """Convierte PCM int16 mono de `src_rate` a `dst_rate` con un FIR polifásico.
+
+    Vectorizado con numpy por bloques. Sin numpy cae a `audioop.ratecv` (sin
+    filtro de banda) y, si tampoco está, devuelve el audio tal cual junto con
+    la tasa original. Devuelve (pcm, tasa_resultante).
+    """
+    if not pcm or src_rate == dst_rate or src_rate <= 0:
+        return pcm, src_rate
+    mv = memoryview(pcm).cast("B")
+    mv = mv[:mv.nbytes - mv.nbytes % SAMPLE_WIDTH]
+    if np is None:
+        if audioop is not None and sys.byteorder == "little":
+            out, _ = audioop.ratecv(mv, SAMPLE_WIDTH, 1, src_rate, dst_rate, None)
+            return out, dst_rate
+        return pcm, src_rate
+
+    g = math.gcd(src_rate, dst_rate)
+    up, down = dst_rate // g, src_rate // g
+    h, half = _polyphase_table(up, down)
+    x = np.frombuffer(mv, dtype="<i2").astype(np.float32)
+    n_in = len(x)
+    n_out = (n_in * up) // down
+    # padding de ceros a los lados: el filtro mira `half` muestras hacia cada lado
+    xp = np.concatenate([np.zeros(half, np.float32), x, np.zeros(half + 1, np.float32)])
+    offsets = np.arange(-half + 1, half + 1) + half             # (K,)
+    out = np.empty(n_out, dtype=np.float32)
+    for start in range(0, n_out, RESAMPLE_BLOCK):
+        n = np.arange(start, min(n_out, start + RESAMPLE_BLOCK), dtype=np.int64)
+        pos = n * down
+        base, phase = pos // up, pos % up
+        frames = xp[base[:, None] + offsets[None, :]]           # (B, K)
+        out[start:start + len(n)] = np.einsum("ij,ij->i", frames, h[phase])
+    return np.clip(np.rint(out), -32768, 32767).astype("<i2").tobytes(), dst_rate
+
+
+class PCMBuffer:
+    """Buffer contiguo, preasignado y que crece duplicando su capacidad.
+
+    Los recorders escriben bloques con `append()` y al detener devuelven
+    `view()`: un memoryview sin copia sobre los bytes grabados. Al crecer
+    nunca se redimensiona el bytearray en el lugar (eso fallaría con vistas
+    exportadas): se reserva uno nuevo del doble y se copia una sola vez, así
+    cualquier vista entregada antes sigue siendo válida.
+
+    Si se conoce la tasa de muestreo, cada `append()` completa además una
+    tabla de RMS por ventana de 50 ms (y su máximo acumulado). Al detener,
+    `trim_silence()` solo consulta esa tabla y corta un slice: no vuelve a
+    recorrer la grabación.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, sample_rate: int | None = None) -> None:
+        self._buf = bytearray(max(capacity, SAMPLE_WIDTH))
+        self._size = 0
+        self._lock = threading.Lock()
+        self._rate: int | None = None
+        self._win = 0
+        self._rms: list[int] = []
+        self._prefix_max: list[int] = []
+        if sample_rate:
+            self.set_sample_rate(sample_rate)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    @property
+    def sample_rate(self) -> int | None:
+        return self._rate
+
+    def set_sample_rate(self, sample_rate: int) -> None:
+        """Fija la tasa (al abrir el stream) y rehace la tabla si ya había audio."""
+        with self._lock:
+            if sample_rate == self._rate:
+                return
+            self._rate = sample_rate
+            self._win = rms_window_bytes(sample_rate)
+            self._rms = []
+            self._prefix_max = []
+            self._update_table()
+
+    def append(self, data) -> None:
+        """Agrega un bloque (bytes, bytearray, memoryview o ndarray contiguo)."""
+        mv = memoryview(data).cast("B")
+        n = mv.nbytes
+        if n == 0:
+            return
+        with self._lock:
+            end = self._size + n
+            if end > len(self._buf):
+                self._grow(end)
+            # asignación de igual tamaño: no redimensiona, válida con vistas vivas
+            self._buf[self._size:end] = mv
+            self._size = end
+            self._update_table()
+
+    def _update_table(self) -> None:
+        """Completa las ventanas de RMS que cerró el último bloque (con lock)."""
+        win = self._win
+        if win <= 0:
+            return
+        pos = len(self._rms) * win
+        if self._size - pos < win:
+            return
+        buf = memoryview(self._buf)
+        peak = self._prefix_max[-1] if self._prefix_max else 0
+        while self._size - pos >= win:
+            v = rms_int16(buf[pos:pos + win])
+            if v > peak:
+                peak = v
+            self._rms.append(v)
+            self._prefix_max.append(peak)
+            pos += win
+        buf.release()
+
+    def _grow(self, needed: int) -> None:
+        cap = len(self._buf)
+        while cap < needed:
+            cap *= 2
+        new = bytearray(cap)
+        new[:self._size] = memoryview(self._buf)[:self._size]
+        self._buf = new
+
+    def view(self, start: int = 0, end: int | None = None) -> memoryview:
+        """Vista sin copia sobre los bytes escritos (por defecto, todos)."""
+        with self._lock:
+            size = self._size
+            buf = self._buf
+        end = size if end is None else min(end, size)
+        return memoryview(buf)[start:end]
+
+    def trim_silence(self, view: memoryview | None = None,
+                     threshold: int | None = None) -> memoryview:
+        """Recorta silencios de inicio/fin usando la tabla de RMS ya calculada.
+
+        `view` es una vista de este buffer desde el byte 0 (la que devolvió
+        `stop()`); por defecto, todo lo grabado. Sin tasa conocida no se
+        recorta.
+        """
+        if view is None:
+            view = self.view()
+        total = view.nbytes
+        with self._lock:
+            rms, prefix, win, rate = self._rms, self._prefix_max, self._win, self._rate
+            count = min(len(rms), total // win) if win else 0
+        if not rate or count == 0:
+            return view
+        bounds = trim_bounds(rms, prefix, win, total, rate, threshold, count=count)
+        if bounds is None:
+            return view
+        return view[bounds[0]:bounds[1]]
@@ -0,0 +1,191 @@
+"""Servicio "Auto": elige backend y modelo por dictado según la latencia.
+
+Candidatos: los modelos de Groq (large-v3 / turbo), Google y los tamaños de
+Whisper local ya descargados. Para cada uno se predice la latencia p90 del
+dictado que se acaba de grabar, y se elige el de mejor calidad que entra en
+`latency_target_s`. Si ninguno entra, el más rápido.
+
+Modelo de latencia por ruta: una curva a priori `base + por_segundo × audio`
+(cloud: casi todo overhead; local: proporcional al audio) escalada por lo
+observado. Cada dictado anota `real / a priori`; el promedio móvil (EWMA) da
+la tendencia y el p90 de las últimas razones, la cola. Se persiste en
+`latency_stats.json` junto a settings.json, así la app no arranca de cero.
+
+Una ruta que se puso lenta deja de elegirse y entonces ya no se mide: por
+eso lo observado pierde peso con el tiempo (`DECAY_S`) y la predicción
+vuelve hacia la curva a priori, dándole otra oportunidad.
+
+Si el hedging hizo ganar a otro backend, el dictado se anota igual con el
+tiempo hasta el resultado: es una cota inferior de lo que tardó la ruta
+elegida, y alcanza para que deje de elegirse si sigue lenta.
+"""
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from .config import data_path
+from .hedging import percentile
+
+AUTO_SERVICE = "Auto"
+STATS_FILE = "latency_stats.json"
+EWMA_ALPHA = 0.2
+WINDOW = 40                # razones recientes por ruta
+MIN_SAMPLES = 3            # antes de esto se confía en la curva a priori
+TAIL_PCT = 90
+DECAY_S = 1800.0           # a la media hora sin mediciones la historia pesa ~37 %
+TYPICAL_AUDIO_S = 10.0     # para elegir antes de saber cuánto dura el dictado
+GOOGLE_MAX_S = 55.0        # el endpoint público de Google corta audios de ~1 min
+LOCAL_GPU_SPEEDUP = 8.0
+
+# (segundos fijos, segundos por segundo de audio) — valores de partida
+_CLOUD_PRIOR = {
+    "groq:whisper-large-v3": (0.7, 0.012),
+    "groq:whisper-large-v3-turbo": (0.5, 0.008),
+    "google": (1.2, 0.06),
+}
+# RTF en CPU (int8) por tamaño, y carga en frío
+_LOCAL_RTF = {"tiny": 0.06, "base": 0.12, "small": 0.35, "medium": 0.9,
+              "large-v3": 1.8, "distil-large-v3": 0.9, "turbo": 0.8}
+_LOCAL_LOAD_S = {"tiny": 1.0, "base": 2.0, "small": 4.0, "medium": 10.0,
+                 "large-v3": 20.0, "distil-large-v3": 10.0, "turbo": 10.0}
+# calidad relativa (más es mejor): decide entre rutas que entran en el objetivo
+_QUALITY = {
+    "groq:whisper-large-v3": 10, "groq:whisper-large-v3-turbo": 9, "google": 4,
+    "local:tiny": 3, "local:base": 5, "local:small": 7, "local:medium": 8,
+    "local:large-v3": 10, "local:distil-large-v3": 8, "local:turbo": 9,
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    backend: str            # "groq" | "google" | "local"
+    model: str = ""
+    warm: bool = True       # local: ya cargado en memoria
+    gpu: bool = False       # local: corre en CUDA
+
+    @property
+    def key(self) -> str:
+        return f"{self.backend}:{self.model}" if self.model else self.backend
+
+    @property
+    def quality(self) -> int:
+        return _QUALITY.get(self.key, 5)
+
+    def prior(self, audio_s: float) -> float:
+        if self.backend == "local":
+            rtf = _LOCAL_RTF.get(self.model, 1.0) / (LOCAL_GPU_SPEEDUP if self.gpu else 1.0)
+            return 0.2 + rtf * audio_s
+        base, per_s = _CLOUD_PRIOR.get(self.key, (1.0, 0.05))
+        return base + per_s * audio_s
+
+
+@dataclass
+class _RouteStats:
+    ewma: float = 1.0
+    ratios: list[float] | None = None
+    n: int = 0
+    updated: float = 0.0    # time.time() de la última medición
+
+
+class LatencyModel:
+    """Razones real/a priori por ruta. Thread-safe, persistido en JSON."""
+
+    def __init__(self, path: Path | None = None,
+                 log_fn: Callable[[str], None] | None = None) -> None:
+        self.path = path or data_path(STATS_FILE)
+        self.log_fn = log_fn or (lambda _msg: None)
+        self._lock = threading.Lock()
+        self._stats: dict[str, _RouteStats] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for key, data in (raw.get("routes") or {}).items():
+            try:
+                self._stats[key] = _RouteStats(
+                    ewma=float(data["ewma"]),
+                    ratios=[float(r) for r in data.get("ratios", [])][-WINDOW:],
+                    n=int(data.get("n", 0)),
+                    updated=float(data.get("updated", 0.0)),
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+
+    def _save(self) -> None:
+        data = {"routes": {k: {"ewma": round(s.ewma, 4), "ratios": [round(r, 4) for r in s.ratios or []],
+                               "n": s.n, "updated": round(s.updated)} for k, s in self._stats.items()}}
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+            tmp.replace(self.path)
+        except OSError as e:
+            self.log_fn(f"[auto] no se pudo guardar {self.path.name}: {e}")
+
+    def observe(self, route: Route, audio_s: float, seconds: float) -> None:
+        if route.backend == "local" and not route.warm:
+            return  # la carga en frío no dice nada de la velocidad del modelo
+        ratio = seconds / max(route.prior(audio_s), 0.05)
+        with self._lock:
+            st = self._stats.setdefault(route.key, _RouteStats(ewma=ratio, ratios=[]))
+            st.ewma += EWMA_ALPHA * (ratio - st.ewma)
+            st.ratios = ((st.ratios or []) + [ratio])[-WINDOW:]
+            st.n += 1
+            st.updated = time.time()
+            self._save()
+
+    def predict(self, route: Route, audio_s: float) -> float:
+        """Latencia p90 esperada para `audio_s` segundos de audio."""
+        with self._lock:
+            st = self._stats.get(route.key)
+            ratios = list(st.ratios or []) if st else []
+            ewma = st.ewma if st else 1.0
+            age = time.time() - st.updated if st else 0.0
+        scale = 1.0
+        if len(ratios) >= MIN_SAMPLES:
+            # la cola manda, pero si la tendencia reciente empeoró también cuenta
+            observed = max(percentile(ratios, TAIL_PCT), ewma)
+            scale = 1.0 + (observed - 1.0) * math.exp(-max(age, 0.0) / DECAY_S)
+        seconds = route.prior(audio_s) * scale
+        if route.backend == "local" and not route.warm:
+            seconds += _LOCAL_LOAD_S.get(route.model, 10.0)
+        return seconds
+
+
+class Router:
+    """Elige la ruta de un dictado entre las disponibles."""
+
+    def __init__(self, model: LatencyModel | None = None,
+                 log_fn: Callable[[str], None] | None = None) -> None:
+        self.log_fn = log_fn or (lambda _msg: None)
+        self.latency = model or LatencyModel(log_fn=self.log_fn)
+
+    def choose(self, routes: list[Route], audio_s: float, target_s: float,
+               log: bool = True) -> Route | None:
+        usable = [r for r in routes if not (r.backend == "google" and audio_s > GOOGLE_MAX_S)]
+        if not usable:
+            return None
+        predicted = {r: self.latency.predict(r, audio_s) for r in usable}
+        fits = [r for r in usable if predicted[r] <= target_s]
+        if fits:
+            best = max(fits, key=lambda r: (r.quality, -predicted[r]))
+            why = f"p90≈{predicted[best]:.2f}s ≤ {target_s:.1f}s"
+        else:
+            best = min(usable, key=lambda r: predicted[r])
+            why = f"ninguna entra en {target_s:.1f}s; la más rápida (p90≈{predicted[best]:.2f}s)"
+        if not log:
+            return best
+        others = ", ".join(f"{r.key} {predicted[r]:.2f}s" for r in usable if r is not best)
+        self.log_fn(f"[auto] {audio_s:.1f}s de audio → {best.key} ({why}){' · ' + others if others else ''}")
+        return best
+
+    def observe(self, route: Route, audio_s: float, seconds: float) -> None:
+        self.latency.observe(route, audio_s, seconds)
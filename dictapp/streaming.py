@@ -0,0 +1,183 @@
+"""Transcripción incremental mientras se graba.
+
+El recorder empuja cada bloque de PCM a `IncrementalSession.feed()`. La sesión
+corta la grabación en pausas naturales y manda cada trozo terminado al
+`Transcriber` activo en background, así al detener solo queda pendiente el
+último trozo. Los textos se unen en orden en un único `TranscriptionResult`.
+
+Un trozo que falla no tira la dictación: se guarda su audio y `finish()` lo
+vuelve a intentar una vez. Si sigue fallando el texto sale con un hueco y
+`failed_chunks` lo dice, para que la app avise en vez de pegar de menos en
+silencio.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable
+
+from . import audio as audio_mod
+from .pcm import TARGET_RATE, resample_int16, rms_int16
+from .transcribers import Transcriber, TranscriptionError, TranscriptionResult
+
+MIN_CHUNK_S = 8.0     # no cortar trozos más cortos que esto (Whisper necesita contexto)
+MAX_CHUNK_S = 30.0    # cortar sí o sí al llegar acá aunque no haya pausa
+PAUSE_S = 0.6         # silencio continuo que cuenta como pausa natural
+MIN_VOICE_RMS = 200   # un trozo cuyo pico no llega a esto es silencio: no se manda
+
+
+class IncrementalSession:
+    """Acumula PCM de una grabación y transcribe por trozos en background."""
+
+    def __init__(
+        self,
+        transcriber: Transcriber,
+        language: str,
+        log_fn: Callable[[str], None] | None = None,
+        trim: bool = True,
+        resample: bool = True,
+        min_chunk_s: float = MIN_CHUNK_S,
+        max_chunk_s: float = MAX_CHUNK_S,
+        pause_s: float = PAUSE_S,
+    ) -> None:
+        self.transcriber = transcriber
+        self.language = language
+        self.log_fn = log_fn or (lambda _msg: None)
+        self.trim = trim
+        self.resample = resample
+        self.min_chunk_s = min_chunk_s
+        self.max_chunk_s = max_chunk_s
+        self.pause_s = pause_s
+        self._rate = audio_mod.SAMPLE_RATE
+        self._pending = bytearray()
+        self._pending_peak = 0
+        self._silent_bytes = 0
+        self._peak = 0
+        self._futures: list[Future] = []
+        self._errors: list[TranscriptionError] = []
+        self._failed: dict[int, tuple[bytes, int]] = {}   # índice → audio ya preparado
+        self.failed_chunks = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        # un solo worker: los trozos se transcriben en orden y no compiten por CPU/red
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dictapp-inc")
+
+    @property
+    def chunks_sent(self) -> int:
+        return len(self._futures)
+
+    # ------------------------------------------------------------ captura
+    def feed(self, data: "bytes | memoryview", sample_rate: int) -> None:
+        """Llamado desde el hilo/callback de audio: tiene que ser barato."""
+        if self._closed or not data:
+            return
+        rate = self._rate = sample_rate or audio_mod.SAMPLE_RATE
+        bytes_per_s = rate * audio_mod.SAMPLE_WIDTH
+        try:
+            rms = rms_int16(data)
+        except Exception:
+            rms = 0
+        chunk: bytes | None = None
+        with self._lock:
+            self._pending += data
+            if rms > self._peak:
+                self._peak = rms
+            if rms > self._pending_peak:
+                self._pending_peak = rms
+            # mismo criterio adaptativo que trim_silence: 15% del pico, piso 120
+            threshold = max(120, int(self._peak * 0.15))
+            if rms <= threshold:
+                self._silent_bytes += len(data)
+            else:
+                self._silent_bytes = 0
+            pending_s = len(self._pending) / bytes_per_s
+            paused = self._silent_bytes >= self.pause_s * bytes_per_s
+            if (pending_s >= self.min_chunk_s and paused) or pending_s >= self.max_chunk_s:
+                # cortar a mitad de la pausa: cada trozo conserva algo de silencio a cada lado
+                keep = (self._silent_bytes // 2) if paused else 0
+                keep -= keep % audio_mod.SAMPLE_WIDTH
+                cut = len(self._pending) - keep
+                chunk = bytes(self._pending[:cut])
+                peak = self._pending_peak
+                del self._pending[:cut]
+                self._pending_peak = 0
+                self._silent_bytes = keep
+        if chunk is not None:
+            self._submit(chunk, rate, peak)
+
+    def _submit(self, chunk: bytes, rate: int, peak: int) -> None:
+        index = len(self._futures)
+        self.log_fn(
+            f"[INC] trozo #{index} cortado: {audio_mod.duration_seconds(chunk, sample_rate=rate):.2f}s "
+            f"· pico rms={peak}"
+        )
+        self._futures.append(self._executor.submit(self._transcribe_chunk, index, chunk, rate, peak))
+
+    # ------------------------------------------------------------ transcripción
+    def _transcribe_chunk(self, index: int, pcm: bytes, rate: int, peak: int) -> str:
+        if peak < MIN_VOICE_RMS:
+            self.log_fn(f"[INC] trozo #{index} es silencio, se omite")
+            return ""
+        if self.trim:
+            pcm = audio_mod.trim_silence(pcm, sample_rate=rate)
+        if self.resample and rate != TARGET_RATE:
+            pcm, rate = resample_int16(pcm, rate)
+        t0 = time.perf_counter()
+        try:
+            result = self.transcriber.transcribe_pcm(pcm, rate, language=self.language)
+        except TranscriptionError as e:
+            # un trozo fallido no tira la dictación entera; finish() lo reintenta
+            self.log_fn(f"[INC] trozo #{index} falló: {e}")
+            with self._lock:
+                self._errors.append(e)
+                self._failed[index] = (bytes(pcm), rate)
+            return ""
+        self.log_fn(
+            f"[INC] trozo #{index} listo en {time.perf_counter()-t0:.2f}s "
+            f"({len(result.text)} chars)"
+        )
+        return result.text.strip()
+
+    def finish(self) -> TranscriptionResult:
+        """Manda el último trozo y une todo en orden. Bloquea hasta terminar."""
+        t0 = time.perf_counter()
+        with self._lock:
+            self._closed = True
+            tail = bytes(self._pending)
+            peak = self._pending_peak
+            self._pending = bytearray()
+        if tail:
+            self._submit(tail, self._rate, peak)
+        try:
+            texts = [f.result() for f in self._futures]
+        finally:
+            self._executor.shutdown(wait=False)
+        for index, (pcm, rate) in sorted(self._failed.items()):
+            try:
+                result = self.transcriber.transcribe_pcm(pcm, rate, language=self.language)
+            except TranscriptionError as e:
+                self.log_fn(f"[INC] trozo #{index} volvió a fallar: {e}")
+                self._errors.append(e)
+                self.failed_chunks += 1
+                continue
+            self.log_fn(f"[INC] trozo #{index} recuperado al reintentar")
+            texts[index] = result.text.strip()
+        text = " ".join(t for t in texts if t)
+        if not text and self._errors:
+            raise self._errors[-1]
+        if self.failed_chunks:
+            self.log_fn(f"[INC] {self.failed_chunks} de {len(texts)} trozos sin transcribir: el texto tiene huecos")
+        return TranscriptionResult(
+            text=text,
+            backend=self.transcriber.name,
+            seconds=time.perf_counter() - t0,
+        )
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._closed = True
+            self._pending = bytearray()
+        for f in self._futures:
+            f.cancel()
+        self._executor.shutdown(wait=False)
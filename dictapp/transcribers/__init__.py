@@ -1,4 +1,4 @@
-from .base import Transcriber, TranscriptionResult, TranscriptionError
+from .base import Transcriber, TranscriptionResult, TranscriptionError, BackendUnavailable
 from .groq_whisper import GroqWhisperTranscriber, GROQ_AVAILABLE
 from .google_sr import GoogleTranscriber, GOOGLE_AVAILABLE
 from .local_whisper import LocalWhisperTranscriber, LOCAL_AVAILABLE
@@ -7,6 +7,7 @@ __all__ = [
     "Transcriber",
     "TranscriptionResult",
     "TranscriptionError",
+    "BackendUnavailable",
     "GroqWhisperTranscriber",
     "GoogleTranscriber",
     "LocalWhisperTranscriber",
@@ -1,14 +1,21 @@
 from __future__ import annotations
 
+import sys
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any
 
 
 class TranscriptionError(Exception):
     pass
 
 
+class BackendUnavailable(TranscriptionError):
+    """El servicio no respondió (red caída, timeout, 5xx). Lo cuenta el
+    circuit breaker; un error del audio o de la key no."""
+
+
 @dataclass
 class TranscriptionResult:
     text: str
@@ -16,6 +23,22 @@ class TranscriptionResult:
     seconds: float = 0.0
 
 
+def pcm_int16(audio: Any) -> "bytes | memoryview":
+    """Normaliza la entrada de `transcribe_pcm` a PCM s16le mono.
+
+    Acepta bytes/bytearray/memoryview (ya int16) o un ndarray: float en
+    [-1, 1] o int16.
+    """
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        return audio
+    import numpy as np
+    arr = np.asarray(audio).reshape(-1)
+    if arr.dtype.kind == "f":
+        arr = np.clip(np.rint(arr * 32767.0), -32768, 32767)
+    arr = arr.astype("<i2")
+    return arr.tobytes() if sys.byteorder != "little" else memoryview(arr).cast("B")
+
+
 class Transcriber(ABC):
     name: str = "base"
 
@@ -23,6 +46,23 @@ class Transcriber(ABC):
     def is_ready(self) -> tuple[bool, str]:
         """Devuelve (listo, mensaje_de_estado)."""
 
+    def probe(self) -> bool:
+        """Chequeo barato de que el servicio responde (para el circuit
+        breaker). Los backends locales no lo necesitan."""
+        return True
+
     @abstractmethod
     def transcribe(self, wav_path: Path, language: str = "es") -> TranscriptionResult:
         ...
+
+    def transcribe_pcm(self, audio: Any, sample_rate: int,
+                       language: str = "es") -> TranscriptionResult:
+        """Transcribe desde memoria: PCM int16 mono (bytes/memoryview) o un
+        ndarray float32 mono, más su tasa de muestreo.
+
+        Esta versión base escribe un WAV temporal y llama a `transcribe()`;
+        los backends la sobrescriben para no pasar por disco.
+        """
+        from ..audio import pcm_to_wav_temp
+        with pcm_to_wav_temp(pcm_int16(audio), sample_rate=sample_rate) as wav_path:
+            return self.transcribe(wav_path, language=language)
@@ -0,0 +1,132 @@
+"""Circuit breaker por backend de red (Groq, Google).
+
+Sin red, cada dictado esperaba el timeout completo antes de fallar. Con el
+breaker:
+
+- `closed`: normal. Cada `BackendUnavailable` (red caída, timeout, 5xx) suma
+  una falla; un éxito pone el contador en cero.
+- `open`: tras `threshold` fallas seguidas. `allow()` devuelve False y la app
+  manda el dictado directo al fallback offline, sin pagar el timeout. Un
+  hilo de fondo prueba el servicio (`probe`) cada `probe_interval_s`.
+- `half_open`: la prueba respondió. El próximo dictado real va al backend;
+  si sale bien se cierra, si falla se vuelve a abrir.
+
+Errores que no son del servicio (audio sin voz, 400, key inválida) no
+cuentan: esos los resuelve el usuario, no el tiempo.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_THRESHOLD = 3
+DEFAULT_PROBE_S = 15.0
+
+STATE_LABELS = {CLOSED: "", OPEN: "sin conexión", HALF_OPEN: "probando"}
+
+
+class CircuitBreaker:
+    """Thread-safe. `probe_fn` debe ser barato y devolver True si el servicio
+    contesta (puede lanzar: cuenta como False)."""
+
+    def __init__(self, name: str, probe_fn: Callable[[], bool],
+                 threshold: int = DEFAULT_THRESHOLD, probe_interval_s: float = DEFAULT_PROBE_S,
+                 log_fn: Callable[[str], None] | None = None,
+                 on_change: Callable[[str], None] | None = None) -> None:
+        self.name = name
+        self.probe_fn = probe_fn
+        self.threshold = max(1, threshold)
+        self.probe_interval_s = probe_interval_s
+        self.log_fn = log_fn or (lambda _msg: None)
+        self.on_change = on_change or (lambda _state: None)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._last_error = ""
+        self._wake = threading.Event()
+        self._prober: threading.Thread | None = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def allow(self) -> bool:
+        """¿Se le puede mandar un dictado al backend?"""
+        with self._lock:
+            return self._state != OPEN
+
+    def describe(self) -> str:
+        with self._lock:
+            state, error, since = self._state, self._last_error, self._opened_at
+        if state == OPEN:
+            return f"sin conexión hace {time.monotonic() - since:.0f}s ({error})"
+        return STATE_LABELS[state]
+
+    # ---------------------------------------------------------- resultados
+    def record_success(self) -> None:
+        with self._lock:
+            changed = self._state != CLOSED
+            self._state = CLOSED
+            self._failures = 0
+        if changed:
+            self.log_fn(f"[circuit] {self.name}: cerrado (el servicio responde)")
+            self.on_change(CLOSED)
+
+    def record_failure(self, reason: str) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = reason
+            trip = self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.threshold)
+            if trip:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            failures = self._failures
+        if trip:
+            self.log_fn(
+                f"[circuit] {self.name}: abierto tras {failures} fallas seguidas ({reason}); "
+                f"pruebo cada {self.probe_interval_s:.0f}s"
+            )
+            self.on_change(OPEN)
+            self._start_prober()
+
+    def reset(self) -> None:
+        """Vuelve a `closed` (p. ej. al cambiar la API key)."""
+        self.record_success()
+        self._wake.set()
+
+    # -------------------------------------------------------------- sonda
+    def _start_prober(self) -> None:
+        with self._lock:
+            if self._prober is not None and self._prober.is_alive():
+                return
+            self._wake.clear()
+            self._prober = threading.Thread(target=self._probe_loop, daemon=True,
+                                            name=f"dictapp-probe-{self.name}")
+            self._prober.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            self._wake.wait(self.probe_interval_s)
+            self._wake.clear()
+            if self.state != OPEN:
+                return
+            try:
+                ok = bool(self.probe_fn())
+            except Exception:
+                ok = False
+            if not ok:
+                continue
+            with self._lock:
+                if self._state != OPEN:
+                    return
+                self._state = HALF_OPEN
+            self.log_fn(f"[circuit] {self.name}: el servicio volvió a responder; el próximo dictado lo confirma")
+            self.on_change(HALF_OPEN)
+            return
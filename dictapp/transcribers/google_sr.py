@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import socket
 import time
 from pathlib import Path
 
-from .base import Transcriber, TranscriptionResult, TranscriptionError
+from .base import BackendUnavailable, Transcriber, TranscriptionResult, TranscriptionError, pcm_int16
 
 try:
     import speech_recognition as sr
@@ -21,6 +22,10 @@ class GoogleTranscriber(Transcriber):
             return False, "SpeechRecognition no instalado"
         return True, "Listo (endpoint público)"
 
+    def probe(self) -> bool:
+        with socket.create_connection(("www.google.com", 443), timeout=3.0):
+            return True
+
     def transcribe(self, wav_path: Path, language: str = "es") -> TranscriptionResult:
         if not GOOGLE_AVAILABLE:
             raise TranscriptionError("SpeechRecognition no instalado")
@@ -29,12 +34,27 @@ class GoogleTranscriber(Transcriber):
         try:
             with sr.AudioFile(str(wav_path)) as source:
                 audio = recognizer.record(source)
+        except Exception as e:
+            raise TranscriptionError(f"Google: {e}") from e
+        return self._recognize(recognizer, audio, language, t0)
+
+    def transcribe_pcm(self, audio, sample_rate: int, language: str = "es") -> TranscriptionResult:
+        if not GOOGLE_AVAILABLE:
+            raise TranscriptionError("SpeechRecognition no instalado")
+        t0 = time.perf_counter()
+        # AudioData envuelve el PCM tal cual: sin WAV ni re-parseo
+        data = sr.AudioData(bytes(pcm_int16(audio)), sample_rate, 2)
+        return self._recognize(sr.Recognizer(), data, language, t0)
+
+    def _recognize(self, recognizer, audio, language: str, t0: float) -> TranscriptionResult:
+        try:
             lang_map = {"es": "es-ES", "en": "en-US"}
             text = recognizer.recognize_google(audio, language=lang_map.get(language, language))
         except sr.UnknownValueError as e:
             raise TranscriptionError("Google: no se entendió el audio") from e
         except sr.RequestError as e:
-            raise TranscriptionError(f"Google: {e}") from e
+            # sin red / el endpoint no contesta
+            raise BackendUnavailable(f"Google: {e}") from e
         except Exception as e:
             raise TranscriptionError(f"Google: {e}") from e
         return TranscriptionResult(text=text.strip(), backend=self.name, seconds=time.perf_counter() - t0)
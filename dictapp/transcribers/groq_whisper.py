@@ -1,9 +1,29 @@
+"""Whisper en Groq (API en la nube).
+
+Dictados largos se parten en trozos que se suben en paralelo: la latencia
+pasa a ser la del trozo más lento y ningún request supera el límite de
+tamaño de archivo de la API. Los cortes caen en pausas (`pcm.chunk_bounds`)
+con un poco de solapamiento, y al unir se sacan las palabras repetidas en la
+zona solapada. Todos los hilos comparten un cliente por key, es decir, un
+pool de conexiones HTTP (keep-alive) por key.
+
+Los requests pasan por `scheduler.RequestScheduler`: reintentos con backoff,
+respeto de los rate limits y rotación entre la key principal y las extra.
+"""
 from __future__ import annotations
 
+import io
+import re
 import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable
 
-from .base import Transcriber, TranscriptionResult, TranscriptionError
+from ..encode import DEFAULT_OPUS_KBPS, encode_pcm
+from ..pcm import SAMPLE_WIDTH, chunk_bounds
+from .base import BackendUnavailable, Transcriber, TranscriptionResult, TranscriptionError, pcm_int16
+from .scheduler import DEFAULT_RETRIES, DEFAULT_RPM, RequestScheduler, is_unavailable
 
 try:
     from groq import Groq
@@ -12,19 +32,75 @@ except Exception:
     Groq = None  # type: ignore
     GROQ_AVAILABLE = False
 
+GROQ_MODELS = ("whisper-large-v3", "whisper-large-v3-turbo")
+DEFAULT_MODEL = GROQ_MODELS[0]
+DEFAULT_CHUNK_S = 30.0     # largo de cada trozo (0 = nunca partir)
+DEFAULT_PARALLEL = 4       # requests simultáneos por dictado
+DEFAULT_TIMEOUT_S = 15.0   # por request (el SDK trae 60 s: demasiado para un dictado)
+PROBE_TIMEOUT_S = 5.0
+CHUNK_OVERLAP_S = 1.0
+STITCH_MAX_WORDS = 6       # palabras que se comparan en cada unión (~1 s de habla)
+
+
+def _norm_word(word: str) -> str:
+    return re.sub(r"\W+", "", word.lower())
+
+
+def _overlap_words(prev: list[str], nxt: list[str], max_words: int = STITCH_MAX_WORDS) -> int:
+    """Cuántas palabras del inicio de `nxt` repiten el final de `prev`."""
+    a = [_norm_word(w) for w in prev[-max_words:]]
+    b = [_norm_word(w) for w in nxt[:max_words]]
+    for k in range(min(len(a), len(b)), 0, -1):
+        if a[-k:] == b[:k]:
+            # una sola palabra corta ("de", "la") coincide por casualidad
+            if k == 1 and len(a[-1]) < 4:
+                continue
+            return k
+    return 0
+
+
+def stitch_overlap(texts: list[str], max_words: int = STITCH_MAX_WORDS) -> str:
+    """Une los textos de trozos consecutivos sacando lo repetido en el solapamiento."""
+    words: list[str] = []
+    for text in texts:
+        nxt = text.split()
+        words.extend(nxt[_overlap_words(words, nxt, max_words):])
+    return " ".join(words)
+
 
 class GroqWhisperTranscriber(Transcriber):
     name = "Whisper (Groq)"
 
-    def __init__(self, api_key: str | None, model: str = "whisper-large-v3") -> None:
+    def __init__(self, api_key: str | None, model: str = DEFAULT_MODEL,
+                 upload_format: str = "auto", opus_kbps: int = DEFAULT_OPUS_KBPS,
+                 log_fn: Callable[[str], None] | None = None,
+                 chunk_s: float = DEFAULT_CHUNK_S, max_parallel: int = DEFAULT_PARALLEL,
+                 extra_keys: list[str] | None = None, rpm: float = DEFAULT_RPM,
+                 max_retries: int = DEFAULT_RETRIES, timeout_s: float = DEFAULT_TIMEOUT_S) -> None:
         self.api_key = api_key
         self.model = model
+        self.upload_format = upload_format
+        self.opus_kbps = opus_kbps
+        self.log_fn = log_fn or (lambda _msg: None)
+        self.chunk_s = chunk_s
+        self.max_parallel = max(1, max_parallel)
+        self._pool: ThreadPoolExecutor | None = None
+        self._pool_size = 0
         self._client = None
+        self._scheduler: RequestScheduler | None = None
+        keys = [k for k in dict.fromkeys([api_key, *(extra_keys or [])]) if k]
         if GROQ_AVAILABLE and api_key:
-            try:
-                self._client = Groq(api_key=api_key)
-            except Exception:
-                self._client = None
+            clients = []
+            for i, key in enumerate(keys):
+                try:
+                    # los reintentos los hace el scheduler (puede cambiar de key)
+                    clients.append((f"key {i + 1}/{len(keys)}", Groq(api_key=key, max_retries=0, timeout=timeout_s)))
+                except Exception:
+                    continue
+            if clients:
+                self._client = clients[0][1]
+                self._scheduler = RequestScheduler(clients, rpm=rpm, max_retries=max_retries,
+                                                   log_fn=self.log_fn)
 
     def is_ready(self) -> tuple[bool, str]:
         if not GROQ_AVAILABLE:
@@ -35,25 +111,109 @@ class GroqWhisperTranscriber(Transcriber):
             return False, "Cliente Groq no inicializado"
         return True, "Listo"
 
+    def probe(self) -> bool:
+        if self._client is None:
+            return False
+        # endpoint liviano que no cuenta contra los límites de audio
+        self._client.with_options(timeout=PROBE_TIMEOUT_S).models.list()
+        return True
+
     def transcribe(self, wav_path: Path, language: str = "es") -> TranscriptionResult:
+        try:
+            with wave.open(str(wav_path), "rb") as wf:
+                rate = wf.getframerate()
+                pcm = wf.readframes(wf.getnframes())
+        except Exception as e:
+            raise TranscriptionError(f"Groq: no se pudo leer el WAV: {e}") from e
+        return self.transcribe_pcm(pcm, rate, language=language)
+
+    def transcribe_pcm(self, audio, sample_rate: int, language: str = "es") -> TranscriptionResult:
         ok, msg = self.is_ready()
         if not ok:
             raise TranscriptionError(msg)
         t0 = time.perf_counter()
+        pcm = pcm_int16(audio)
+        bounds = chunk_bounds(pcm, sample_rate, self.chunk_s, CHUNK_OVERLAP_S) if self.chunk_s > 0 else []
+        if len(bounds) > 1:
+            text = self._transcribe_chunked(pcm, sample_rate, language, bounds)
+        else:
+            text = self._request(pcm, sample_rate, language)
+        return TranscriptionResult(text=text, backend=self.name, seconds=time.perf_counter() - t0)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        # hilos persistentes: entre dictados quedan vivos junto con sus conexiones
+        if self._pool is None or self._pool_size != self.max_parallel:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+            self._pool = ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="dictapp-groq")
+            self._pool_size = self.max_parallel
+        return self._pool
+
+    def _transcribe_chunked(self, pcm, sample_rate: int, language: str,
+                            bounds: list[tuple[int, int]]) -> str:
+        bps = sample_rate * SAMPLE_WIDTH
+        t0 = time.perf_counter()
+        self.log_fn(
+            f"[TX] {len(bounds)} trozos de ~{self.chunk_s:.0f}s "
+            f"({CHUNK_OVERLAP_S:.1f}s solapados) · hasta {self.max_parallel} en paralelo"
+        )
+
+        def run(index: int, start: int, end: int) -> tuple[str, float]:
+            t1 = time.perf_counter()
+            text = self._request(pcm[start:end], sample_rate, language, label=f"trozo {index + 1}/{len(bounds)}")
+            return text, time.perf_counter() - t1
+
+        futures = [self._executor().submit(run, i, s, e) for i, (s, e) in enumerate(bounds)]
+        texts: list[str] = []
+        slowest = 0.0
+        try:
+            for i, fut in enumerate(futures):
+                text, seconds = fut.result()
+                slowest = max(slowest, seconds)
+                texts.append(text)
+        except TranscriptionError as e:
+            for fut in futures:
+                fut.cancel()
+            raise type(e)(f"{e} (trozo {i + 1}/{len(bounds)})") from e
+        stitched = stitch_overlap(texts)
+        self.log_fn(
+            f"[TX] trozos listos: audio {len(pcm) / bps:.1f}s · más lento {slowest:.2f}s "
+            f"· total {time.perf_counter() - t0:.2f}s"
+        )
+        if not stitched:
+            raise TranscriptionError("Groq: respuesta sin texto")
+        return stitched
+
+    def _request(self, pcm, sample_rate: int, language: str, label: str = "") -> str:
+        """Un request: codifica, sube y devuelve el texto."""
+        enc = encode_pcm(pcm, sample_rate, fmt=self.upload_format,
+                         opus_kbps=self.opus_kbps, log_fn=self.log_fn)
+        where = f" {label}" if label else ""
+        self.log_fn(f"[TX] upload{where} {enc.describe()}")
+
+        def send(client):
+            # el SDK arma el multipart en memoria: se le pasa el blob ya codificado.
+            # with_raw_response deja leer los headers de rate limit.
+            raw = client.audio.transcriptions.with_raw_response.create(
+                file=(enc.filename, io.BytesIO(enc.data)),
+                model=self.model,
+                response_format="json",
+                language=language,
+            )
+            return raw.parse(), raw.headers
+
         try:
-            with open(wav_path, "rb") as f:
-                resp = self._client.audio.transcriptions.create(  # type: ignore[union-attr]
-                    file=f,
-                    model=self.model,
-                    response_format="json",
-                    language=language,
-                )
+            resp, stats = self._scheduler.call(send, label=label)  # type: ignore[union-attr]
         except Exception as e:
-            raise TranscriptionError(f"Groq: {e}") from e
+            error = BackendUnavailable if is_unavailable(e) else TranscriptionError
+            raise error(f"Groq: {e}") from e
+        self.log_fn(f"[TX] groq{where}: {stats.describe()}")
 
         text = getattr(resp, "text", None)
         if text is None and isinstance(resp, dict):
             text = resp.get("text")
         if not text:
+            if label:
+                return ""   # un trozo sin voz no invalida el resto
             raise TranscriptionError("Groq: respuesta sin texto")
-        return TranscriptionResult(text=text.strip(), backend=self.name, seconds=time.perf_counter() - t0)
+        return text.strip()
@@ -1,11 +1,18 @@
 """Whisper local con faster-whisper."""
 from __future__ import annotations
 
+import sys
 import time
+from dataclasses import dataclass
 from pathlib import Path
 from threading import Lock
+from typing import Iterator
 
-from .base import Transcriber, TranscriptionResult, TranscriptionError
+from ..pcm import TARGET_RATE, resample_int16
+from .base import Transcriber, TranscriptionResult, TranscriptionError, pcm_int16
+from .model_cache import ModelCache, ModelKey, shared_cache
+from .model_manager import ModelManager
+from .whisper_worker import RemoteModel, WhisperWorker, WorkerCrashed
 
 try:
     from faster_whisper import WhisperModel
@@ -14,6 +21,94 @@ except Exception:
     WhisperModel = None  # type: ignore
     LOCAL_AVAILABLE = False
 
+# pipeline por lotes (faster-whisper >= 1.1): corta por VAD y decodifica en paralelo
+try:
+    from faster_whisper import BatchedInferencePipeline
+    BATCHED_AVAILABLE = True
+except Exception:
+    BatchedInferencePipeline = None  # type: ignore
+    BATCHED_AVAILABLE = False
+
+
+WARMUP_SECONDS = 1.0   # audio sintético de la inferencia de warm-up
+DEFAULT_BATCH_SIZE = 8
+BATCHED_MIN_S = 30.0   # debajo de esto el audio entra en una sola ventana: lotes no ayudan
+RTF_ALPHA = 0.3        # peso de la última medición en el promedio móvil de RTF
+DEFAULT_DRAFT_MODEL = "tiny"
+DEFAULT_BEAM_SIZE = 5  # el default de faster-whisper
+
+# Perfiles de decodificación: cambian latencia por precisión. `beam_size=None`
+# usa el beam del equipo (local_beam_size, lo ajusta "Medir equipo").
+# - default: lo de siempre, los defaults de faster-whisper con VAD. Con el
+#   beam por defecto (5) decodifica exactamente igual que antes de los perfiles.
+# - fast: greedy sin fallback de temperatura, sin timestamps (un segmento por
+#   ventana de 30 s: pegar frase por frase queda más grueso) y VAD que corta
+#   en pausas cortas.
+# - balanced: fallback corto, sin arrastrar contexto entre ventanas (en
+#   dictados cortos solo agrega alucinaciones en bucle).
+# - accurate: los defaults de faster-whisper, con contexto y fallback completo.
+DECODE_PROFILES: dict[str, dict] = {
+    "default": {
+        "beam_size": None,
+    },
+    "fast": {
+        "beam_size": 1,
+        "best_of": 1,
+        "temperature": 0.0,
+        "without_timestamps": True,
+        "condition_on_previous_text": False,
+        "vad_parameters": {"min_silence_duration_ms": 300, "speech_pad_ms": 200},
+    },
+    "balanced": {
+        "beam_size": None,
+        "best_of": 3,
+        "temperature": (0.0, 0.4, 0.8),
+        "without_timestamps": False,
+        "condition_on_previous_text": False,
+        "vad_parameters": {"min_silence_duration_ms": 500, "speech_pad_ms": 300},
+    },
+    "accurate": {
+        "beam_size": 5,
+        "best_of": 5,
+        "temperature": (0.0, 0.2, 0.4, 0.6, 0.8, 1.0),
+        "without_timestamps": False,
+        "condition_on_previous_text": True,
+        "vad_parameters": {"min_silence_duration_ms": 1000, "speech_pad_ms": 400},
+    },
+}
+DEFAULT_PROFILE = "default"
+
+
+def decode_options(profile: str, beam_size: int = DEFAULT_BEAM_SIZE) -> dict:
+    """kwargs de `transcribe()` para un perfil (perfil desconocido → default)."""
+    opts = dict(DECODE_PROFILES.get(profile) or DECODE_PROFILES[DEFAULT_PROFILE])
+    if opts["beam_size"] is None:
+        opts["beam_size"] = beam_size
+    if "vad_parameters" in opts:
+        opts["vad_parameters"] = dict(opts["vad_parameters"])
+    return {"vad_filter": True, **opts}
+
+
+@dataclass
+class LocalSegment:
+    text: str
+    start: float
+    end: float
+    duration: float   # duración total del audio (para mostrar progreso)
+
+
+def lower_thread_priority() -> None:
+    """Baja la prioridad del hilo actual para que no compita con la UI ni el
+    audio. Solo en Windows; en otros sistemas no hace nada."""
+    if sys.platform != "win32":
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadPriority(kernel32.GetCurrentThread(), -2)  # THREAD_PRIORITY_LOWEST
+    except Exception:
+        pass
+
 
 def _resolve_device(device: str) -> str:
     if device != "auto":
@@ -42,111 +137,490 @@ class LocalWhisperTranscriber(Transcriber):
         device: str = "auto",
         compute_type: str = "auto",
         log_fn=None,
+        cache: ModelCache | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        batched_min_s: float = BATCHED_MIN_S,
+        out_of_process: bool = False,
+        draft_size: str | None = None,
+        cpu_threads: int = 0,
+        beam_size: int = DEFAULT_BEAM_SIZE,
+        profile: str = DEFAULT_PROFILE,
+        models: ModelManager | None = None,
     ) -> None:
         self.model_size = model_size
         self.device = device
         self.compute_type = compute_type
+        # 0 = sin modo por lotes
+        self.batch_size = batch_size
+        self.batched_min_s = batched_min_s
+        self._pipelines: dict[int, object] = {}
+        self._rtf: dict[str, float] = {}   # promedio móvil de RTF por modo
+        # inferencia en un proceso aparte (ver whisper_worker.py)
+        self.out_of_process = out_of_process
+        self._worker: WhisperWorker | None = None
+        # modelo chico residente para el borrador del modo dos pasadas (None = apagado)
+        self.draft_size = draft_size
+        # 0 = lo que elija CTranslate2; el autotuner (benchmark.py) lo ajusta al equipo
+        self.cpu_threads = cpu_threads
+        self.beam_size = beam_size
+        self.profile = profile
+        # índice de modelos descargados: con ruta local la carga no toca la red
+        self.models = models or ModelManager(log_fn=log_fn)
+        # (modelo, clave) se reemplazan juntos bajo `_lock`: el swap es atómico
         self._model = None
-        self._loaded_with: tuple[str, str, str] | None = None
+        self._loaded_with: ModelKey | None = None
         self._lock = Lock()
         self._load_error: str | None = None
+        self._preloading: ModelKey | None = None
+        self._last_used = time.monotonic()
+        self._idle_unloaded = False
         self.log_fn = log_fn or (lambda _msg: None)
+        self.cache = cache or shared_cache()
+        if log_fn is not None:
+            self.cache.log_fn = self.log_fn
 
     def is_ready(self) -> tuple[bool, str]:
         if not LOCAL_AVAILABLE:
             return False, "faster-whisper no instalado"
         if self._load_error:
             return False, self._load_error
+        if self.models.is_downloading(self.model_size):
+            return True, f"Modelo {self.model_size} · descargando…"
+        if self.needs_reload:
+            return True, f"Modelo {self.model_size} ({self._effective_device()}) · en reposo"
+        if self._model is None and not self.models.is_downloaded(self.model_size):
+            return True, f"Modelo {self.model_size} ({self._effective_device()}) · sin descargar"
         return True, f"Modelo {self.model_size} ({self._effective_device()})"
 
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def needs_reload(self) -> bool:
+        """True si el modelo se liberó por inactividad y todavía no se recargó."""
+        return self._idle_unloaded and self._model is None
+
+    @property
+    def device_in_use(self) -> str:
+        """"cpu" o "cuda" ya resuelto (con "auto" depende del equipo)."""
+        return self._effective_device()
+
+    def warm_sizes(self) -> list[str]:
+        """Tamaños ya cargados en el cache para el device/compute actuales."""
+        _size, device, compute_type = self._target_key()
+        return [k[0] for k in self.cache.keys() if k[1:] == (device, compute_type)]
+
+    def idle_seconds(self) -> float:
+        return time.monotonic() - self._last_used
+
+    def touch(self) -> None:
+        """Marca uso (o uso inminente): reinicia la ventana de keep-warm."""
+        self._last_used = time.monotonic()
+
+    def unload(self) -> list[ModelKey]:
+        """Libera el modelo activo y todo el cache. Se recarga solo al volver a usarlo."""
+        with self._lock:
+            self._model = None
+            self._loaded_with = None
+            self._idle_unloaded = True
+        if self._worker is not None:
+            self._worker.unload()
+        return self.cache.clear()
+
     def _effective_device(self) -> str:
         return _resolve_device(self.device)
 
+    def _target_key(self) -> ModelKey:
+        device = _resolve_device(self.device)
+        return (self.model_size, device, _resolve_compute_type(self.compute_type, device))
+
+    def _load(self, key: ModelKey):
+        size, device, compute_type = key
+        opts = self._model_opts()
+        path = self.models.local_path(size) or self.models.adopt(size)
+        if path is None:
+            self.log_fn(f"[local-whisper] {size} no está descargado: se baja ahora (\"Descargar\" lo hace antes)")
+        if self.out_of_process:
+            worker = self._get_worker()
+            remote_opts = {**opts, "model_path": path} if path else opts
+            worker.load(key, **remote_opts)
+            model = RemoteModel(worker, key, remote_opts)
+        else:
+            threads = f" threads={self.cpu_threads}" if self.cpu_threads else ""
+            source = "local" if path else "hub"
+            self.log_fn(
+                f"[local-whisper] cargando modelo='{size}' device='{device}' "
+                f"compute='{compute_type}'{threads} ({source})…"
+            )
+            model = WhisperModel(path or size, device=device, compute_type=compute_type, **opts)  # type: ignore[misc]
+        if path is None:
+            self.models.adopt(size)   # la próxima carga ya sale de disco
+        return model
+
+    def _model_opts(self) -> dict:
+        return {"cpu_threads": self.cpu_threads} if self.cpu_threads else {}
+
+    def set_cpu_threads(self, threads: int) -> None:
+        """Los hilos se fijan al crear el modelo: los cargados se sueltan y el
+        próximo uso recarga con el valor nuevo."""
+        if threads == self.cpu_threads:
+            return
+        self.cpu_threads = threads
+        if self.cache.keys() or self._model is not None:
+            self.unload()
+            self._idle_unloaded = False
+
+    def _get_worker(self) -> WhisperWorker:
+        if self._worker is None:
+            self._worker = WhisperWorker(log_fn=self.log_fn)
+        return self._worker
+
+    def set_out_of_process(self, enabled: bool) -> None:
+        """Cambia dónde corre la inferencia. Los modelos cargados del otro lado se
+        sueltan y el próximo uso carga donde corresponde."""
+        if enabled == self.out_of_process:
+            return
+        self.unload()
+        self._idle_unloaded = False
+        self.out_of_process = enabled
+        if not enabled:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        """Cierra el proceso worker si existe."""
+        worker, self._worker = self._worker, None
+        if worker is not None:
+            worker.stop()
+
+    def _describe_load_error(self, e: Exception) -> str:
+        hint = ""
+        msg = str(e)
+        if "locate" in msg.lower() or "hugging" in msg.lower() or "connection" in msg.lower():
+            hint = " (revisa tu conexión: el modelo se descarga de HuggingFace en la 1ra carga)"
+        elif "cuda" in msg.lower() or "cublas" in msg.lower() or "cudnn" in msg.lower():
+            hint = " (problema con CUDA: prueba device='cpu')"
+        return f"No se pudo cargar Whisper local: {e}{hint}"
+
+    def _swap(self, key: ModelKey, model) -> None:
+        with self._lock:
+            previous = self._loaded_with
+            self._model, self._loaded_with = model, key
+            self._load_error = None
+            self._idle_unloaded = False
+        if previous != key:
+            self.log_fn(f"[local-whisper] modelo activo: {key[0]} ({key[1]}/{key[2]})")
+
+    def select(self, model_size: str | None = None, device: str | None = None,
+               compute_type: str | None = None, preload: bool = True) -> None:
+        """Cambia la selección sin bloquear.
+
+        Si el modelo está en el cache el cambio es inmediato; si no, se
+        precarga en background y se hace el swap al terminar. Mientras tanto
+        las dictaciones siguen con el modelo que ya estaba cargado.
+        """
+        self.touch()
+        if model_size is not None:
+            self.model_size = model_size
+        if device is not None:
+            self.device = device
+        if compute_type is not None:
+            self.compute_type = compute_type
+        self._load_error = None
+        if not LOCAL_AVAILABLE:
+            return
+        if preload:
+            self.preload_draft()
+        key = self._target_key()
+        if self._model is not None and self._loaded_with == key:
+            return
+        cached = self.cache.peek(key)
+        if cached is not None:
+            self.log_fn(f"[local-whisper] {key[0]} ({key[1]}/{key[2]}) ya estaba en cache")
+            self._swap(key, cached)
+            return
+        if preload:
+            self.log_fn(f"[local-whisper] precargando {key[0]} ({key[1]}/{key[2]}) en background…")
+            self._preloading = key
+            self.cache.preload_async(key, self._load, on_done=self._on_preloaded)
+
+    def _on_preloaded(self, key: ModelKey, model, error: Exception | None) -> None:
+        if self._preloading == key:
+            self._preloading = None
+        if error is not None:
+            self._load_error = self._describe_load_error(error)
+            self.log_fn(f"[local-whisper] precarga falló: {self._load_error}")
+            return
+        # si mientras tanto se eligió otro, este queda solo en el cache
+        if key == self._target_key():
+            self._swap(key, model)
+
     def _ensure_loaded(self) -> None:
         if not LOCAL_AVAILABLE:
             raise TranscriptionError("faster-whisper no instalado")
-        target = (self.model_size, self.device, self.compute_type)
+        key = self._target_key()
         with self._lock:
-            if self._model is not None and self._loaded_with == target:
+            if self._model is not None and self._loaded_with == key:
                 return
-            try:
-                device = _resolve_device(self.device)
-                compute_type = _resolve_compute_type(self.compute_type, device)
-                self.log_fn(f"[local-whisper] cargando modelo='{self.model_size}' device='{device}' compute='{compute_type}'…")
-                t0 = time.perf_counter()
-                self._model = WhisperModel(  # type: ignore[misc]
-                    self.model_size,
-                    device=device,
-                    compute_type=compute_type,
+            loading = self._preloading == key or self.cache.is_loading(key)
+            if self._model is not None and loading:
+                self.log_fn(
+                    f"[local-whisper] {key[0]} todavía cargando; esta dictación usa "
+                    f"{self._loaded_with[0] if self._loaded_with else '?'}"
                 )
-                self.log_fn(f"[local-whisper] modelo cargado en {time.perf_counter()-t0:.2f}s")
-                self._loaded_with = target
-                self._load_error = None
-            except Exception as e:
-                hint = ""
-                msg = str(e)
-                if "locate" in msg.lower() or "hugging" in msg.lower() or "connection" in msg.lower():
-                    hint = " (revisa tu conexión: el modelo se descarga de HuggingFace en la 1ra carga)"
-                elif "cuda" in msg.lower() or "cublas" in msg.lower() or "cudnn" in msg.lower():
-                    hint = " (problema con CUDA: prueba device='cpu')"
-                self._load_error = f"No se pudo cargar Whisper local: {e}{hint}"
-                raise TranscriptionError(self._load_error) from e
-
-    def warm_up(self) -> None:
+                return
+        try:
+            model = self.cache.get(key, self._load)
+        except Exception as e:
+            self._load_error = self._describe_load_error(e)
+            raise TranscriptionError(self._load_error) from e
+        self._swap(key, model)
+
+    def warm_up(self, inference: bool = False,
+                language: str = "es") -> tuple[float, float | None] | None:
+        """Carga el modelo y, con `inference`, corre una inferencia sintética
+        corta para que CTranslate2 reserve sus buffers antes del 1er dictado.
+
+        Devuelve (segundos_de_carga, segundos_de_warmup | None), o None si la
+        carga falló (el error queda en `is_ready()`).
+        """
+        t0 = time.perf_counter()
         try:
             self._ensure_loaded()
         except TranscriptionError:
-            pass
+            return None
+        load_s = time.perf_counter() - t0
+        if not inference:
+            return load_s, None
+        import numpy as np
+        # ruido muy bajo: recorre encoder + decoder sin producir texto útil
+        noise = np.random.default_rng(0).standard_normal(int(TARGET_RATE * WARMUP_SECONDS))
+        samples = (noise * 0.01).astype(np.float32)
+        t1 = time.perf_counter()
+        try:
+            segments, _info = self._model.transcribe(samples, language=language, vad_filter=False)
+            for _ in segments:
+                pass
+        except Exception as e:
+            self.log_fn(f"[local-whisper] warm-up falló: {type(e).__name__}: {e}")
+            return load_s, None
+        warm_s = time.perf_counter() - t1
+        self.touch()
+        return load_s, warm_s
+
+    # ------------------------------------------------------------ dos pasadas
+    def _draft_key(self) -> ModelKey | None:
+        if not self.draft_size or self.draft_size == self.model_size:
+            return None
+        _size, device, compute_type = self._target_key()
+        return (self.draft_size, device, compute_type)
+
+    @property
+    def two_pass(self) -> bool:
+        """Hay un modelo de borrador distinto del principal."""
+        return self._draft_key() is not None
 
-    def _run_inference(self, wav_path: Path, language: str) -> tuple[list, object, float]:
-        assert self._model is not None
+    def preload_draft(self) -> None:
+        key = self._draft_key()
+        if key is None or not LOCAL_AVAILABLE:
+            return
+        if self.cache.peek(key) is None and not self.cache.is_loading(key):
+            self.log_fn(f"[local-whisper] precargando borrador {key[0]} ({key[1]}/{key[2]})…")
+            self.cache.preload_async(key, self._load)
+
+    def transcribe_draft(self, audio, sample_rate: int, language: str = "es") -> TranscriptionResult:
+        """Primera pasada con el modelo de borrador (greedy, sin beam search).
+
+        Comparte el cache con el principal, así que queda residente entre
+        dictados. Sin fallback a CPU: si falla, la app sigue con una sola pasada.
+        """
+        key = self._draft_key()
+        if key is None or not LOCAL_AVAILABLE:
+            raise TranscriptionError("Whisper local: modo dos pasadas sin modelo de borrador")
         t0 = time.perf_counter()
-        segments, info = self._model.transcribe(
-            str(wav_path),
-            language=language,
-            vad_filter=True,
+        try:
+            model = self.cache.get(key, self._load)
+            samples = self._to_samples(audio, sample_rate)
+            segments, info = model.transcribe(samples, language=language, **decode_options("fast"))
+            text = "".join(seg.text for seg in segments).strip()
+        except TranscriptionError:
+            raise
+        except Exception as e:
+            self.log_fn(f"[local-whisper] borrador falló: {type(e).__name__}: {e}")
+            raise TranscriptionError(f"Whisper local (borrador): {e}") from e
+        elapsed = time.perf_counter() - t0
+        self.touch()
+        self.log_fn(
+            f"[local-whisper] borrador {key[0]} · audio_dur={float(getattr(info, 'duration', 0) or 0):.2f}s "
+            f"elapsed={elapsed:.2f}s"
         )
-        seg_list = list(segments)  # forzar evaluación del generador
-        return seg_list, info, time.perf_counter() - t0
+        if not text:
+            raise TranscriptionError("Whisper local (borrador): sin texto reconocido")
+        return TranscriptionResult(text=text, backend=f"{self.name} · {key[0]}", seconds=elapsed)
+
+    def _use_batched(self, audio) -> bool:
+        if not BATCHED_AVAILABLE or self.batch_size <= 1 or isinstance(audio, str):
+            return False
+        return len(audio) / TARGET_RATE >= self.batched_min_s
+
+    def _pipeline(self, model):
+        # un pipeline por modelo: es un envoltorio liviano, sin pesos propios
+        pipe = self._pipelines.get(id(model))
+        if pipe is None or getattr(pipe, "model", None) is not model:
+            self._pipelines = {id(model): BatchedInferencePipeline(model=model)}  # type: ignore[misc]
+            pipe = self._pipelines[id(model)]
+        return pipe
+
+    def _start_inference(self, audio, language: str, stats: dict):
+        """`audio` es una ruta (str) o un ndarray float32 mono a 16 kHz.
+
+        Devuelve (generador de segmentos, info): faster-whisper decodifica
+        recién a medida que se itera el generador. Audio largo va por el
+        pipeline por lotes si está habilitado.
+        """
+        model = self._model  # referencia local: un swap en paralelo no la afecta
+        assert model is not None
+        opts = decode_options(self.profile, self.beam_size)
+        if self._use_batched(audio):
+            stats["mode"] = f"batched b={self.batch_size}"
+            if isinstance(model, RemoteModel):
+                return model.transcribe(audio, language=language, batch_size=self.batch_size, **opts)
+            return self._pipeline(model).transcribe(
+                audio,
+                language=language,
+                batch_size=self.batch_size,
+                **opts,
+            )
+        stats["mode"] = "secuencial"
+        return model.transcribe(audio, language=language, **opts)
 
     def transcribe(self, wav_path: Path, language: str = "es") -> TranscriptionResult:
         self._ensure_loaded()
         size = wav_path.stat().st_size if wav_path.exists() else -1
         self.log_fn(f"[local-whisper] transcribe wav='{wav_path}' size={size} bytes lang='{language}'")
-        try:
-            seg_list, info, elapsed = self._run_inference(wav_path, language)
-        except RuntimeError as e:
-            msg = str(e).lower()
-            cuda_issue = ("cublas" in msg or "cudnn" in msg or "cuda" in msg)
-            if cuda_issue and self._effective_device() == "cuda":
-                self.log_fn(f"[local-whisper] CUDA falló ({e}); reintentando en CPU (int8)…")
-                with self._lock:
-                    self._model = None
-                    self._loaded_with = None
-                self.device = "cpu"
-                self.compute_type = "int8"
-                try:
-                    self._ensure_loaded()
-                    seg_list, info, elapsed = self._run_inference(wav_path, language)
-                except Exception as e2:
-                    self.log_fn(f"[local-whisper] fallback CPU también falló: {type(e2).__name__}: {e2}")
-                    raise TranscriptionError(f"Whisper local (fallback CPU): {e2}") from e2
-            else:
+        return self._transcribe_source(str(wav_path), language)
+
+    def transcribe_pcm(self, audio, sample_rate: int, language: str = "es") -> TranscriptionResult:
+        """Pasa un ndarray float32 16 kHz directo al modelo (sin WAV ni PyAV)."""
+        return self._transcribe_source(self._prepare_samples(audio, sample_rate, language), language)
+
+    def _prepare_samples(self, audio, sample_rate: int, language: str):
+        self._ensure_loaded()
+        samples = self._to_samples(audio, sample_rate)
+        self.log_fn(
+            f"[local-whisper] transcribe pcm={len(samples)} muestras "
+            f"({len(samples) / TARGET_RATE:.2f}s) lang='{language}'"
+        )
+        return samples
+
+    @staticmethod
+    def _to_samples(audio, sample_rate: int):
+        import numpy as np
+        arr = audio if not isinstance(audio, (bytes, bytearray, memoryview)) else None
+        if arr is not None and sample_rate == TARGET_RATE and np.asarray(arr).dtype == np.float32:
+            samples = np.asarray(arr).reshape(-1)
+        else:
+            pcm, rate = resample_int16(pcm_int16(audio), sample_rate, TARGET_RATE)
+            if rate != TARGET_RATE:
+                raise TranscriptionError(f"Whisper local: no se pudo llevar {sample_rate} Hz a 16 kHz")
+            samples = np.frombuffer(memoryview(pcm).cast("B"), dtype="<i2").astype(np.float32) / 32768.0
+        return samples
+
+    def _iter_source(self, source, language: str, stats: dict) -> Iterator[LocalSegment]:
+        """Genera segmentos a medida que se decodifican.
+
+        `stats` se completa con `info` y `elapsed`. Si CUDA falla antes del
+        primer segmento se reintenta en CPU (int8); después ya no se puede
+        deshacer lo entregado y el error sube como TranscriptionError.
+        """
+        self.touch()
+        t0 = time.perf_counter()
+        yielded = False
+        attempt_cpu = False
+        while True:
+            try:
+                segments, info = self._start_inference(source, language, stats)
+                stats["info"] = info
+                duration = float(getattr(info, "duration", 0) or 0)
+                for seg in segments:
+                    yielded = True
+                    yield LocalSegment(text=seg.text, start=seg.start, end=seg.end, duration=duration)
+                break
+            except RuntimeError as e:
+                msg = str(e).lower()
+                cuda_issue = ("cublas" in msg or "cudnn" in msg or "cuda" in msg)
+                # una DLL de CUDA puede tirar abajo el worker entero sin mensaje útil
+                cuda_issue = cuda_issue or isinstance(e, WorkerCrashed)
+                if cuda_issue and not yielded and not attempt_cpu and self._effective_device() == "cuda":
+                    self.log_fn(f"[local-whisper] CUDA falló ({e}); reintentando en CPU (int8)…")
+                    with self._lock:
+                        if self._loaded_with is not None:
+                            self.cache.evict(self._loaded_with)
+                        self._model = None
+                        self._loaded_with = None
+                    self.device = "cpu"
+                    self.compute_type = "int8"
+                    attempt_cpu = True
+                    try:
+                        self._ensure_loaded()
+                    except Exception as e2:
+                        self.log_fn(f"[local-whisper] fallback CPU también falló: {type(e2).__name__}: {e2}")
+                        raise TranscriptionError(f"Whisper local (fallback CPU): {e2}") from e2
+                    continue
+                label = "fallback CPU también falló" if attempt_cpu else "EXC durante transcribe"
+                self.log_fn(f"[local-whisper] {label}: {type(e).__name__}: {e}")
+                prefix = "Whisper local (fallback CPU)" if attempt_cpu else "Whisper local"
+                raise TranscriptionError(f"{prefix}: {e}") from e
+            except TranscriptionError:
+                raise
+            except Exception as e:
                 self.log_fn(f"[local-whisper] EXC durante transcribe: {type(e).__name__}: {e}")
                 raise TranscriptionError(f"Whisper local: {e}") from e
-        except Exception as e:
-            self.log_fn(f"[local-whisper] EXC durante transcribe: {type(e).__name__}: {e}")
-            raise TranscriptionError(f"Whisper local: {e}") from e
+        stats["elapsed"] = time.perf_counter() - t0
+        self.touch()
 
-        text = "".join(s.text for s in seg_list).strip()
+    def stream_pcm(self, audio, sample_rate: int, language: str = "es",
+                   stats: dict | None = None) -> Iterator[LocalSegment]:
+        """Como `transcribe_pcm`, pero entrega cada segmento apenas se decodifica."""
+        samples = self._prepare_samples(audio, sample_rate, language)
+        stats = {} if stats is None else stats
+        count = 0
+        for seg in self._iter_source(samples, language, stats):
+            count += 1
+            yield seg
+        self._log_done(count, stats)
+
+    def _log_done(self, count: int, stats: dict) -> None:
+        info = stats.get("info")
+        duration = float(getattr(info, "duration", 0) or 0)
+        elapsed = stats.get("elapsed", 0.0)
+        mode = stats.get("mode", "secuencial")
+        rtf = ""
+        if duration > 0:
+            # RTF = segundos de cómputo por segundo de audio (< 1 es más rápido que tiempo real)
+            value = elapsed / duration
+            kind = "batched" if mode.startswith("batched") else "secuencial"
+            prev = self._rtf.get(kind)
+            self._rtf[kind] = value if prev is None else prev + RTF_ALPHA * (value - prev)
+            other = self._rtf.get("secuencial" if kind == "batched" else "batched")
+            rtf = f"rtf={value:.3f} ({mode} · {self.profile})"
+            if other is not None:
+                rtf += f" vs {'secuencial' if kind == 'batched' else 'batched'}≈{other:.3f}"
+            rtf += " · "
         self.log_fn(
-            f"[local-whisper] OK · segments={len(seg_list)} · "
+            f"[local-whisper] OK · segments={count} · "
             f"detected_lang={getattr(info, 'language', '?')} "
             f"prob={getattr(info, 'language_probability', 0):.2f} "
-            f"audio_dur={getattr(info, 'duration', 0):.2f}s "
-            f"elapsed={elapsed:.2f}s · device={self._effective_device()}"
+            f"audio_dur={duration:.2f}s "
+            f"elapsed={elapsed:.2f}s · {rtf}device={self._effective_device()}"
         )
+
+    def _transcribe_source(self, source, language: str) -> TranscriptionResult:
+        stats: dict = {}
+        seg_list = list(self._iter_source(source, language, stats))
+        text = "".join(s.text for s in seg_list).strip()
+        self._log_done(len(seg_list), stats)
         if not text:
             self.log_fn("[local-whisper] sin texto reconocido (segments vacíos o solo whitespace)")
             raise TranscriptionError("Whisper local: sin texto reconocido")
-        return TranscriptionResult(text=text, backend=self.name, seconds=elapsed)
+        return TranscriptionResult(text=text, backend=self.name, seconds=stats.get("elapsed", 0.0))
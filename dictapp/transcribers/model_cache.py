@@ -0,0 +1,164 @@
+"""Cache de modelos faster-whisper cargados, compartido por todo el proceso.
+
+Cargar un `WhisperModel` cuesta segundos (leer pesos de disco, inicializar
+CTranslate2, y en GPU subir a VRAM). Antes, cambiar de modelo o de device en
+la UI tiraba el modelo tibio y el siguiente cambio lo volvía a cargar. Acá los
+modelos quedan en un LRU por (tamaño, device, compute_type) con un
+presupuesto de memoria: al pasar `small` → `base` → `small` el segundo
+`small` sale del cache al instante.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+ModelKey = tuple[str, str, str]   # (model_size, device, compute_type) ya resueltos
+
+DEFAULT_BUDGET_MB = 4096
+
+# huella aproximada en memoria por tamaño, en float16 (int8 ≈ la mitad)
+_FOOTPRINT_MB = {
+    "tiny": 75,
+    "base": 145,
+    "small": 480,
+    "medium": 1500,
+    "large-v1": 3000,
+    "large-v2": 3000,
+    "large-v3": 3000,
+    "distil-large-v3": 1500,
+}
+
+
+def estimate_mb(key: ModelKey) -> int:
+    size, _device, compute = key
+    mb = _FOOTPRINT_MB.get(size.split("/")[-1], 1500)
+    if compute.startswith("int8"):
+        mb //= 2
+    elif compute == "float32":
+        mb *= 2
+    return mb
+
+
+class ModelCache:
+    """LRU de modelos cargados con presupuesto de memoria. Thread-safe.
+
+    `loader(key)` crea el modelo (lo inyecta el transcriber). Cargas
+    concurrentes de la misma clave se unen: la segunda espera a la primera.
+    """
+
+    def __init__(self, budget_mb: int = DEFAULT_BUDGET_MB,
+                 log_fn: Callable[[str], None] | None = None) -> None:
+        self.budget_mb = budget_mb
+        self.log_fn = log_fn or (lambda _msg: None)
+        self._models: OrderedDict[ModelKey, Any] = OrderedDict()
+        self._loading: dict[ModelKey, threading.Event] = {}
+        self._errors: dict[ModelKey, Exception] = {}
+        self._lock = threading.Lock()
+
+    def peek(self, key: ModelKey) -> Any | None:
+        """El modelo si ya está cargado (lo marca como recién usado); si no, None."""
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+            return model
+
+    def is_loading(self, key: ModelKey) -> bool:
+        with self._lock:
+            return key in self._loading
+
+    def keys(self) -> list[ModelKey]:
+        with self._lock:
+            return list(self._models)
+
+    def get(self, key: ModelKey, loader: Callable[[ModelKey], Any]) -> Any:
+        """Devuelve el modelo de `key`, cargándolo (bloqueante) si hace falta."""
+        while True:
+            with self._lock:
+                model = self._models.get(key)
+                if model is not None:
+                    self._models.move_to_end(key)
+                    return model
+                pending = self._loading.get(key)
+                if pending is None:
+                    pending = self._loading[key] = threading.Event()
+                    break
+            # otro hilo ya lo está cargando: esperar y volver a mirar
+            pending.wait()
+            with self._lock:
+                err = self._errors.get(key)
+            if err is not None and key not in self._models:
+                raise err
+
+        try:
+            t0 = time.perf_counter()
+            model = loader(key)
+            self.log_fn(f"[model-cache] {key[0]} ({key[1]}/{key[2]}) cargado en {time.perf_counter()-t0:.2f}s")
+        except Exception as e:
+            with self._lock:
+                self._errors[key] = e
+                self._loading.pop(key, None)
+            pending.set()
+            raise
+        with self._lock:
+            self._errors.pop(key, None)
+            self._models[key] = model
+            self._models.move_to_end(key)
+            self._loading.pop(key, None)
+            evicted = self._evict_locked(keep=key)
+        pending.set()
+        for k in evicted:
+            self.log_fn(f"[model-cache] liberado {k[0]} ({k[1]}/{k[2]}) por presupuesto de {self.budget_mb} MB")
+        return model
+
+    def preload_async(self, key: ModelKey, loader: Callable[[ModelKey], Any],
+                      on_done: Callable[[ModelKey, Any | None, Exception | None], None] | None = None) -> None:
+        """Carga en background; `on_done(key, model, error)` se llama al terminar."""
+        def worker() -> None:
+            try:
+                model = self.get(key, loader)
+            except Exception as e:
+                if on_done is not None:
+                    on_done(key, None, e)
+                return
+            if on_done is not None:
+                on_done(key, model, None)
+        threading.Thread(target=worker, daemon=True, name="dictapp-model-preload").start()
+
+    def evict(self, key: ModelKey) -> bool:
+        with self._lock:
+            return self._models.pop(key, None) is not None
+
+    def clear(self) -> list[ModelKey]:
+        """Suelta todos los modelos cargados (los que están en uso siguen vivos
+        hasta que su dueño suelte la referencia)."""
+        with self._lock:
+            keys = list(self._models)
+            self._models.clear()
+        return keys
+
+    def _evict_locked(self, keep: ModelKey) -> list[ModelKey]:
+        evicted: list[ModelKey] = []
+        total = sum(estimate_mb(k) for k in self._models)
+        for k in list(self._models):
+            if total <= self.budget_mb:
+                break
+            if k == keep:
+                continue
+            self._models.pop(k)
+            total -= estimate_mb(k)
+            evicted.append(k)
+        return evicted
+
+
+_shared: ModelCache | None = None
+
+
+def shared_cache() -> ModelCache:
+    """El cache único del proceso."""
+    global _shared
+    if _shared is None:
+        _shared = ModelCache()
+    return _shared
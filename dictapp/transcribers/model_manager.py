@@ -0,0 +1,268 @@
+"""Descarga, verificación e índice en disco de los modelos de Whisper local.
+
+Antes, `WhisperModel("small", ...)` descargaba de Hugging Face en el camino
+del dictado la primera vez. Después, cada carga seguía consultando el hub por
+la última revisión, y con la red inestable eso frenaba la carga. Acá:
+
+- `download()` / `download_async()` bajan un tamaño en segundo plano con
+  progreso en bytes, verifican tamaño y sha256 contra la metadata del hub, y
+  lo anotan en `models.json` (junto a settings.json).
+- `local_path()` devuelve la carpeta de un modelo ya verificado. El
+  transcriber carga desde esa ruta, sin ninguna consulta a la red.
+- `adopt()` registra modelos que ya estaban en el cache de Hugging Face
+  (descargados por versiones anteriores) sin tocar la red.
+"""
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from ..config import data_path
+
+try:
+    from huggingface_hub import HfApi, snapshot_download
+    from huggingface_hub import constants as hf_constants
+    HF_AVAILABLE = True
+except Exception:
+    HfApi = snapshot_download = hf_constants = None  # type: ignore
+    HF_AVAILABLE = False
+
+try:
+    from faster_whisper.utils import _MODELS as _FW_MODELS
+except Exception:
+    _FW_MODELS = {}
+
+# los mismos archivos que baja faster-whisper (sin los pesos en otros formatos)
+ALLOW_PATTERNS = [
+    "config.json",
+    "preprocessor_config.json",
+    "model.bin",
+    "tokenizer.json",
+    "vocabulary.*",
+]
+INDEX_FILE = "models.json"
+PROGRESS_INTERVAL = 0.5   # cada cuánto se reporta el progreso de descarga
+HASH_CHUNK = 8 * 1024 * 1024
+
+ProgressFn = Callable[[str, int, int], None]          # (tamaño, bytes_bajados, bytes_totales)
+DoneFn = Callable[[str, "str | None", "Exception | None"], None]
+
+
+def repo_for(size: str) -> str:
+    """Repo de Hugging Face de un tamaño ("small" → "Systran/faster-whisper-small")."""
+    if "/" in size:
+        return size
+    return _FW_MODELS.get(size, f"Systran/faster-whisper-{size}")
+
+
+@dataclass
+class ModelEntry:
+    size: str
+    repo_id: str
+    revision: str
+    path: str
+    files: dict[str, int] = field(default_factory=dict)   # nombre → bytes
+    bytes: int = 0
+    verified: bool = False      # sha256 comparado contra el hub
+    downloaded_at: str = ""
+
+
+class ModelManager:
+    """Índice de modelos locales + descargas en segundo plano. Thread-safe."""
+
+    def __init__(self, index_path: Path | None = None,
+                 log_fn: Callable[[str], None] | None = None) -> None:
+        self.index_path = index_path or data_path(INDEX_FILE)
+        self.log_fn = log_fn or (lambda _msg: None)
+        self._lock = threading.Lock()
+        self._entries: dict[str, ModelEntry] = {}
+        self._downloading: set[str] = set()
+        self._load_index()
+
+    # ------------------------------------------------------------ índice
+    def _load_index(self) -> None:
+        try:
+            raw = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        for size, data in (raw.get("models") or {}).items():
+            try:
+                self._entries[size] = ModelEntry(**data)
+            except TypeError:
+                continue
+
+    def _save_index(self) -> None:
+        data = {"models": {k: asdict(v) for k, v in self._entries.items()}}
+        tmp = self.index_path.with_suffix(".tmp")
+        try:
+            tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+            tmp.replace(self.index_path)
+        except OSError as e:
+            self.log_fn(f"[models] no se pudo guardar {self.index_path.name}: {e}")
+
+    def entries(self) -> list[ModelEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def is_downloading(self, size: str) -> bool:
+        with self._lock:
+            return size in self._downloading
+
+    def local_path(self, size: str) -> str | None:
+        """Carpeta del modelo si está en el índice y los archivos siguen ahí
+        (chequeo barato: existencia y tamaño, sin hashear)."""
+        with self._lock:
+            entry = self._entries.get(size)
+        if entry is None:
+            return None
+        root = Path(entry.path)
+        for name, nbytes in entry.files.items():
+            f = root / name
+            try:
+                if f.stat().st_size != nbytes:
+                    return None
+            except OSError:
+                return None
+        return entry.path
+
+    def is_downloaded(self, size: str) -> bool:
+        return self.local_path(size) is not None
+
+    # ------------------------------------------------------------ adoptar
+    def adopt(self, size: str) -> str | None:
+        """Registra un modelo que ya está en el cache de HF, sin red. Queda
+        sin verificar por hash (no hay metadata del hub a mano)."""
+        if not HF_AVAILABLE:
+            return None
+        try:
+            path = snapshot_download(repo_for(size), allow_patterns=ALLOW_PATTERNS, local_files_only=True)
+        except Exception:
+            return None
+        root = Path(path)
+        files = {p.name: p.stat().st_size for p in root.iterdir() if p.is_file()}
+        if "model.bin" not in files:
+            return None
+        entry = ModelEntry(
+            size=size, repo_id=repo_for(size), revision=root.name, path=str(root),
+            files=files, bytes=sum(files.values()), verified=False,
+            downloaded_at=time.strftime("%Y-%m-%d %H:%M"),
+        )
+        with self._lock:
+            self._entries[size] = entry
+            self._save_index()
+        self.log_fn(f"[models] {size} ya estaba en el cache de Hugging Face; registrado")
+        return entry.path
+
+    # ----------------------------------------------------------- descarga
+    def _remote_files(self, repo_id: str) -> tuple[str, dict[str, tuple[int, str | None]]]:
+        """(revisión, {archivo: (bytes, sha256 | None)}) según el hub."""
+        info = HfApi().model_info(repo_id, files_metadata=True)
+        files: dict[str, tuple[int, str | None]] = {}
+        for sib in info.siblings or []:
+            name = sib.rfilename
+            if not any(fnmatch.fnmatch(name, pat) for pat in ALLOW_PATTERNS):
+                continue
+            lfs = getattr(sib, "lfs", None)
+            sha = getattr(lfs, "sha256", None) or (lfs.get("sha256") if isinstance(lfs, dict) else None)
+            files[name] = (int(sib.size or 0), sha)
+        return info.sha, files
+
+    def _repo_cache_dir(self, repo_id: str) -> Path:
+        return Path(hf_constants.HF_HUB_CACHE) / ("models--" + repo_id.replace("/", "--"))
+
+    def _watch_progress(self, size: str, repo_id: str, total: int,
+                        on_progress: ProgressFn | None, stop: threading.Event) -> None:
+        """Suma lo que hay en blobs/ (incluidos los .incomplete) mientras baja."""
+        blobs = self._repo_cache_dir(repo_id) / "blobs"
+        while not stop.wait(PROGRESS_INTERVAL):
+            try:
+                done = sum(p.stat().st_size for p in blobs.iterdir())
+            except OSError:
+                done = 0
+            if on_progress is not None:
+                on_progress(size, min(done, total), total)
+
+    @staticmethod
+    def _sha256(path: Path) -> str:
+        h = hashlib.sha256()
+        with path.open("rb") as f:
+            while chunk := f.read(HASH_CHUNK):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def download(self, size: str, on_progress: ProgressFn | None = None) -> str:
+        """Baja `size` (bloqueante), verifica y lo registra. Devuelve la carpeta."""
+        if not HF_AVAILABLE:
+            raise RuntimeError("huggingface_hub no instalado")
+        repo_id = repo_for(size)
+        with self._lock:
+            if size in self._downloading:
+                raise RuntimeError(f"{size} ya se está descargando")
+            self._downloading.add(size)
+        try:
+            t0 = time.perf_counter()
+            revision, remote = self._remote_files(repo_id)
+            total = sum(n for n, _sha in remote.values())
+            self.log_fn(f"[models] descargando {size} ({repo_id}@{revision[:7]}, {total / 1e6:.0f} MB)…")
+            stop = threading.Event()
+            watcher = threading.Thread(
+                target=self._watch_progress, args=(size, repo_id, total, on_progress, stop),
+                daemon=True, name="dictapp-model-progress",
+            )
+            watcher.start()
+            try:
+                path = snapshot_download(repo_id, revision=revision, allow_patterns=ALLOW_PATTERNS)
+            finally:
+                stop.set()
+                watcher.join()
+            if on_progress is not None:
+                on_progress(size, total, total)
+            root = Path(path)
+            files = self._verify(root, remote)
+            entry = ModelEntry(
+                size=size, repo_id=repo_id, revision=revision, path=str(root),
+                files=files, bytes=sum(files.values()), verified=True,
+                downloaded_at=time.strftime("%Y-%m-%d %H:%M"),
+            )
+            with self._lock:
+                self._entries[size] = entry
+                self._save_index()
+            self.log_fn(f"[models] {size} listo y verificado en {time.perf_counter()-t0:.1f}s → {root}")
+            return entry.path
+        finally:
+            with self._lock:
+                self._downloading.discard(size)
+
+    def _verify(self, root: Path, remote: dict[str, tuple[int, str | None]]) -> dict[str, int]:
+        files: dict[str, int] = {}
+        for name, (nbytes, sha) in remote.items():
+            f = root / name
+            actual = f.stat().st_size if f.exists() else -1
+            if actual != nbytes:
+                raise RuntimeError(f"{name}: {actual} bytes, se esperaban {nbytes}")
+            if sha is not None and self._sha256(f) != sha:
+                raise RuntimeError(f"{name}: sha256 no coincide (descarga corrupta)")
+            files[name] = nbytes
+        if "model.bin" not in files:
+            raise RuntimeError("el repo no tiene model.bin")
+        return files
+
+    def download_async(self, size: str, on_progress: ProgressFn | None = None,
+                       on_done: DoneFn | None = None) -> None:
+        def worker() -> None:
+            try:
+                path = self.download(size, on_progress)
+            except Exception as e:
+                self.log_fn(f"[models] descarga de {size} falló: {type(e).__name__}: {e}")
+                if on_done is not None:
+                    on_done(size, None, e)
+                return
+            if on_done is not None:
+                on_done(size, path, None)
+        threading.Thread(target=worker, daemon=True, name="dictapp-model-download").start()
@@ -0,0 +1,282 @@
+"""Planificador de requests a backends en la nube: reintentos, rate limits y
+rotación de API keys.
+
+Antes cualquier excepción del SDK (un 429 o un 5xx pasajero incluidos)
+terminaba en `TranscriptionError` y el dictado se perdía. Acá:
+
+- Cada key tiene un token bucket (requests por minuto). Antes de enviar se
+  toma un token de la key que quede libre primero; las keys se rotan en
+  round-robin para repartir la carga entre las cuentas del equipo.
+- Un 429 bloquea esa key el tiempo que diga `Retry-After` (o los headers
+  `x-ratelimit-reset-*`) y el request sigue por otra key si hay.
+- Errores pasajeros (5xx, 408, conexión, timeout) se reintentan con backoff
+  exponencial con jitter ("full jitter").
+- Un 401/403 deshabilita la key; errores 4xx del request (400, 413…) no se
+  reintentan.
+- Con respuestas OK se leen `x-ratelimit-remaining-requests` /
+  `x-ratelimit-reset-requests` para no gastar tokens que el servidor ya no da.
+
+`RequestStats` separa el tiempo esperando (cola + backoff) del tiempo de los
+requests, para el log `[TX]`.
+"""
+from __future__ import annotations
+
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Mapping, TypeVar
+
+from .base import TranscriptionError
+
+T = TypeVar("T")
+
+DEFAULT_RPM = 20.0         # límite de requests/minuto por key (plan gratis de Groq para Whisper)
+DEFAULT_RETRIES = 4        # reintentos después del primer intento
+BACKOFF_BASE_S = 0.5
+BACKOFF_MAX_S = 20.0
+MAX_WAIT_S = 60.0          # más que esto esperando un token → se abandona el request
+RETRY_STATUS = {408, 409, 500, 502, 503, 504}
+AUTH_STATUS = {401, 403}
+
+# Request que devuelve (resultado, headers de la respuesta o None)
+RequestFn = Callable[[Any], "tuple[T, Mapping[str, str] | None]"]
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value: str | None) -> float | None:
+    """Segundos de un header de rate limit: "7", "7.66s", "2m59.56s", "120ms"."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    unit_s = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(n) * unit_s[u] for n, u in parts)
+
+
+def _headers_of(exc: BaseException) -> Mapping[str, str]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    return headers if headers is not None else {}
+
+
+def _status_of(exc: BaseException) -> int | None:
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def _is_transient(exc: BaseException) -> bool:
+    """Conexión caída / timeout (groq.APIConnectionError, httpx.TimeoutException…)."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    name = type(exc).__name__
+    return "Connection" in name or "Timeout" in name
+
+
+def is_unavailable(exc: BaseException) -> bool:
+    """¿El error es del servicio o de la red (y no del request o la key)?"""
+    status = _status_of(exc)
+    return status in RETRY_STATUS or (status is None and _is_transient(exc))
+
+
+def retry_after(headers: Mapping[str, str]) -> float | None:
+    """Cuánto esperar según los headers de un 429/503 (None si no dicen)."""
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        seconds = parse_duration(headers.get(name))
+        if seconds is not None:
+            return seconds
+    return None
+
+
+class TokenBucket:
+    """`rate_per_min` tokens por minuto, hasta `capacity` acumulados. No es
+    thread-safe por sí solo: lo protege el lock del scheduler."""
+
+    def __init__(self, rate_per_min: float, capacity: float | None = None) -> None:
+        self.rate = max(rate_per_min, 0.1) / 60.0
+        self.capacity = max(1.0, capacity if capacity is not None else rate_per_min)
+        self.tokens = self.capacity
+        self._stamp = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def ready_at(self, now: float) -> float:
+        self._refill(now)
+        if self.tokens >= 1.0:
+            return now
+        return now + (1.0 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1.0
+
+    def clamp(self, remaining: float) -> None:
+        """El servidor dice que quedan `remaining` requests: no creer tener más."""
+        self.tokens = min(self.tokens, remaining)
+
+
+@dataclass
+class KeySlot:
+    label: str
+    client: Any
+    bucket: TokenBucket
+    blocked_until: float = 0.0     # por 429 / cuota agotada
+    disabled: str = ""             # motivo si la key fue rechazada (401/403)
+
+
+@dataclass
+class RequestStats:
+    key: str = ""
+    attempts: int = 0
+    wait_s: float = 0.0            # esperando token / rate limit / backoff
+    request_s: float = 0.0         # dentro de los requests (todos los intentos)
+
+    def describe(self) -> str:
+        tries = f" · {self.attempts} intentos" if self.attempts > 1 else ""
+        return f"{self.key} · espera {self.wait_s:.2f}s · request {self.request_s:.2f}s{tries}"
+
+
+class RequestScheduler:
+    """Reparte requests entre varias keys respetando sus límites. Thread-safe:
+    lo comparten los hilos que suben trozos en paralelo."""
+
+    def __init__(self, clients: list[tuple[str, Any]], rpm: float = DEFAULT_RPM,
+                 max_retries: int = DEFAULT_RETRIES, max_wait_s: float = MAX_WAIT_S,
+                 log_fn: Callable[[str], None] | None = None) -> None:
+        if not clients:
+            raise ValueError("se necesita al menos un cliente")
+        self.slots = [KeySlot(label, client, TokenBucket(rpm)) for label, client in clients]
+        self.max_retries = max(0, max_retries)
+        self.max_wait_s = max_wait_s
+        self.log_fn = log_fn or (lambda _msg: None)
+        self._cond = threading.Condition()
+        self._next = 0
+
+    # ------------------------------------------------------------ tokens
+    def _acquire(self) -> KeySlot:
+        """Bloquea hasta que alguna key tenga token y no esté bloqueada."""
+        give_up = time.monotonic() + self.max_wait_s
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                n = len(self.slots)
+                best: KeySlot | None = None
+                best_at = 0.0
+                best_i = 0
+                for step in range(n):
+                    i = (self._next + step) % n
+                    slot = self.slots[i]
+                    if slot.disabled:
+                        continue
+                    at = max(slot.blocked_until, slot.bucket.ready_at(now))
+                    if best is None or at < best_at:
+                        best, best_at, best_i = slot, at, i
+                if best is None:
+                    reasons = "; ".join(f"{s.label}: {s.disabled}" for s in self.slots)
+                    raise TranscriptionError(f"ninguna API key utilizable ({reasons})")
+                if best_at <= now:
+                    best.bucket.take(now)
+                    self._next = (best_i + 1) % n
+                    return best
+                if best_at > give_up:
+                    raise TranscriptionError(
+                        f"rate limit: la próxima key libre tarda {best_at - now:.0f}s"
+                    )
+                self._cond.wait(best_at - now)
+
+    def _block(self, slot: KeySlot, seconds: float) -> None:
+        with self._cond:
+            slot.blocked_until = max(slot.blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def _disable(self, slot: KeySlot, reason: str) -> None:
+        with self._cond:
+            slot.disabled = reason
+            self._cond.notify_all()
+
+    def _observe(self, slot: KeySlot, headers: Mapping[str, str] | None) -> None:
+        """Ajusta el bucket con lo que informa el servidor en una respuesta OK."""
+        if not headers:
+            return
+        try:
+            remaining = float(headers.get("x-ratelimit-remaining-requests", ""))
+        except ValueError:
+            return
+        with self._cond:
+            slot.bucket.clamp(remaining)
+        if remaining < 1:
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                self._block(slot, reset)
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # full jitter: uniforme entre 0 y el tope exponencial
+        return random.uniform(0.0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * (2 ** attempt)))
+
+    # ------------------------------------------------------------ requests
+    def call(self, fn: RequestFn, label: str = "") -> tuple[T, RequestStats]:
+        """Ejecuta `fn(client)` con reintentos. Relanza el último error si no
+        hay caso (o `TranscriptionError` si ninguna key puede atender)."""
+        stats = RequestStats()
+        where = f" {label}" if label else ""
+        for attempt in range(self.max_retries + 1):
+            t_wait = time.perf_counter()
+            slot = self._acquire()
+            stats.wait_s += time.perf_counter() - t_wait
+            stats.key = slot.label
+            stats.attempts = attempt + 1
+            t_req = time.perf_counter()
+            try:
+                value, headers = fn(slot.client)
+            except Exception as e:
+                stats.request_s += time.perf_counter() - t_req
+                last = attempt == self.max_retries
+                status = _status_of(e)
+                headers = _headers_of(e)
+                if status == 429:
+                    wait = retry_after(headers)
+                    wait = wait if wait is not None else self._backoff(attempt + 2)
+                    # un poco de jitter para que los trozos paralelos no vuelvan juntos
+                    self._block(slot, wait * random.uniform(1.0, 1.1))
+                    self.log_fn(f"[TX] 429{where} en {slot.label}: bloqueada {wait:.1f}s")
+                elif status in AUTH_STATUS:
+                    self._disable(slot, f"HTTP {status}")
+                    self.log_fn(f"[TX] {slot.label} rechazada (HTTP {status}); se deja de usar")
+                elif is_unavailable(e):
+                    if last:
+                        raise
+                    wait = retry_after(headers) or self._backoff(attempt)
+                    self.log_fn(
+                        f"[TX] {type(e).__name__}{where} ({status or 'sin respuesta'}): "
+                        f"reintento {attempt + 1}/{self.max_retries} en {wait:.2f}s"
+                    )
+                    time.sleep(wait)
+                    stats.wait_s += wait
+                    continue
+                else:
+                    raise
+                if last:
+                    raise
+                continue
+            stats.request_s += time.perf_counter() - t_req
+            self._observe(slot, headers)
+            return value, stats
+        raise AssertionError("unreachable")
+
+    def describe(self) -> str:
+        with self._cond:
+            usable = [s for s in self.slots if not s.disabled]
+        return f"{len(usable)}/{len(self.slots)} keys"
@@ -0,0 +1,356 @@
+"""Inferencia de faster-whisper en un proceso aparte.
+
+En el mismo proceso, CTranslate2 ocupa todos los núcleos y el manejo de
+segmentos en Python compite por el GIL con el mainloop de Tk, los callbacks
+de audio y el hook de `keyboard`: la UI se traba y el audio hace overruns.
+Acá un proceso hijo (spawn, se lanza una vez y queda tibio) carga los modelos
+y decodifica:
+
+- El PCM float32 entra por `SharedMemory` (sin serializar el array).
+- Pedidos y respuestas van por un `Pipe`; los segmentos vuelven de a uno,
+  apenas se decodifican.
+- Si el padre abandona los segmentos (p. ej. el hedging cancela al que
+  perdió) manda `("cancel",)`: el hijo lo ve entre segmento y segmento,
+  corta la decodificación y contesta `("done",)`.
+- Si el proceso muere (p. ej. una DLL de CUDA que tira abajo el proceso),
+  se relanza solo en el próximo pedido.
+
+`RemoteModel` imita la parte de `WhisperModel` que usa
+`LocalWhisperTranscriber` (`transcribe()` → (segmentos, info)), así el resto
+del transcriber no distingue si el modelo vive acá o en el worker.
+"""
+from __future__ import annotations
+
+import multiprocessing as mp
+import sys
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+from typing import Any, Callable, Iterator
+
+WORKER_MAX_MODELS = 2       # modelos que el worker mantiene cargados (LRU)
+START_TIMEOUT = 60.0        # spawn + import de faster-whisper puede ser lento en frío
+MAX_RESTARTS = 1            # reintentos por pedido si el worker se cae
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+# ---------------------------------------------------------------- proceso hijo
+def _lower_process_priority() -> None:
+    if sys.platform != "win32":
+        return
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetPriorityClass(kernel32.GetCurrentProcess(), 0x4000)  # BELOW_NORMAL_PRIORITY_CLASS
+    except Exception:
+        pass
+
+
+def _worker_main(conn) -> None:
+    """Loop del proceso hijo. Un pedido a la vez."""
+    _lower_process_priority()
+    try:
+        import numpy as np
+        from faster_whisper import WhisperModel
+        try:
+            from faster_whisper import BatchedInferencePipeline
+        except Exception:
+            BatchedInferencePipeline = None
+    except Exception as e:
+        conn.send(("fatal", f"{type(e).__name__}: {e}"))
+        return
+    conn.send(("ready",))
+
+    models: OrderedDict[tuple, Any] = OrderedDict()
+
+    def get_model(key: tuple, model_opts: dict):
+        slot = (key, tuple(sorted(model_opts.items())))
+        model = models.get(slot)
+        if model is not None:
+            models.move_to_end(slot)
+            return model, 0.0
+        t0 = time.perf_counter()
+        size, device, compute = key
+        opts = dict(model_opts)
+        # ruta local del modelo (ModelManager): carga sin consultar el hub
+        ref = opts.pop("model_path", None) or size
+        conn.send(("log", f"[worker] cargando modelo='{size}' device='{device}' compute='{compute}'…"))
+        model = WhisperModel(ref, device=device, compute_type=compute, **opts)
+        models[slot] = model
+        while len(models) > WORKER_MAX_MODELS:
+            models.popitem(last=False)
+        return model, time.perf_counter() - t0
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        kind = msg[0]
+        if kind == "quit":
+            return
+        if kind == "cancel":
+            continue   # llegó tarde: el pedido ya había terminado y mandado "done"
+        if kind == "unload":
+            models.clear()
+            import gc
+            gc.collect()
+            conn.send(("ok",))
+            continue
+        if kind == "load":
+            try:
+                _model, seconds = get_model(tuple(msg[1]), msg[2])
+                conn.send(("loaded", seconds))
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+            continue
+        if kind == "transcribe":
+            _, key, model_opts, source, language, opts = msg
+            shm = None
+            audio = None
+            try:
+                model, _seconds = get_model(tuple(key), model_opts)
+                if isinstance(source, str):
+                    audio = source
+                else:
+                    shm_name, n = source
+                    shm = shared_memory.SharedMemory(name=shm_name)
+                    audio = np.ndarray((n,), dtype=np.float32, buffer=shm.buf)
+                batch_size = int(opts.pop("batch_size", 0) or 0)
+                if batch_size > 1 and BatchedInferencePipeline is not None:
+                    runner = BatchedInferencePipeline(model=model)
+                    segments, info = runner.transcribe(audio, language=language, batch_size=batch_size, **opts)
+                else:
+                    segments, info = model.transcribe(audio, language=language, **opts)
+                conn.send(("info", {
+                    "language": getattr(info, "language", None),
+                    "language_probability": getattr(info, "language_probability", 0.0),
+                    "duration": getattr(info, "duration", 0.0),
+                }))
+                for seg in segments:
+                    conn.send(("segment", seg.text, seg.start, seg.end))
+                    # el padre puede cancelar entre segmentos (el generador es lazy)
+                    if conn.poll() and conn.recv()[0] == "cancel":
+                        conn.send(("log", "[worker] decodificación cancelada"))
+                        break
+                conn.send(("done",))
+                segments = info = None
+            except Exception as e:
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+            finally:
+                audio = None
+                if shm is not None:
+                    try:
+                        shm.close()
+                    except BufferError:
+                        pass
+            continue
+        conn.send(("error", f"pedido desconocido: {kind!r}"))
+
+
+# ---------------------------------------------------------------- proceso padre
+class WhisperWorker:
+    """Dueño del proceso hijo. Thread-safe: serializa los pedidos."""
+
+    def __init__(self, log_fn: Callable[[str], None] | None = None) -> None:
+        self.log_fn = log_fn or (lambda _msg: None)
+        self._proc: mp.process.BaseProcess | None = None
+        self._conn = None
+        # Lock (no RLock): el generador de segmentos puede soltarlo desde otro hilo
+        self._lock = threading.Lock()
+        self.restarts = 0
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.is_alive()
+
+    def _start(self) -> None:
+        ctx = mp.get_context("spawn")
+        parent, child = ctx.Pipe(duplex=True)
+        proc = ctx.Process(target=_worker_main, args=(child,), daemon=True, name="dictapp-whisper")
+        t0 = time.perf_counter()
+        proc.start()
+        child.close()
+        if not parent.poll(START_TIMEOUT):
+            proc.terminate()
+            raise WorkerCrashed("el worker de inferencia no respondió al arrancar")
+        msg = parent.recv()
+        if msg[0] == "fatal":
+            proc.join(timeout=2.0)
+            raise WorkerCrashed(f"el worker no pudo importar faster-whisper: {msg[1]}")
+        self._proc, self._conn = proc, parent
+        self.log_fn(f"[worker] proceso de inferencia listo (pid={proc.pid}) en {time.perf_counter()-t0:.2f}s")
+
+    def _ensure(self) -> None:
+        if self.alive:
+            return
+        if self._proc is not None:
+            code = self._proc.exitcode
+            self.restarts += 1
+            self.log_fn(f"[worker] el proceso murió (exit={code}); relanzando (#{self.restarts})…")
+            self._close()
+        self._start()
+
+    def _close(self) -> None:
+        try:
+            if self._conn is not None:
+                self._conn.close()
+        except Exception:
+            pass
+        self._proc = None
+        self._conn = None
+
+    def _recv(self):
+        """Siguiente respuesta que no sea log (los logs se reenvían al log_fn)."""
+        while True:
+            try:
+                msg = self._conn.recv()
+            except (EOFError, OSError) as e:
+                if self._proc is not None:
+                    self._proc.join(timeout=1.0)   # que `alive` refleje la caída
+                raise WorkerCrashed(f"el worker de inferencia se cayó: {str(e) or type(e).__name__}") from e
+            if msg[0] == "log":
+                self.log_fn(msg[1])
+                continue
+            return msg
+
+    def _request(self, msg: tuple):
+        self._ensure()
+        try:
+            self._conn.send(msg)
+        except (OSError, ValueError) as e:
+            raise WorkerCrashed(f"no se pudo hablar con el worker: {e}") from e
+
+    def load(self, key: tuple, **model_opts) -> float:
+        """Carga `key` en el worker (bloqueante). Devuelve segundos de carga.
+
+        `model_opts` va tal cual al constructor de `WhisperModel` (p. ej. cpu_threads).
+        """
+        with self._lock:
+            for attempt in range(MAX_RESTARTS + 1):
+                try:
+                    self._request(("load", list(key), dict(model_opts)))
+                    reply = self._recv()
+                    break
+                except WorkerCrashed:
+                    if attempt >= MAX_RESTARTS:
+                        raise
+            if reply[0] == "error":
+                raise RuntimeError(reply[1])
+            return float(reply[1])
+
+    def transcribe(self, key: tuple, audio, language: str,
+                   model_opts: dict | None = None, **opts):
+        """Devuelve (generador de segmentos, info) como `WhisperModel.transcribe`.
+
+        El lock del worker queda tomado hasta que se consume el generador.
+        """
+        self._lock.acquire()
+        shm = None
+        try:
+            for attempt in range(MAX_RESTARTS + 1):
+                if isinstance(audio, str):
+                    source: Any = audio
+                else:
+                    import numpy as np
+                    arr = np.ascontiguousarray(audio, dtype=np.float32).reshape(-1)
+                    if shm is None:
+                        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 4))
+                        np.ndarray(arr.shape, dtype=np.float32, buffer=shm.buf)[:] = arr
+                    source = (shm.name, int(arr.size))
+                try:
+                    self._request(("transcribe", list(key), dict(model_opts or {}), source, language, dict(opts)))
+                    reply = self._recv()
+                    break
+                except WorkerCrashed:
+                    if attempt >= MAX_RESTARTS:
+                        raise
+            if reply[0] == "error":
+                raise RuntimeError(reply[1])
+            info = SimpleNamespace(**reply[1])
+        except BaseException:
+            self._release(shm)
+            raise
+        return self._segments(shm), info
+
+    def _segments(self, shm) -> Iterator[SimpleNamespace]:
+        finished = False
+        try:
+            while True:
+                msg = self._recv()
+                if msg[0] == "segment":
+                    yield SimpleNamespace(text=msg[1], start=msg[2], end=msg[3])
+                elif msg[0] == "done":
+                    finished = True
+                    return
+                elif msg[0] == "error":
+                    finished = True
+                    raise RuntimeError(msg[1])
+        finally:
+            if not finished:
+                self._drain()
+            self._release(shm)
+
+    def _drain(self) -> None:
+        """Consumidor que abandonó el generador: pedirle al hijo que corte y
+        leer hasta el final del pedido para que el próximo no reciba
+        segmentos viejos."""
+        try:
+            self._conn.send(("cancel",))
+        except (OSError, ValueError, AttributeError):
+            pass
+        try:
+            while self._recv()[0] not in ("done", "error"):
+                pass
+        except WorkerCrashed:
+            self._close()
+
+    def _release(self, shm) -> None:
+        if shm is not None:
+            try:
+                shm.close()
+                shm.unlink()
+            except Exception:
+                pass
+        self._lock.release()
+
+    def unload(self) -> None:
+        with self._lock:
+            if not self.alive:
+                return
+            try:
+                self._request(("unload",))
+                self._recv()
+            except WorkerCrashed:
+                pass
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._proc is None:
+                return
+            try:
+                self._conn.send(("quit",))
+            except Exception:
+                pass
+            self._proc.join(timeout=2.0)
+            if self._proc.is_alive():
+                self._proc.terminate()
+            self._close()
+
+
+class RemoteModel:
+    """Proxy de un modelo cargado en el worker (por clave, no por referencia):
+    si el worker se relanza, el próximo pedido lo vuelve a cargar solo."""
+
+    def __init__(self, worker: WhisperWorker, key: tuple, model_opts: dict | None = None) -> None:
+        self.worker = worker
+        self.key = key
+        self.model_opts = dict(model_opts or {})
+
+    def transcribe(self, audio, language: str = "es", **opts):
+        return self.worker.transcribe(self.key, audio, language, model_opts=self.model_opts, **opts)